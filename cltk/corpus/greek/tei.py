@@ -1,14 +1,17 @@
 """Work with TEI XML files."""
 
+from multiprocessing import Pool
 import glob
 import os
+import tempfile
+import time
 
 
-bs4_installed = True
+lxml_installed = True
 try:
-    from bs4 import BeautifulSoup
+    from lxml.etree import QName, iterparse
 except ImportError:
-    bs4_installed = False
+    lxml_installed = False
 
 mycapitains_installed = True
 try:
@@ -21,10 +24,110 @@ except ImportError:
 from cltk.utils.cltk_logger import logger
 
 
-def onekgreek_tei_xml_to_text():
-    """Find TEI XML dir of TEI XML for the First 1k Years of Greek corpus."""
-    if not bs4_installed:
-        logger.error('Install `bs4` and `lxml` to parse these TEI files.')
+def _local_name(element):
+    """Return the tag of an element without its namespace."""
+    return QName(element).localname
+
+
+def iter_tei_body_text(xml_path):
+    """Yield the text within the ``<body>`` elements of a TEI XML file, in
+    document order, without building the whole tree: each element is
+    emptied once its text has been yielded, so memory is bounded by the
+    depth of the document rather than its length. Comments and processing
+    instructions are dropped.
+    :param xml_path: Path of TEI XML file
+    :rtype: generator of str
+    """
+    # Text before an element (its parent's text, or its previous sibling's
+    # tail) is complete when the element starts; the text after its last
+    # child is complete when it ends.
+    depth = 0  # of elements within a body, the body included
+    for event, element in iterparse(xml_path, events=('start', 'end'),
+                                    remove_comments=True, remove_pis=True, huge_tree=True):
+        if event == 'start':
+            if depth:
+                parent = element.getparent()
+                previous = element.getprevious()
+                if previous is None:
+                    if parent.text:
+                        yield parent.text
+                else:
+                    if previous.tail:
+                        yield previous.tail
+                    parent.remove(previous)
+                depth += 1
+            elif _local_name(element) == 'body':
+                depth = 1
+        else:
+            if depth:
+                if len(element):
+                    if element[-1].tail:
+                        yield element[-1].tail
+                elif element.text:
+                    yield element.text
+                depth -= 1
+                element.clear(keep_tail=True)
+            else:
+                # Outside the bodies, such as the teiHeader
+                element.clear(keep_tail=True)
+
+
+def tei_xml_to_text(xml_path, plaintext_path):
+    """Write the body text of a TEI XML file to a plaintext file, under a
+    temporary name first, so that an interrupted conversion leaves no
+    partial file.
+    :param xml_path: Path of TEI XML file
+    :param plaintext_path: Path of plaintext file to write
+    :return: Seconds taken
+    :rtype: float
+    """
+    time_0 = time.time()
+    directory = os.path.dirname(os.path.abspath(plaintext_path))
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as file_open:
+        try:
+            for text in iter_tei_body_text(xml_path):
+                file_open.write(text)
+        except BaseException:
+            os.remove(file_open.name)
+            raise
+    os.chmod(file_open.name, 0o644)
+    os.replace(file_open.name, plaintext_path)
+    return time.time() - time_0
+
+
+def _tei_xml_to_text_in_worker(paths):
+    """Convert one file in a pool worker, returning errors rather than
+    raising them, so that one bad file does not stop the others.
+    :return: XML path, seconds taken or None, and error message or None
+    :rtype: tuple
+    """
+    xml_path, plaintext_path = paths
+    try:
+        return xml_path, tei_xml_to_text(xml_path, plaintext_path), None
+    except Exception as exception:  # pylint: disable=broad-except
+        return xml_path, None, '{}: {}'.format(type(exception).__name__, exception)
+
+
+def _is_converted(xml_path, plaintext_path):
+    """Return whether the plaintext file exists and is newer than the XML."""
+    try:
+        return os.path.getmtime(plaintext_path) >= os.path.getmtime(xml_path)
+    except FileNotFoundError:
+        return False
+
+
+def onekgreek_tei_xml_to_text(workers=1, force=False):
+    """Convert the TEI XML of the First 1k Years of Greek corpus to
+    plaintext, keeping the text within ``<body>``. Files are parsed
+    incrementally, in up to workers processes at once, and those whose
+    plaintext is newer than them are skipped.
+    :param workers: Number of processes; -1 for one per CPU
+    :param force: Convert all files, even if already converted
+    :return: Paths of plaintext files written
+    :rtype: list
+    """
+    if not lxml_installed:
+        logger.error('Install `lxml` to parse these TEI files.')
         raise ImportError
     xml_dir = os.path.normpath(get_cltk_data_dir() + '/greek/text/greek_text_first1kgreek/data/*/*/*.xml')
     xml_paths = glob.glob(xml_dir)
@@ -38,17 +141,34 @@ def onekgreek_tei_xml_to_text():
     if not os.path.isdir(new_dir):
         os.makedirs(new_dir)
 
-    for xml_path in xml_paths:
+    jobs = []
+    for xml_path in sorted(xml_paths):
         _, xml_name = os.path.split(xml_path)
-        xml_name = xml_name.rstrip('.xml')
-        xml_name += '.txt'
-        with open(xml_path) as file_open:
-            soup = BeautifulSoup(file_open, 'lxml')
-        body = soup.body
-        text = body.get_text()
-        new_plaintext_path = os.path.join(new_dir, xml_name)
-        with open(new_plaintext_path, 'w') as file_open:
-            file_open.write(text)
+        plaintext_path = os.path.join(new_dir, os.path.splitext(xml_name)[0] + '.txt')
+        if force or not _is_converted(xml_path, plaintext_path):
+            jobs.append((xml_path, plaintext_path))
+    logger.info('Converting %s TEI files; %s already converted.', len(jobs), len(xml_paths) - len(jobs))
+    if workers == -1:
+        workers = os.cpu_count()
+
+    plaintext_paths = dict(jobs)
+    converted = []
+
+    def _collect(results):
+        for xml_path, seconds, error in results:
+            if error is not None:
+                logger.error("Failed to convert '%s': %s", xml_path, error)
+                continue
+            converted.append(plaintext_paths[xml_path])
+            logger.debug("Converted '%s' in %.2f secs.", xml_path, seconds)
+
+    if workers == 1:
+        _collect(map(_tei_xml_to_text_in_worker, jobs))
+    else:
+        # Leaving the block terminates the workers, also on KeyboardInterrupt
+        with Pool(workers) as pool:
+            _collect(pool.imap_unordered(_tei_xml_to_text_in_worker, jobs, chunksize=4))
+    return sorted(converted)
 
 
 def onekgreek_tei_xml_to_text_capitains():
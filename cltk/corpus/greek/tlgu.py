@@ -10,9 +10,22 @@ __author__ = ['Kyle P. Johnson <kyle@kyle-p-johnson.com>', 'Stephen Margheim <st
 __license__ = 'MIT License. See LICENSE.'
 
 from cltk.utils.cltk_logger import logger
+from cltk.utils.file_operations import md5
 from cltk.corpus.utils.importer import CorpusImporter
+from multiprocessing.pool import ThreadPool
+import glob
+import json
 import os
+import shutil
 import subprocess
+import tempfile
+import time
+
+
+TLGU_BINARY = 'tlgu'
+# Written to the dir of converted files, recording what each was made from
+MANIFEST_NAME = '.tlgu_manifest.json'
+MANIFEST_VERSION = 1
 
 
 # this currently not in use
@@ -36,6 +49,135 @@ ARGS = {
 }
 
 
+def _read_manifest(manifest_path):
+    """Return the entries of a conversion manifest, by name of input file;
+    empty if there is none, or it cannot be read.
+    :rtype: dict
+    """
+    try:
+        with open(manifest_path) as file_open:
+            manifest = json.load(file_open)
+    except FileNotFoundError:
+        return {}
+    except ValueError as value_error:
+        logger.warning("Ignoring unreadable manifest '%s': %s", manifest_path, value_error)
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest['files']
+
+
+def _write_manifest(manifest_path, files):
+    """Write a conversion manifest, under a temporary name first."""
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w') as file_open:
+        json.dump({'version': MANIFEST_VERSION, 'files': files}, file_open, indent=1, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+def _is_converted(input_path, output_path, options, entry):
+    """Return whether the outputs of converting input_path all exist and are
+    newer than it. If the manifest has an entry for it, its outputs are
+    those recorded, and the tlgu options must be the same.
+    :param entry: Manifest entry of input file, or None
+    :rtype: bool
+    """
+    output_dir = os.path.dirname(output_path)
+    if entry is not None:
+        if entry['options'] != options:
+            return False
+        outputs = [os.path.join(output_dir, name) for name in entry['outputs']]
+    elif '-W' in options:
+        # tlgu names works output_path-001.txt, etc.
+        outputs = glob.glob(glob.escape(output_path) + '-*')
+    else:
+        outputs = [output_path]
+    if not outputs:
+        return False
+    input_mtime = os.path.getmtime(input_path)
+    try:
+        return all(os.path.getmtime(output) >= input_mtime for output in outputs)
+    except FileNotFoundError:
+        return False
+
+
+def _convert_in_worker(job):
+    """Convert one file with tlgu. Output is written to a temporary dir and
+    then moved into place, so that an interrupted conversion leaves no
+    partial files to be mistaken for converted ones.
+    :param job: Input path, output path, and list of tlgu flags
+    :return: Input path, and manifest entry, or None and an error message
+    :rtype: tuple
+    """
+    input_path, output_path, options = job
+    output_dir = os.path.dirname(output_path)
+    temp_dir = tempfile.mkdtemp(prefix='.tlgu-', dir=output_dir)
+    try:
+        temp_output_path = os.path.join(temp_dir, os.path.basename(output_path))
+        time_0 = time.time()
+        try:
+            returncode = subprocess.call([TLGU_BINARY] + options + [input_path, temp_output_path])
+        except OSError as os_error:
+            return input_path, None, str(os_error)
+        seconds = time.time() - time_0
+        if returncode != 0:
+            return input_path, None, 'tlgu exited with status {}'.format(returncode)
+        outputs = {}
+        for name in sorted(os.listdir(temp_dir)):
+            outputs[name] = md5(os.path.join(temp_dir, name))
+            os.replace(os.path.join(temp_dir, name), os.path.join(output_dir, name))
+        entry = {'input_md5': md5(input_path),
+                 'options': options,
+                 'outputs': outputs,
+                 'seconds': round(seconds, 3)}
+        return input_path, entry, None
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def convert_files(jobs, manifest_path, workers=1, force=False):
+    """Convert files with tlgu, running up to workers conversions at once.
+    Files whose outputs are newer than them are skipped, so that an
+    interrupted run resumes where it stopped. A manifest of the md5 of each
+    input and output, the tlgu options and the time taken is kept at
+    manifest_path.
+    :param jobs: Iterable of (input path, output path, list of tlgu flags)
+    :param manifest_path: Path of the manifest
+    :param workers: Number of simultaneous conversions; -1 for one per CPU
+    :param force: Convert files even if their outputs are up to date
+    :return: Manifest entries of the files converted, by input file name
+    :rtype: dict
+    """
+    manifest = _read_manifest(manifest_path)
+    jobs = list(jobs)
+    todo = [(input_path, output_path, options) for input_path, output_path, options in jobs
+            if force or not _is_converted(input_path, output_path, options,
+                                          manifest.get(os.path.basename(input_path)))]
+    logger.info('Converting %s files; %s already converted.', len(todo), len(jobs) - len(todo))
+    if workers == -1:
+        workers = os.cpu_count()
+
+    converted = {}
+    time_0 = time.time()
+    try:
+        # Threads suffice, as the work is done by tlgu processes
+        with ThreadPool(workers) as pool:
+            results = pool.imap_unordered(_convert_in_worker, todo)
+            for count, (input_path, entry, error) in enumerate(results, 1):
+                name = os.path.basename(input_path)
+                if entry is None:
+                    logger.error("Failed to convert '%s': %s", input_path, error)
+                    continue
+                manifest[name] = converted[name] = entry
+                logger.info("Converted '%s' in %.2f secs (%s of %s).", name, entry['seconds'], count, len(todo))  # pylint: disable=line-too-long
+                if count % 100 == 0:
+                    _write_manifest(manifest_path, manifest)
+    finally:
+        _write_manifest(manifest_path, manifest)
+    logger.info('Converted %s files in %.2f secs.', len(converted), time.time() - time_0)
+    return converted
+
+
 class TLGU(object):
     """Check, install, and call TLGU."""
     def __init__(self, testing=False):
@@ -129,6 +271,28 @@ class TLGU(object):
         # check input path exists
         assert os.path.isfile(input_path), 'File {0} does not exist.'.format(input_path)
 
+        tlgu_options = self._tlgu_options(markup, break_lines, divide_works, latin, extra_args)
+        tlgu_call = [TLGU_BINARY] + tlgu_options + [input_path, output_path]
+        logger.info(' '.join(tlgu_call))
+        try:
+            p_out = subprocess.call(tlgu_call)
+            if p_out == 1:
+                logger.error('Failed to convert %s to %s.',
+                             input_path,
+                             output_path)
+        except Exception as exc:
+            logger.error('Failed to convert %s to %s: %s',
+                         input_path,
+                         output_path,
+                         exc)
+            raise
+
+    @staticmethod
+    def _tlgu_options(markup=None, break_lines=False, divide_works=False, latin=False,
+                      extra_args=None):
+        """Return the tlgu flags for the options of ``convert()``, sorted.
+        :rtype: list
+        """
         # setup tlgu flags
         tlgu_options = []
         if markup == 'full':
@@ -151,35 +315,19 @@ class TLGU(object):
                 raise
         tlgu_options = tlgu_options + extra_args
         # assemble all tlgu flags
-        tlgu_options = list(set(tlgu_options))
-        if tlgu_options:
-            tlgu_flags = '-' + ' -'.join(tlgu_options)
-        else:
-            tlgu_flags = ''
-        # make tlgu call
-        tlgu_call = 'tlgu {0} {1} {2}'.format(tlgu_flags,
-                                              input_path,
-                                              output_path)
-        logger.info(tlgu_call)
-        try:
-            p_out = subprocess.call(tlgu_call, shell=True)
-            if p_out == 1:
-                logger.error('Failed to convert %s to %s.',
-                             input_path,
-                             output_path)
-        except Exception as exc:
-            logger.error('Failed to convert %s to %s: %s',
-                         input_path,
-                         output_path,
-                         exc)
-            raise
+        return ['-' + option for option in sorted(set(tlgu_options))]
 
-    def convert_corpus(self, corpus, markup=None, break_lines=False, divide_works=False, latin=None, extra_args=None):  # pylint: disable=W0613
+    def convert_corpus(self, corpus, markup=None, break_lines=False, divide_works=False, latin=None, extra_args=None, workers=1, force=False):  # pylint: disable=W0613
         """Look for imported TLG or PHI files and convert them all to
-        ``~/cltk_data/greek/text/tlg/<plaintext>``.
+        ``~/cltk_data/greek/text/tlg/<plaintext>``. Files already converted
+        since they last changed are skipped (see ``convert_files()``).
         TODO: Should this and/or convert() be static?
         TODO: Add markup options to input.
         TODO: Do something with break_lines, divide_works, and extra_args or rm them
+        :param workers: Number of simultaneous conversions; -1 for one per CPU
+        :param force: Convert all files, even if already converted
+        :return: Manifest entries of the files converted, by file name
+        :rtype: dict
         """
         orig_path_rel = get_cltk_data_dir() + '/originals'
         orig_path = os.path.expanduser(orig_path_rel)
@@ -206,27 +354,27 @@ class TLGU(object):
         # make a list of files to be converted
         txts = []
         [txts.append(x) for x in corpus_files if x.endswith('TXT')]  # pylint: disable=W0106
-        # loop through list and convert one at a time
-        for txt in txts:
-            orig_txt_path = os.path.join(orig_path, txt)
-            if markup is None:
-                target_txt_dir = os.path.join(target_path, 'plaintext')
-            else:
-                target_txt_dir = os.path.join(target_path, str(markup))
-            if not os.path.isdir(target_txt_dir):
-                os.makedirs(target_txt_dir)
-            target_txt_path = os.path.join(target_txt_dir, txt)
-            try:
-                self.convert(orig_txt_path, target_txt_path, markup=None,
-                             break_lines=False, divide_works=False, latin=latin,
-                             extra_args=None)
-            except Exception as exception:
-                logger.error("Failed to convert file '%s' to '%s': %s", orig_txt_path, target_txt_path, exception)
-
-    def divide_works(self, corpus):
-        """Use the work-breaking option.
+        if markup is None:
+            target_txt_dir = os.path.join(target_path, 'plaintext')
+        else:
+            target_txt_dir = os.path.join(target_path, str(markup))
+        if not os.path.isdir(target_txt_dir):
+            os.makedirs(target_txt_dir)
+        options = self._tlgu_options(latin=latin)
+        jobs = [(os.path.join(orig_path, txt), os.path.join(target_txt_dir, txt), options)
+                for txt in txts]
+        manifest_path = os.path.join(target_txt_dir, MANIFEST_NAME)
+        return convert_files(jobs, manifest_path, workers=workers, force=force)
+
+    def divide_works(self, corpus, workers=1, force=False):
+        """Use the work-breaking option. Files already divided since they
+        last changed are skipped (see ``convert_files()``).
         TODO: Maybe incorporate this into ``convert_corpus()``
         TODO: Write test for this
+        :param workers: Number of simultaneous conversions; -1 for one per CPU
+        :param force: Divide all files, even if already divided
+        :return: Manifest entries of the files divided, by file name
+        :rtype: dict
         """
         if corpus == 'tlg':
             orig_dir_rel = get_cltk_data_dir() + '/originals/tlg'
@@ -247,12 +395,8 @@ class TLGU(object):
         files = os.listdir(orig_dir)
         texts = [x for x in files if x.endswith('.TXT') and x.startswith(file_prefix)]
 
-        for file in texts:
-            orig_file_path = os.path.join(orig_dir, file)
-            new_file_path = os.path.join(works_dir, file)
-
-            try:
-                self.convert(orig_file_path, new_file_path, divide_works=True, latin=latin)
-                logger.info('Writing files at %s to %s.', orig_file_path, works_dir)
-            except Exception as err:
-                logger.error('Failed to convert files: %s.', err)
+        options = self._tlgu_options(divide_works=True, latin=latin)
+        jobs = [(os.path.join(orig_dir, file), os.path.join(works_dir, file), options)
+                for file in texts]
+        manifest_path = os.path.join(works_dir, MANIFEST_NAME)
+        return convert_files(jobs, manifest_path, workers=workers, force=force)
@@ -1,9 +1,11 @@
 """`reader.py` - Corpus reader utility objects."""
 import json
+import multiprocessing
 import os
 import re
 import codecs
 import time
+from functools import partial
 
 import logging
 from typing import List, Dict, Tuple, Set, Any, Generator
@@ -14,9 +16,11 @@ from nltk.probability import FreqDist
 from nltk.tokenize import sent_tokenize, word_tokenize  # Replace with CLTK
 from nltk import pos_tag  # Replace with CLTK
 
+from cltk.corpus.token_cache import TokenCache
 from cltk.prosody.latin.string_utils import flatten
 from cltk.tokenize.sentence import TokenizeSentence
 from cltk.tokenize.word import WordTokenizer
+from cltk.utils.parallel import imap_bounded
 
 LOG = logging.getLogger(__name__)
 LOG.addHandler(logging.NullHandler())
@@ -33,11 +37,15 @@ SUPPORTED_CORPORA = {
 }  # type: Dict[str, List[str]]
 
 
-def get_corpus_reader(corpus_name: str = None, language: str = None) -> CorpusReader:
+def get_corpus_reader(corpus_name: str = None, language: str = None,
+                      token_cache: str = None, workers: int = 1) -> CorpusReader:
     """
     Corpus reader factory method
     :param corpus_name: the name of the supported corpus, available as: [package].SUPPORTED_CORPORA
     :param langugage: the language for search in
+    :param token_cache: directory in which to cache the tokenization of each file, for the
+    Latin Library and Perseus readers; None to tokenize files on every read
+    :param workers: number of processes in which to read files; -1 for one per CPU
     :return: NLTK compatible corpus reader
     """
     BASE = get_cltk_data_dir() + '/{}/text'.format(language)
@@ -58,19 +66,23 @@ def get_corpus_reader(corpus_name: str = None, language: str = None) -> CorpusRe
             return FilteredPlaintextCorpusReader(root=root, fileids=doc_pattern,
                                                  sent_tokenizer=sentence_tokenizer,
                                                  word_tokenizer=the_word_tokenizer,
-                                                 skip_keywords=skip_keywords)
+                                                 skip_keywords=skip_keywords,
+                                                 token_cache=token_cache,
+                                                 workers=workers)
         if corpus_name == 'latin_text_perseus':
             valid_json_root = os.path.join(root, 'cltk_json')  #: we only support this subsection
             return JsonfileCorpusReader(root=valid_json_root,
                                         sent_tokenizer=sentence_tokenizer,
                                         word_tokenizer=the_word_tokenizer,
-                                        target_language='latin')  # perseus also contains English
+                                        target_language='latin',  # perseus also contains English
+                                        token_cache=token_cache,
+                                        workers=workers)
 
         if corpus_name == 'latin_text_tesserae':
             return TesseraeCorpusReader(root=root, fileids=r'.*\.tess',
                                         sent_tokenizer=sentence_tokenizer,
                                         word_tokenizer=the_word_tokenizer,
-                                        )
+                                        workers=workers)
 
     if language == 'greek':
         if corpus_name == 'greek_text_perseus':
@@ -78,7 +90,9 @@ def get_corpus_reader(corpus_name: str = None, language: str = None) -> CorpusRe
             return JsonfileCorpusReader(root=valid_json_root,
                                         sent_tokenizer=sentence_tokenizer,
                                         word_tokenizer=the_word_tokenizer,
-                                        target_language='grc')  #: this abbreviation is required
+                                        target_language='grc',  #: this abbreviation is required
+                                        token_cache=token_cache,
+                                        workers=workers)
 
         if corpus_name == 'greek_text_tesserae':
             # tokenizers/taggers need to be replaced with CLTK version
@@ -87,7 +101,8 @@ def get_corpus_reader(corpus_name: str = None, language: str = None) -> CorpusRe
                                         sent_tokenizer=sent_tokenize,
                                         word_tokenizer=word_tokenize,
                                         pos_tagger=pos_tag,
-                                        target_language='grc')  #: this abbreviation is required
+                                        target_language='grc',  #: this abbreviation is required
+                                        workers=workers)
 
     # TODO add other languages and write tests for each corpus
 
@@ -133,7 +148,82 @@ def assemble_corpus(corpus_reader: CorpusReader,
         LOG.exception('failure in corpus building')
 
 
-class FilteredPlaintextCorpusReader(PlaintextCorpusReader, CorpusReader):
+_WORKER_READER = None
+
+
+def _init_reader_worker(reader: CorpusReader):
+    """Keep a copy of the reader in each worker process, reading serially."""
+    global _WORKER_READER  # pylint: disable=global-statement
+    reader.workers = 1
+    _WORKER_READER = reader
+
+
+def _read_file_in_worker(task: Tuple[str, str]) -> Tuple[str, List[Any]]:
+    """Return the fileid and the results of a reader method on that file."""
+    method, fileid = task
+    return fileid, list(getattr(_WORKER_READER, method)([fileid]))
+
+
+class ParallelReaderMixin:
+    """
+    Read files in a pool of worker processes, one file per task, for corpus readers whose
+    workers attribute is not 1 (-1 for one per CPU). Tokenization happens in the workers;
+    results are yielded in the order of the fileids, or, with unordered(), tagged with their
+    fileid as soon as each file is done. The reader is copied to each worker, so it must be
+    picklable.
+    """
+
+    workers = 1
+
+    def _fileid_list(self, fileids) -> List[str]:
+        if not fileids:
+            return list(self.fileids())
+        if isinstance(fileids, str):
+            return [fileids]
+        return list(fileids)
+
+    def _pool_size(self) -> int:
+        return os.cpu_count() if self.workers == -1 else self.workers
+
+    def _parallel(self, fileids) -> bool:
+        """Return whether to read these files in worker processes."""
+        return self.workers != 1 and len(self._fileid_list(fileids)) > 1
+
+    def _read_parallel(self, method: str, fileids) -> Generator[Any, Any, None]:
+        """
+        Yield the results of a method over files read in worker processes, in fileid order
+        :param method: name of the reader method, e.g. 'sents'
+        :param fileids:
+        """
+        workers = self._pool_size()
+        with multiprocessing.Pool(workers, initializer=_init_reader_worker,
+                                  initargs=(self,)) as pool:
+            tasks = ((method, fileid) for fileid in self._fileid_list(fileids))
+            for _, results in imap_bounded(pool, _read_file_in_worker, tasks, 2 * workers,
+                                           ordered=True):
+                yield from results
+
+    def unordered(self, method: str, fileids=None) -> Generator[Tuple[str, List[Any]], Any, None]:
+        """
+        Yield the results of a method for each file as soon as it is done, in worker processes
+        unless workers is 1; faster than the ordered methods when files vary in size
+        :param method: name of the reader method, e.g. 'sents'
+        :param fileids:
+        :return: a generator of (fileid, list of results) pairs
+        """
+        fileids = self._fileid_list(fileids)
+        if self.workers == 1:
+            for fileid in fileids:
+                yield fileid, list(getattr(self, method)([fileid]))
+            return
+        workers = self._pool_size()
+        with multiprocessing.Pool(workers, initializer=_init_reader_worker,
+                                  initargs=(self,)) as pool:
+            tasks = ((method, fileid) for fileid in fileids)
+            yield from imap_bounded(pool, _read_file_in_worker, tasks, 2 * workers)
+
+
+class FilteredPlaintextCorpusReader(ParallelReaderMixin, PlaintextCorpusReader, CorpusReader):
     """
     A corpus reader for plain text documents with simple filtration for streamlined pipeline use.
     A list keywords may be provided, and if any of these keywords are found in a document's
@@ -141,13 +231,16 @@ class FilteredPlaintextCorpusReader(PlaintextCorpusReader, CorpusReader):
     """
 
     def __init__(self, root, fileids=None, encoding='utf8', skip_keywords=None,
-                 **kwargs):
+                 token_cache=None, workers=1, **kwargs):
         """
         :param root: The file root of the corpus directory
         :param fileids: the list of file ids to consider, or wildcard expression
         :param skip_keywords: a list of words which indicate whole paragraphs that should
         be skipped by the paras and words methods()
         :param encoding: utf8
+        :param token_cache: directory in which to cache the tokenization of each file, which is
+        then only redone when the file or the tokenizers change; None to tokenize on every read
+        :param workers: number of processes in which to read files; -1 for one per CPU
         :param kwargs: Any values to be passed to NLTK super classes, such as sent_tokenizer,
         word_tokenizer.
         """
@@ -162,6 +255,28 @@ class FilteredPlaintextCorpusReader(PlaintextCorpusReader, CorpusReader):
         if 'word_tokenizer' in kwargs:
             self._word_tokenizer = kwargs['word_tokenizer']
         self.skip_keywords = skip_keywords
+        self.workers = workers
+        self.token_cache = None
+        if token_cache:
+            self.token_cache = TokenCache(token_cache, type(self).__name__, self._sent_tokenizer,
+                                          self._word_tokenizer, self._para_block_reader)
+
+    def _tokenize_file(self, fileid, path):
+        """Tokenize a file for the token cache; sentences and paragraphs have no text."""
+        return [(None, [(None, sent) for sent in para])
+                for para in PlaintextCorpusReader.paras(self, [fileid])]
+
+    def _tokenized_paras(self, fileids):
+        """
+        Provide the paragraphs of files from the token cache, without filtering
+        :param fileids:
+        :return: a generator of paragraphs, as lists of sentences, as lists of words
+        """
+        if isinstance(fileids, str):
+            fileids = [fileids]
+        for fileid, path in zip(fileids, self.abspaths(fileids)):
+            for _, sents in self.token_cache.get(path, partial(self._tokenize_file, fileid)):
+                yield [words for _, words in sents]
 
     def words(self, fileids=None) -> Generator[str, str, None]:
         """
@@ -170,6 +285,9 @@ class FilteredPlaintextCorpusReader(PlaintextCorpusReader, CorpusReader):
         :param fileids:
         :return: words, including punctuation, one by one
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('words', fileids)
+            return
         if not fileids:
             fileids = self.fileids()
         for para in self.paras(fileids):
@@ -189,9 +307,16 @@ class FilteredPlaintextCorpusReader(PlaintextCorpusReader, CorpusReader):
         :param fileids:
         :return: a generator of paragraphs
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('paras', fileids)
+            return
         if not fileids:
             fileids = self.fileids()
-        for para in super().paras(fileids):
+        if self.token_cache is None:
+            paras = super().paras(fileids)
+        else:
+            paras = self._tokenized_paras(fileids)
+        for para in paras:
             flat_para = flatten(para)
             skip = False
             if self.skip_keywords:
@@ -207,9 +332,16 @@ class FilteredPlaintextCorpusReader(PlaintextCorpusReader, CorpusReader):
         :param fileids:
         :return: a generator of sentences
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('sents', fileids)
+            return
         if not fileids:
             fileids = self.fileids()
-        for sent in super().sents(fileids):
+        if self.token_cache is None:
+            sents = super().sents(fileids)
+        else:
+            sents = (sent for para in self._tokenized_paras(fileids) for sent in para)
+        for sent in sents:
             skip = False
             if self.skip_keywords:
                 for keyword in self.skip_keywords:
@@ -223,6 +355,9 @@ class FilteredPlaintextCorpusReader(PlaintextCorpusReader, CorpusReader):
         Returns the complete text of an Text document, closing the document
         after we are done reading it and yielding it in a memory safe fashion.
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('docs', fileids)
+            return
         if not fileids:
             fileids = self.fileids()
         # Create a generator, loading one document into memory at a time.
@@ -258,7 +393,7 @@ class FilteredPlaintextCorpusReader(PlaintextCorpusReader, CorpusReader):
             yield sent
 
 
-class JsonfileCorpusReader(CorpusReader):
+class JsonfileCorpusReader(ParallelReaderMixin, CorpusReader):
     """
     A corpus reader for Json documents where contents are stored in a dictionary.
     Supports any documents stored under a text key.
@@ -274,7 +409,8 @@ class JsonfileCorpusReader(CorpusReader):
     """
 
     def __init__(self, root, fileids=None, encoding='utf8', skip_keywords=None,
-                 target_language=None, paragraph_separator='\n\n', **kwargs):
+                 target_language=None, paragraph_separator='\n\n', token_cache=None, workers=1,
+                 **kwargs):
         """
         :param root: The file root of the corpus directory
         :param fileids: the list of file ids to consider, or wildcard expression
@@ -284,6 +420,9 @@ class JsonfileCorpusReader(CorpusReader):
          translations, we expect these files to be named ...english.json -- if not, pass in fileids
         :param paragraph_separator: character sequence demarcating paragraph separation
         :param encoding: utf8
+        :param token_cache: directory in which to cache the tokenization of each file, which is
+        then only redone when the file or the tokenizers change; None to tokenize on every read
+        :param workers: number of processes in which to read files; -1 for one per CPU
         :param kwargs: Any values to be passed to NLTK super classes, such as sent_tokenizer,
         word_tokenizer.
         """
@@ -301,6 +440,55 @@ class JsonfileCorpusReader(CorpusReader):
             self._word_tokenizer = kwargs['word_tokenizer']
         self.skip_keywords = skip_keywords
         self.paragraph_separator = paragraph_separator
+        self.workers = workers
+        self.token_cache = None
+        if token_cache:
+            self.token_cache = TokenCache(token_cache, type(self).__name__, self._sent_tokenizer,
+                                          self._word_tokenizer)
+
+    @staticmethod
+    def _recurse_to_strings(my_dict: Dict[str, Any]) -> List[str]:
+        """Internal accumulator method."""
+        vals = []  # type: List[str]
+        m_keys = sorted(list(my_dict.keys()))
+        for mkey in m_keys:
+            if isinstance(my_dict[mkey], dict):
+                vals += JsonfileCorpusReader._recurse_to_strings(my_dict[mkey])
+            else:
+                vals += [my_dict[mkey]]
+        return vals
+
+    def _skip(self, text_part: str) -> bool:
+        """Return whether a text part contains any of the skip keywords."""
+        if self.skip_keywords:
+            for keyword in self.skip_keywords:
+                if keyword in text_part:
+                    return True
+        return False
+
+    def _tokenize_file(self, path, encoding):
+        """Tokenize a file for the token cache; paragraphs keep their unstripped text."""
+        with codecs.open(path, 'r', encoding=encoding) as reader:
+            the_doc = json.loads(reader.read())
+        paras = []
+        for text_part in self._recurse_to_strings(the_doc['text']):
+            sentences = self._sent_tokenizer.tokenize(text_part.strip())
+            paras.append((text_part, [(sentence, list(self._word_tokenizer.tokenize(sentence)))
+                                      for sentence in sentences]))
+        return paras
+
+    def _tokenized_paras(self, fileids=None):
+        """
+        Provide the paragraphs of files from the token cache, skipping any flagged by keywords
+        :param fileids:
+        :return: a generator of paragraphs, as pairs of their unstripped text and a list of
+        (sentence, words) pairs
+        """
+        for path, encoding in self.abspaths(fileids, include_encoding=True):
+            for text_part, sents in self.token_cache.get(path, partial(self._tokenize_file,
+                                                                       encoding=encoding)):
+                if not self._skip(text_part):
+                    yield text_part, sents
 
     def words(self, fileids=None) -> Generator[str, str, None]:
         """
@@ -309,6 +497,14 @@ class JsonfileCorpusReader(CorpusReader):
         :param fileids:
         :return: words, including punctuation, one by one
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('words', fileids)
+            return
+        if self.token_cache is not None:
+            for _, sents in self._tokenized_paras(fileids):
+                for _, words in sents:
+                    yield from words
+            return
         for sentence in self.sents(fileids):
             words = self._word_tokenizer.tokenize(sentence)
             for word in words:
@@ -319,6 +515,14 @@ class JsonfileCorpusReader(CorpusReader):
         :param fileids:
         :return: A generator of sentences
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('sents', fileids)
+            return
+        if self.token_cache is not None:
+            for _, sents in self._tokenized_paras(fileids):
+                for sentence, _ in sents:
+                    yield sentence
+            return
         for para in self.paras(fileids):
             sentences = self._sent_tokenizer.tokenize(para)
             for sentence in sentences:
@@ -331,28 +535,18 @@ class JsonfileCorpusReader(CorpusReader):
         and section subkey
         :return: a generator of paragraphs
         """
-
-        def _recurse_to_strings(my_dict: Dict[str, Any]) -> List[str]:
-            """Internal accumulator method."""
-            vals = []  # type: List[str]
-            m_keys = sorted(list(my_dict.keys()))
-            for mkey in m_keys:
-                if isinstance(my_dict[mkey], dict):
-                    vals += _recurse_to_strings(my_dict[mkey])
-                else:
-                    vals += [my_dict[mkey]]
-            return vals
-
+        if self._parallel(fileids):
+            yield from self._read_parallel('paras', fileids)
+            return
+        if self.token_cache is not None:
+            for text_part, _ in self._tokenized_paras(fileids):
+                yield text_part.strip()
+            return
         for doc in self.docs(fileids):
-            text_data = _recurse_to_strings(doc['text'])  # type: List[str]
+            text_data = self._recurse_to_strings(doc['text'])  # type: List[str]
             text_sections = []  # type: List[str]
             for text_part in text_data:
-                skip = False
-                if self.skip_keywords:
-                    for keyword in self.skip_keywords:
-                        if keyword in text_part:
-                            skip = True
-                if not skip:
+                if not self._skip(text_part):
                     text_sections.append(text_part)
             for para in text_sections:
                 yield para.strip()
@@ -364,6 +558,9 @@ class JsonfileCorpusReader(CorpusReader):
         :return : Python Dictionary of strings or Nested Dictionaries. The top level dictionary
         also contains the filename from which it spawned.
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('docs', fileids)
+            return
         # Create a generator, loading one document into memory at a time.
         for path, encoding in self.abspaths(fileids, include_encoding=True):
             with codecs.open(path, 'r', encoding=encoding) as reader:
@@ -390,11 +587,11 @@ class JsonfileCorpusReader(CorpusReader):
 
 
 # WRITE DOCSTRING
-class TesseraeCorpusReader(PlaintextCorpusReader):
+class TesseraeCorpusReader(ParallelReaderMixin, PlaintextCorpusReader):
     """
     """
 
-    def __init__(self, root, fileids=None, encoding='utf8', skip_keywords=None,
+    def __init__(self, root, fileids=None, encoding='utf8', skip_keywords=None, workers=1,
                  **kwargs):
         """
         :param root: The file root of the corpus directory
@@ -402,6 +599,7 @@ class TesseraeCorpusReader(PlaintextCorpusReader):
         :param skip_keywords: a list of words which indicate whole paragraphs that should
         be skipped by the paras and words methods()
         :param encoding: utf8
+        :param workers: number of processes in which to read files; -1 for one per CPU
         :param kwargs: Any values to be passed to NLTK super classes, such as sent_tokenizer,
         word_tokenizer.
         """
@@ -414,12 +612,16 @@ class TesseraeCorpusReader(PlaintextCorpusReader):
             self._word_tokenizer = kwargs['word_tokenizer']
         if 'pos_tagger' in kwargs:
             self.pos_tagger = kwargs['pos_tagger']
+        self.workers = workers
 
     def docs(self: object, fileids: str):
         """
         Returns the complete text of a .tess file, closing the document after
         we are done reading it and yielding it in a memory-safe fashion.
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('docs', fileids)
+            return
 
         for path, encoding in self.abspaths(fileids, include_encoding=True):
             with codecs.open(path, 'r', encoding=encoding) as f:
@@ -443,6 +645,9 @@ class TesseraeCorpusReader(PlaintextCorpusReader):
         NB: Most .tess files do not have this feature; only the Homeric poems
         from what I have noticed so far. Perhaps a feature worth looking into.
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('paras', fileids)
+            return
 
         for text in self.texts(fileids):
             for para in text.split('\n\n'):
@@ -462,6 +667,9 @@ class TesseraeCorpusReader(PlaintextCorpusReader):
         """
         Tokenizes documents in the corpus by sentence
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('sents', fileids)
+            return
 
         for para in self.paras(fileids):
             for sent in sent_tokenize(para):
@@ -471,6 +679,9 @@ class TesseraeCorpusReader(PlaintextCorpusReader):
         """
         Tokenizes documents in the corpus by word
         """
+        if self._parallel(fileids):
+            yield from self._read_parallel('words', fileids)
+            return
         for sent in self.sents(fileids):
             for token in word_tokenize(sent):
                 yield token
@@ -0,0 +1,236 @@
+"""On-disk cache of the tokenization of corpus files, for corpus readers.
+
+Corpus readers tokenize each file into paragraphs, sentences, and words
+every time it is read, which dominates the cost of repeated passes over a
+corpus. A ``TokenCache`` stores the result for each file in a binary file,
+named after the file's path and the identity of the tokenizers, and valid
+for as long as the file's mtime and size are unchanged; later passes read
+it with ``mmap`` instead of tokenizing again.
+
+A tokenized file is a list of paragraphs, each a pair of its text (or
+None) and its sentences, each a pair of its text (or None) and its words:
+
+    >>> paras = [('Gallia est omnis divisa.', [('Gallia est omnis divisa.', ['Gallia', 'est', 'omnis', 'divisa', '.'])])]
+
+Binary file layout (all integers little-endian):
+
+* header: magic, mtime and size of the source file, digest of the cache
+  key, whether texts are stored, and the number of paragraphs, sentences
+  and words
+* ``paras + 1`` uint32s: index of the first sentence of each paragraph
+* ``sents + 1`` uint32s: index of the first word of each sentence
+* if texts are stored, ``paras + 1`` and ``sents + 1`` uint32s: character
+  offsets of paragraph and sentence texts in the string blob
+* ``words + 1`` uint32s: character offsets of words in the string blob
+* string blob: UTF-8 paragraph texts, sentence texts, and words, one after
+  the other
+"""
+
+from array import array
+from hashlib import md5
+from itertools import accumulate, chain
+import inspect
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Any, Callable, List, Optional, Tuple
+
+import cltk
+from cltk.utils.binary_data import OFFSET_SIZE, OFFSET_TYPE
+from cltk.utils.cltk_logger import logger
+
+__license__ = 'MIT License. See LICENSE.'
+
+
+MAGIC = b'CLTKTOK1'
+HEADER = struct.Struct('<8sdQ16s?QQQ')
+SUFFIX = '.cltktok'
+
+Sentence = Tuple[Optional[str], List[str]]
+Paragraph = Tuple[Optional[str], List[Sentence]]
+
+
+def tokenizer_identity(tokenizer: Any) -> str:
+    """Return a string identifying a tokenizer, for cache keys: its class
+    (or, for a function, its name) with its str, number, and bool attributes,
+    e.g. language, and the class names of its other attributes.
+    :param tokenizer: Tokenizer object or function
+    :rtype: str
+    """
+    if inspect.isroutine(tokenizer):
+        return '{}.{}'.format(tokenizer.__module__, tokenizer.__qualname__)
+    kind = type(tokenizer)
+    parts = ['{}.{}'.format(kind.__module__, kind.__qualname__)]
+    for name, value in sorted(vars(tokenizer).items()):
+        if value is None or isinstance(value, (str, int, float, bool)):
+            parts.append('{}={!r}'.format(name, value))
+        else:
+            parts.append('{}:{}'.format(name, type(value).__qualname__))
+    return '({})'.format(', '.join(parts))
+
+
+def _offsets(buffer, start: int, length: int) -> List[int]:
+    """Return the uint32 array of length stored at start."""
+    offsets = array(OFFSET_TYPE, buffer[start:start + length * OFFSET_SIZE])
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    return offsets.tolist()
+
+
+def _offsets_bytes(lengths) -> bytes:
+    """Return the uint32 array of running totals of lengths, from 0."""
+    offsets = array(OFFSET_TYPE, accumulate(chain([0], lengths)))
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    return offsets.tobytes()
+
+
+def write_tokenized(path: str, paras: List[Paragraph], source_stat: Tuple[float, int],
+                    key_digest: bytes):
+    """Write a tokenized file to a binary file for ``read_tokenized()``,
+    under a temporary name first, so that readers never see a partial file.
+    :param path: Path of binary file
+    :param paras: Tokenized file, as a list of (text, sentences) pairs
+    :param source_stat: mtime and size of the tokenized file
+    :param key_digest: md5 digest of the cache key
+    """
+    sents = [sent for _, para_sents in paras for sent in para_sents]
+    words = [word for _, sent_words in sents for word in sent_words]
+    with_texts = any(text is not None for text, _ in chain(paras, sents))
+    para_texts = [text or '' for text, _ in paras] if with_texts else []
+    sent_texts = [text or '' for text, _ in sents] if with_texts else []
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as file_open:
+        try:
+            file_open.write(HEADER.pack(MAGIC, source_stat[0], source_stat[1], key_digest,
+                                        with_texts, len(paras), len(sents), len(words)))
+            file_open.write(_offsets_bytes(len(para_sents) for _, para_sents in paras))
+            file_open.write(_offsets_bytes(len(sent_words) for _, sent_words in sents))
+            strings = para_texts + sent_texts + words
+            char_offsets = _offsets_bytes(map(len, strings))
+            if with_texts:
+                file_open.write(char_offsets[:(len(paras) + 1) * OFFSET_SIZE])
+                # Sentence offsets run on from the end of paragraph texts
+                file_open.write(char_offsets[len(paras) * OFFSET_SIZE:
+                                             (len(paras) + len(sents) + 1) * OFFSET_SIZE])
+            file_open.write(char_offsets[(len(para_texts) + len(sent_texts)) * OFFSET_SIZE:])
+            file_open.write(''.join(strings).encode('utf-8'))
+        except BaseException:
+            os.remove(file_open.name)
+            raise
+    os.chmod(file_open.name, 0o644)
+    os.replace(file_open.name, path)
+
+
+def read_tokenized(path: str, source_stat: Tuple[float, int],
+                   key_digest: bytes) -> Optional[List[Paragraph]]:
+    """Return a tokenized file from a binary file written by
+    ``write_tokenized()``, or None if it is missing, unreadable, or was made
+    from another version of the file or with another key.
+    :param path: Path of binary file
+    :param source_stat: mtime and size the tokenized file should have
+    :param key_digest: md5 digest the cache key should have
+    :rtype: list
+    """
+    try:
+        with open(path, 'rb') as file_open:
+            buffer = mmap.mmap(file_open.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # ValueError: empty file
+        return None
+    try:
+        magic, mtime, size, digest, with_texts, n_paras, n_sents, n_words = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or (mtime, size) != tuple(source_stat) or digest != key_digest:
+            return None
+        start = HEADER.size
+        para_sents = _offsets(buffer, start, n_paras + 1)
+        start += (n_paras + 1) * OFFSET_SIZE
+        sent_words = _offsets(buffer, start, n_sents + 1)
+        start += (n_sents + 1) * OFFSET_SIZE
+        if with_texts:
+            para_chars = _offsets(buffer, start, n_paras + 1)
+            start += (n_paras + 1) * OFFSET_SIZE
+            sent_chars = _offsets(buffer, start, n_sents + 1)
+            start += (n_sents + 1) * OFFSET_SIZE
+        word_chars = _offsets(buffer, start, n_words + 1)
+        start += (n_words + 1) * OFFSET_SIZE
+        strings = buffer[start:].decode('utf-8')
+    except (struct.error, UnicodeDecodeError, ValueError) as error:
+        logger.warning("Ignoring unreadable token cache '%s': %s", path, error)
+        return None
+    finally:
+        buffer.close()
+
+    words = [strings[word_chars[index]:word_chars[index + 1]] for index in range(n_words)]
+    sents = []  # type: List[Sentence]
+    for index in range(n_sents):
+        text = strings[sent_chars[index]:sent_chars[index + 1]] if with_texts else None
+        sents.append((text, words[sent_words[index]:sent_words[index + 1]]))
+    paras = []  # type: List[Paragraph]
+    for index in range(n_paras):
+        text = strings[para_chars[index]:para_chars[index + 1]] if with_texts else None
+        paras.append((text, sents[para_sents[index]:para_sents[index + 1]]))
+    return paras
+
+
+class TokenCache:
+    """Directory of tokenized files, for one tokenization scheme."""
+
+    def __init__(self, directory: str, *key_parts: Any):
+        """
+        :param directory: Directory of the cache; created if needed
+        :param key_parts: Tokenizers, and anything else on which the
+        tokenization depends; tokenizers are identified with
+        ``tokenizer_identity()``, other values with ``repr()``
+        """
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        key = [cltk.__version__]
+        for part in key_parts:
+            if isinstance(part, (str, int, float, bool, tuple, list)) or part is None:
+                key.append(repr(part))
+            else:
+                key.append(tokenizer_identity(part))
+        self.key = '\n'.join(key)
+        self.key_digest = md5(self.key.encode('utf-8')).digest()
+
+    def cache_path(self, path: str) -> str:
+        """Return the path of the cached tokenization of a file."""
+        name = md5(os.path.abspath(path).encode('utf-8') + self.key_digest).hexdigest()
+        return os.path.join(self.directory, name + SUFFIX)
+
+    def get(self, path: str, tokenize: Callable[[str], List[Paragraph]]) -> List[Paragraph]:
+        """Return the tokenization of a file, from the cache if it is
+        current, else by calling tokenize and storing its result.
+        :param path: Path of file
+        :param tokenize: Callable taking path and returning the tokenized file
+        :rtype: list
+        """
+        stat = os.stat(path)
+        source_stat = (stat.st_mtime, stat.st_size)
+        cache_path = self.cache_path(path)
+        paras = read_tokenized(cache_path, source_stat, self.key_digest)
+        if paras is not None:
+            return paras
+        paras = tokenize(path)
+        try:
+            write_tokenized(cache_path, paras, source_stat, self.key_digest)
+        except OSError as os_error:
+            logger.warning("Could not write token cache '%s': %s", cache_path, os_error)
+        return paras
+
+    def clear(self) -> int:
+        """Remove all cached files from the directory, whatever their key.
+        :return: Number of files removed
+        :rtype: int
+        """
+        names = [name for name in os.listdir(self.directory) if name.endswith(SUFFIX)]
+        for name in names:
+            os.remove(os.path.join(self.directory, name))
+        return len(names)
+
+    def __repr__(self):
+        return '<{}: {}>'.format(type(self).__name__, self.directory)
@@ -7,7 +7,6 @@ __author__ = ['Kyle P. Johnson <kyle@kyle-p-johnson.com>', 'Stephen Margheim <st
               'Natasha Voake <natashavoake@gmail.com>']
 __license__ = 'MIT License. See LICENSE.'
 
-from builtins import bytes
 from cltk.corpus.greek.tlg_index import TLG_INDEX
 from cltk.corpus.greek.tlg_index import TLG_WORKS_INDEX
 from cltk.corpus.latin.phi5_index import PHI5_INDEX
@@ -82,38 +81,84 @@ def remove_non_latin(input_string, also_keep=None):
     return no_latin
 
 
+# Compiled once, for the cleanup functions below
+TLG_REMOVE = regex.compile(r'-\n|«|»|<|>|\.\.\.|‘|’|_|{.+?}|\(.+?\)|[a-zA-Z0-9]', flags=regex.VERSION1)
+# Note: rming all characters between {} and ()
+PHI5_REMOVE = regex.compile(r'-\n|«|»|\<|\>|\.\.\.|‘|’|_|{.+?}|\(.+?\)|\(|\)|“|#|%|⚔|&|=|/|\\|〚|†|『|⚖|–|˘|⚕|☾|◌|◄|►|⌐|⌊|⌋|≈|∷|≈|∞|”|[0-9]')
+WHITESPACE = regex.compile(r'\s+')
+
+# Translation tables deleting punctuation, by value of rm_periods
+TLG_PUNCTUATION = {
+    False: str.maketrans('', '', ',·:"\'?-!*[]{}'),
+    True: str.maketrans('', '', ',·:"\'?-!*[]{}.;'),
+}
+# Including the combining acute accents made by TLGU
+PHI5_PUNCTUATION = {
+    False: str.maketrans('', '', ',;:"\'?-!*[]{}\u0301'),
+    True: str.maketrans('', '', ',;:"\'?-!*[]{}\u0301.'),
+}
+
+
+def _plaintext_cleanup(text, remove_comp, punctuation):
+    """Remove the matches of remove_comp, then the characters deleted by the
+    translation table punctuation (if any), then collapse whitespace
+    (including line breaks) to single spaces.
+    """
+    text = remove_comp.sub('', text)
+    if punctuation is not None:
+        text = text.translate(punctuation)
+    return WHITESPACE.sub(' ', text)
+
+
+def _plaintext_cleanup_stream(file_open, remove_comp, punctuation, chunk_size):
+    """Yield the cleaned text of a file object, chunk by chunk. Chunks are
+    cut after line breaks, which none of the removed patterns but '-\\n'
+    span, and whitespace is collapsed across the cuts; the chunks joined
+    are the same as the whole text cleaned at once.
+    """
+    parts = []
+    at_space = False
+    while True:
+        chunk = file_open.read(chunk_size)
+        if chunk:
+            cut = chunk.rfind('\n') + 1
+            if not cut:
+                # Joined once, when a line break is read, not for each chunk
+                parts.append(chunk)
+                continue
+            parts.append(chunk[:cut])
+            text = ''.join(parts)
+            parts = [chunk[cut:]]
+        else:
+            text = ''.join(parts)
+        cleaned = _plaintext_cleanup(text, remove_comp, punctuation)
+        if at_space and cleaned.startswith(' '):
+            cleaned = cleaned[1:]
+        if cleaned:
+            at_space = cleaned.endswith(' ')
+            yield cleaned
+        if not chunk:
+            return
+
+
 def tlg_plaintext_cleanup(text, rm_punctuation=False, rm_periods=False):
     """Remove and substitute post-processing for Greek TLG text.
     TODO: Surely more junk to pull out. Please submit bugs!
     TODO: {.+?}|\(.+?\) working?
-    TODO: This is a rather slow now, help in speeding up welcome.
     """
-    remove_comp = regex.compile(r'-\n|«|»|<|>|\.\.\.|‘|’|_|{.+?}|\(.+?\)|[a-zA-Z0-9]', flags=regex.VERSION1)
-    text = remove_comp.sub('', text)
+    punctuation = TLG_PUNCTUATION[bool(rm_periods)] if rm_punctuation else None
+    return _plaintext_cleanup(text, TLG_REMOVE, punctuation)
 
-    new_text = None
-    if rm_punctuation:
-        new_text = ''
-        punctuation = [',', '·', ':', '"', "'", '?', '-', '!', '*', '[', ']', '{', '}']
-        if rm_periods:
-            punctuation += ['.', ';']
-        for char in text:
-            # second try at rming some punctuation; merge with above regex
-            if char in punctuation:
-                pass
-            else:
-                new_text += char
-    if new_text:
-        text = new_text
-
-    # replace line breaks w/ space
-    replace_comp = regex.compile(r'\n')
-    text = replace_comp.sub(' ', text)
-
-    comp_space = regex.compile(r'\s+')
-    text = comp_space.sub(' ', text)
 
-    return text
+def tlg_plaintext_cleanup_stream(file_open, rm_punctuation=False, rm_periods=False,
+                                 chunk_size=2 ** 20):
+    """Yield ``tlg_plaintext_cleanup()`` of a file object's text in chunks,
+    without reading all of it into memory.
+    :param file_open: File object opened in text mode
+    :param chunk_size: Number of characters to read at a time
+    """
+    punctuation = TLG_PUNCTUATION[bool(rm_periods)] if rm_punctuation else None
+    return _plaintext_cleanup_stream(file_open, TLG_REMOVE, punctuation, chunk_size)
 
 
 def cltk_normalize(text, compatibility=True):
@@ -126,40 +171,20 @@ def cltk_normalize(text, compatibility=True):
 def phi5_plaintext_cleanup(text, rm_punctuation=False, rm_periods=False):
     """Remove and substitute post-processing for Greek PHI5 text.
     TODO: Surely more junk to pull out. Please submit bugs!
-    TODO: This is a rather slow now, help in speeding up welcome.
     """
-    # This works OK, doesn't get some
-    # Note: rming all characters between {} and ()
-    remove_comp = regex.compile(r'-\n|«|»|\<|\>|\.\.\.|‘|’|_|{.+?}|\(.+?\)|\(|\)|“|#|%|⚔|&|=|/|\\|〚|†|『|⚖|–|˘|⚕|☾|◌|◄|►|⌐|⌊|⌋|≈|∷|≈|∞|”|[0-9]')
-    text = remove_comp.sub('', text)
+    punctuation = PHI5_PUNCTUATION[bool(rm_periods)] if rm_punctuation else None
+    return _plaintext_cleanup(text, PHI5_REMOVE, punctuation)
 
-    new_text = None
-    if rm_punctuation:
-        new_text = ''
-        punctuation = [',', ';', ':', '"', "'", '?', '-', '!', '*', '[', ']', '{', '}']
-        if rm_periods:
-            punctuation += ['.']
-        for char in text:
-            # rm acute combining acute accents made by TLGU
-            # Could be caught by regex, tried and failed, not sure why
-            if bytes(char, 'utf-8') == b'\xcc\x81':
-                pass
-            # second try at rming some punctuation; merge with above regex
-            elif char in punctuation:
-                pass
-            else:
-                new_text += char
-    if new_text:
-        text = new_text
-
-    # replace line breaks w/ space
-    replace_comp = regex.compile(r'\n')
-    text = replace_comp.sub(' ', text)
-
-    comp_space = regex.compile(r'\s+')
-    text = comp_space.sub(' ', text)
 
-    return text
+def phi5_plaintext_cleanup_stream(file_open, rm_punctuation=False, rm_periods=False,
+                                  chunk_size=2 ** 20):
+    """Yield ``phi5_plaintext_cleanup()`` of a file object's text in chunks,
+    without reading all of it into memory.
+    :param file_open: File object opened in text mode
+    :param chunk_size: Number of characters to read at a time
+    """
+    punctuation = PHI5_PUNCTUATION[bool(rm_periods)] if rm_punctuation else None
+    return _plaintext_cleanup_stream(file_open, PHI5_REMOVE, punctuation, chunk_size)
 
 
 def assemble_tlg_author_filepaths():
@@ -1,24 +1,34 @@
 """Search CLTK corpora with Whoosh, a Python-language index."""
 
+import html
+import json
 import os
+import threading
 import time
+from typing import Dict, List, Tuple
 
 from whoosh.fields import ID
 from whoosh.fields import Schema
 from whoosh.fields import TEXT
 from whoosh.index import create_in
+from whoosh.index import exists_in
 from whoosh.index import open_dir
 from whoosh.qparser import QueryParser
 
 from cltk.corpus.greek.tlg.id_author import ID_AUTHOR as TLG_AUTHOR_MAP
 from cltk.corpus.latin.phi5_index import PHI5_INDEX as PHI5_AUTHOR_MAP
 from cltk.utils.cltk_logger import logger
+from cltk.utils.file_operations import md5
 
 
 __author__ = ['Kyle P. Johnson <kyle@kyle-p-johnson.com>']
 __license__ = 'MIT License. See LICENSE.'
 
 
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
 class CLTKIndex:
     """Functions sharing the state of an index to be made or already created."""
     def __init__(self, lang, corpus, chunk='author'):
@@ -31,8 +41,76 @@ class CLTKIndex:
         self.index_dir_base = get_cltk_data_dir()
         self.index_dir_base = os.path.join(self.index_dir_base, lang, 'index')
         self.index_path = os.path.join(self.index_dir_base, corpus, chunk)
+        self.manifest_path = os.path.join(self.index_path, MANIFEST_NAME)
+
+        # Corpus to be indexed
+        corpus_dir = 'individual_works' if chunk == 'work' else 'plaintext'
+        self.corpus_path = os.path.join(get_cltk_data_dir(), lang, 'text', corpus, corpus_dir)
+
+        # Searcher kept open across queries, and its lock
+        self._open_searcher = None
+        self._searcher_lock = threading.Lock()
 
-    def index_corpus(self):
+    def _corpus_files(self):
+        """Yield the path and author of each file of the corpus to be indexed.
+        Files not in the author index (i.e., PHI5's ``LAT9999``) are skipped.
+        :rtype: iterator of (str, str)
+        """
+        assert os.path.isdir(self.corpus_path), 'Corpus does not exist in the following location: "%s". Use CLTK Corpus Importer and TLGU to create transformed corpus.' % self.corpus_path  # pylint: disable=line-too-long
+        if self.lang == 'greek' and self.corpus == 'tlg':
+            prefix, corpus_index = 'TLG', TLG_AUTHOR_MAP
+        elif self.lang == 'latin' and self.corpus == 'phi5':
+            prefix, corpus_index = 'LAT', PHI5_AUTHOR_MAP
+        else:
+            raise ValueError("Cannot index corpus '{}' of language '{}'.".format(self.corpus, self.lang))  # pylint: disable=line-too-long
+        files = sorted(f[:-4] for f in os.listdir(self.corpus_path) if f.startswith(prefix))
+        for file in files:
+            # Author files are named eg 'TLG0012.TXT', work files 'TLG0012.TXT-001.TXT'
+            author_id = file if self.chunk == 'author' else file[:-8]
+            if self.lang == 'greek' and self.corpus == 'tlg':
+                author_id = author_id[3:]
+            try:
+                author = corpus_index[author_id]
+            except KeyError as key_error:
+                if file.startswith('LAT9999'):
+                    continue
+                logger.error(key_error)
+                raise
+            yield os.path.join(self.corpus_path, file + '.TXT'), author
+
+    def _read_manifest(self):
+        """Return the files recorded in the manifest of the index, mapping
+        path to (mtime, size, md5); empty if there is no manifest.
+        :rtype: dict
+        """
+        try:
+            with open(self.manifest_path) as file_open:
+                manifest = json.load(file_open)
+        except FileNotFoundError:
+            return {}
+        except ValueError as value_error:
+            logger.warning("Ignoring unreadable index manifest '%s': %s", self.manifest_path, value_error)  # pylint: disable=line-too-long
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+        return {path: tuple(entry) for path, entry in manifest['files'].items()}
+
+    def _write_manifest(self, files):
+        """Write the manifest of the index, under a temporary name first so
+        that an interrupted write does not leave a corrupt manifest.
+        :param files: dict mapping path to (mtime, size, md5)
+        """
+        manifest = {'version': MANIFEST_VERSION,
+                    'lang': self.lang,
+                    'corpus': self.corpus,
+                    'chunk': self.chunk,
+                    'files': files}
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w') as file_open:
+            json.dump(manifest, file_open, indent=1, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def index_corpus(self, procs=1, multisegment=False, incremental=False, limitmb=128):
         """Make a Whoosh index out of a pre-processed corpus, ie TLG, PHI5,
         or PHI7.
 
@@ -46,7 +124,29 @@ class CLTKIndex:
         # And to start indexing:
         >>> # cltk_index.index_corpus()
 
-        TODO: Prevent overwriting. Ask user to rm old dir before re-indexing.
+        # Or, tokenizing in 4 processes, each writing its own segment:
+        >>> # cltk_index.index_corpus(procs=4, multisegment=True)
+
+        # After the corpus has changed, re-index only the changed files:
+        >>> # cltk_index.index_corpus(incremental=True)
+
+        A manifest of the indexed files, with their mtime, size and md5, is
+        written to ``manifest.json`` in the index dir. With
+        ``incremental=True``, files whose mtime and size are unchanged are
+        skipped without being read; files whose md5 is unchanged (e.g.,
+        after being copied) are skipped too; changed and new files are
+        re-indexed, and files no longer in the corpus are deleted from the
+        index. If there is no index or manifest yet, a full index is made.
+
+        :param procs: Number of processes tokenizing documents
+        :param multisegment: With procs > 1, keep each process's segment
+        instead of merging them into one at the end; faster to write, slower
+        to search until the index is next optimized
+        :param incremental: Update an existing index instead of recreating it
+        :param limitmb: Max memory, in MB, used by each process's pool
+        :return: Number of documents added or updated, and deleted
+        :rtype: tuple
+
         TODO: Add option for lemmatizing.
         TODO: Add for figure out lower() options.
         TODO: Process TLG through forthcoming normalize().
@@ -54,95 +154,145 @@ class CLTKIndex:
         TODO: Turn off any language-specific mods (eg, stemming, case) that
         Whoosh might be doing by default.
         """
-
-        # Setup index dir
-        schema = Schema(path=ID(stored=True),
-                        author=TEXT(stored=True),
-                        content=TEXT)
-        try:
-            _index = create_in(self.index_path, schema)
-        except FileNotFoundError:
-            os.makedirs(self.index_path)
+        files = list(self._corpus_files())
+        manifest = {}  # type: Dict[str, Tuple[float, int, str]]
+        if incremental and exists_in(self.index_path):
+            manifest = self._read_manifest()
+            if not manifest:
+                # The documents already in the index are unknown, so it is recreated
+                logger.warning("No manifest found for index '%s', re-indexing all documents.", self.index_path)  # pylint: disable=line-too-long
+        elif incremental:
+            logger.info("No index found at '%s', indexing all documents.", self.index_path)
+        if manifest:
+            _index = open_dir(self.index_path)
+        else:
+            # Setup index dir; character offsets of terms are stored for snippets
+            schema = Schema(path=ID(stored=True, unique=True),
+                            author=TEXT(stored=True),
+                            content=TEXT(chars=True))
+            os.makedirs(self.index_path, exist_ok=True)
             _index = create_in(self.index_path, schema)
-        writer = _index.writer()
-
-        # Setup corpus to be indexed
-        if self.lang == 'greek' and self.corpus == 'tlg':
-            corpus_path = os.path.normpath(get_cltk_data_dir() + '/greek/text/tlg/plaintext/')
-            if self.chunk == 'work':
-                corpus_path = os.path.normpath(get_cltk_data_dir() + '/greek/text/tlg/individual_works/')
-        elif self.lang == 'latin' and self.corpus == 'phi5':
-            corpus_path = os.path.normpath(get_cltk_data_dir() + '/latin/text/phi5/plaintext/')
-            if self.chunk == 'work':
-                corpus_path = os.path.normpath(get_cltk_data_dir() + '/latin/text/phi5/individual_works/')
-        assert os.path.isdir(corpus_path), 'Corpus does not exist in the following location: "%s". Use CLTK Corpus Importer and TLGU to create transformed corpus.' % corpus_path  # pylint: disable=line-too-long
-
-        files = os.listdir(corpus_path)
-        if self.lang == 'greek' and self.corpus == 'tlg':
-            files = [f[:-4] for f in files if f.startswith('TLG')]
-            corpus_index = TLG_AUTHOR_MAP
-        elif self.lang == 'latin' and self.corpus == 'phi5':
-            files = [f[:-4] for f in files if f.startswith('LAT')]
-            corpus_index = PHI5_AUTHOR_MAP
+        writer = _index.writer(procs=procs, multisegment=multisegment, limitmb=limitmb)
 
         time_0 = time.time()
         logger.info("Commencing indexing of %s documents of '%s' corpus." % (len(files), self.corpus))  # pylint: disable=line-too-long
         logger.info('Index will be written to: "%s".' % self.index_path)
-        if self.chunk == 'author':
-            for count, file in enumerate(files, 1):
-
-                try:
-                    if self.lang == 'greek' and self.corpus == 'tlg':
-                        file = file[3:]
-                        author = corpus_index[file]
-                        path = os.path.join(corpus_path, 'TLG' + file + '.TXT')
-                    if self.lang == 'latin' and self.corpus == 'phi5':
-                        author = corpus_index[file]
-                        path = os.path.join(corpus_path, file + '.TXT')
-                except KeyError as key_error:
-                    if file.startswith('LAT9999'):
-                        continue
-                    logger.error(key_error)
-                    raise
+        new_manifest = {}
+        indexed = 0
+        try:
+            for count, (path, author) in enumerate(files, 1):
+                stat = os.stat(path)
+                entry = manifest.get(path)
+                if entry and entry[:2] == (stat.st_mtime, stat.st_size):
+                    new_manifest[path] = entry
+                    continue
+                digest = md5(path)
+                new_manifest[path] = (stat.st_mtime, stat.st_size, digest)
+                if entry and entry[2] == digest:
+                    continue
+                if entry:
+                    writer.delete_by_term('path', path)
 
                 with open(path) as file_open:
                     content = file_open.read()
                 writer.add_document(path=path,
                                     author=author,
                                     content=content)
+                indexed += 1
 
                 if count % 100 == 0:
                     logger.info('Indexed doc %s.' % count)
 
-        if self.chunk == 'work':
-            for count, file in enumerate(files, 1):
-                try:
-                    if self.lang == 'greek' and self.corpus == 'tlg':
-                        path = os.path.join(corpus_path, file + '.TXT')
-                        author = corpus_index[file[3:-8]]
-                    if self.lang == 'latin' and self.corpus == 'phi5':
-                        path = os.path.join(corpus_path, file + '.TXT')
-                        author = corpus_index[file[:-8]]
-                except KeyError as key_error:
-                    if file.startswith('LAT9999'):
-                        continue
-                    logger.error(key_error)
-                    raise
-
-                with open(path) as file_open:
-                    content = file_open.read()
-
-                writer.add_document(path=path,
-                                    author=author,
-                                    content=content)
-                if count % 100 == 0:
-                    logger.info('Indexed doc %s.' % count)
+            removed = [path for path in manifest if path not in new_manifest]
+            for path in removed:
+                writer.delete_by_term('path', path)
+        except BaseException:
+            writer.cancel()
+            raise
         logger.info('Commencing to commit changes.')
         writer.commit()
+        self._write_manifest(new_manifest)
 
         time_1 = time.time()
         elapsed = time_1 - time_0
-        logger.info('Finished indexing all documents in %s seconds (averaging %s docs per sec.)' % (elapsed, (len(files) / elapsed)))  # pylint: disable=line-too-long
+        logger.info('Finished indexing %s documents, deleting %s, in %s seconds.' % (indexed, len(removed), elapsed))  # pylint: disable=line-too-long
+        return indexed, len(removed)
+
+    def _searcher(self):
+        """Return a searcher of the index, kept open across the queries of
+        this CLTKIndex and refreshed once the index is next committed to.
+        :rtype: whoosh.searching.Searcher
+        """
+        with self._searcher_lock:
+            if self._open_searcher is None:
+                self._open_searcher = open_dir(self.index_path).searcher()
+            elif not self._open_searcher.up_to_date():
+                # Closes the segments the new searcher does not reuse
+                self._open_searcher = self._open_searcher.refresh()
+            return self._open_searcher
+
+    def close(self):
+        """Close the searcher kept open across queries, if any."""
+        with self._searcher_lock:
+            if self._open_searcher is not None:
+                self._open_searcher.close()
+                self._open_searcher = None
+
+    def corpus_query_page(self, query, pagenum=1, pagelen=20, window_size=300,
+                          surround_size=50, top=10):
+        """Return one page of the documents matching a query.
+
+        >>> # cltk_index = CLTKIndex('latin', 'phi5')
+        >>> # total, hits = cltk_index.corpus_query_page('amicitia', pagenum=2)
+
+        :param query: Query, in Whoosh's query language
+        :param pagenum: Number of the page, starting at 1
+        :param pagelen: Number of documents per page
+        :param window_size: Max number of characters of a snippet, before
+        adding surround_size
+        :param surround_size: Number of characters of context before and
+        after the matches of a snippet
+        :param top: Max number of snippets per document; None for all
+        :return: Total number of matching documents, and list of SearchHit
+        :rtype: tuple
+        """
+        searcher = self._searcher()
+        _query = QueryParser('content', searcher.schema).parse(query)
+        results = searcher.search_page(_query, pagenum, pagelen=pagelen, terms=True)
+        field = searcher.schema['content']
+        hits = []
+        for hit in results:
+            terms = sorted(text.decode('utf-8') for fieldname, text in hit.matched_terms()
+                           if fieldname == 'content')
+            path = hit['path']
+            if field.format.supports('characters'):
+                offsets = _posting_offsets(searcher, hit.docnum, terms)
+            else:
+                # Indexes made before character offsets were stored
+                offsets = _analyzer_offsets(field, path, terms)
+            snippets = _snippets(path, offsets, window_size, surround_size, top)
+            hits.append(SearchHit(hit['author'], path, hit.rank, hit.score, terms,
+                                  offsets, snippets))
+        return results.total, hits
+
+    def corpus_query_iter(self, query, pagenum=1, pagelen=20, window_size=300,
+                          surround_size=50, top=10):
+        """Yield the documents matching a query, best first, fetching
+        pagelen documents at a time. See ``corpus_query_page()``.
+
+        >>> # cltk_index = CLTKIndex('latin', 'phi5')
+        >>> # for hit in cltk_index.corpus_query_iter('amicitia'):
+        >>> #     print(hit.author, hit.path, len(hit.offsets))
+
+        :rtype: iterator of SearchHit
+        """
+        while True:
+            total, hits = self.corpus_query_page(query, pagenum, pagelen, window_size,
+                                                 surround_size, top)
+            yield from hits
+            if pagenum * pagelen >= total or not hits:
+                return
+            pagenum += 1
 
     def corpus_query(self, query, save_file=None, window_size=300, surround_size=50):
         """Send query to a corpus's index. `save_file` is a filename.
@@ -152,41 +302,15 @@ class CLTKIndex:
         >>> # results = cltk_index.corpus_query('amicitia')
 
         """
-        _index = open_dir(self.index_path)
-
-        output_str = ''
-
-        with _index.searcher() as searcher:
-            _query = QueryParser("content", _index.schema).parse(query)
-            results = searcher.search(_query, limit=None)
-            results.fragmenter.charlimit = None
+        hits = list(self.corpus_query_iter(query, pagelen=100, window_size=window_size,
+                                           surround_size=surround_size, top=None))
 
-            # Allow larger fragments
-            results.fragmenter.maxchars = window_size
-            # Show more context before and after
-            results.fragmenter.surround = surround_size
-
-            docs_number = searcher.doc_count_all()
-
-            output_str += 'Docs containing hits: {}.'.format(docs_number) + '</br></br>'
-
-            for hit in results:
-                author = hit['author']
-                filepath = hit['path']
-                output_str += author + '</br>'
-                output_str += filepath + '</br>'
-
-                with open(filepath) as file_open:
-                    file_contents = file_open.read()
-
-                highlights = hit.highlights("content", text=file_contents, top=10000000)
-                lines = highlights.split('\n')
-                #lines_numbers = [l for l in lines]
-                lines_br = '</br>'.join(lines)
-                lines_number_approx = len(lines)
-                output_str += 'Approximate hits: {}.'.format(lines_number_approx) + '</br>'
-
-                output_str += lines_br + '</br></br>'
+        output_str = 'Docs containing hits: {}.'.format(len(hits)) + '</br></br>'
+        for hit in hits:
+            output_str += hit.author + '</br>'
+            output_str += hit.path + '</br>'
+            output_str += 'Approximate hits: {}.'.format(len(hit.offsets)) + '</br>'
+            output_str += '...'.join(hit.snippets).replace('\n', '</br>') + '</br></br>'
 
         if save_file:
             user_dir = os.path.normpath(get_cltk_data_dir() + '/user_data/search')
@@ -202,6 +326,97 @@ class CLTKIndex:
         else:
             return output_str
 
+
+class SearchHit:
+    """A document matching a query of a CLTKIndex."""
+
+    def __init__(self, author, path, rank, score, terms, offsets, snippets):
+        """
+        :param author: str, author of the document
+        :param path: str, path of the document
+        :param rank: int, position of the document in the results, from 0
+        :param score: float
+        :param terms: list of str, the query's terms found in the document, sorted
+        :param offsets: list of (start, end, term number) of each match, in
+        characters, in the order of the document; term number indexes terms
+        :param snippets: list of str, HTML fragments of the document around
+        its first matches, with matches in ``<b class="match termN">``
+        """
+        self.author = author
+        self.path = path
+        self.rank = rank
+        self.score = score
+        self.terms = terms
+        self.offsets = offsets
+        self.snippets = snippets
+
+    def __repr__(self):
+        return '<{}: {} ({} matches)>'.format(type(self).__name__, self.path, len(self.offsets))
+
+
+def _posting_offsets(searcher, docnum, terms):
+    """Return the offsets of terms in a document, read from the character
+    positions stored in the index.
+    :rtype: list of (int, int, int)
+    """
+    offsets = []
+    reader = searcher.reader()
+    for number, term in enumerate(terms):
+        matcher = reader.postings('content', term)
+        matcher.skip_to(docnum)
+        if matcher.is_active() and matcher.id() == docnum:
+            offsets.extend((start, end, number)
+                           for _, start, end in matcher.value_as('characters'))
+    return sorted(offsets)
+
+
+def _analyzer_offsets(field, path, terms):
+    """Return the offsets of terms in a document, found by re-tokenizing it.
+    :rtype: list of (int, int, int)
+    """
+    numbers = {term: number for number, term in enumerate(terms)}
+    with open(path) as file_open:
+        content = file_open.read()
+    return [(token.startchar, token.endchar, numbers[token.text])
+            for token in field.analyzer(content, chars=True, mode='index')
+            if token.text in numbers]
+
+
+def _snippets(path, offsets, window_size, surround_size, top):
+    """Return HTML snippets of a document around its matches. Matches are
+    grouped into snippets of up to window_size characters, and only as much
+    of the document is read as the first top snippets need.
+    :rtype: list of str
+    """
+    windows = []  # type: List[List[Tuple[int, int, int]]]
+    for offset in offsets:
+        if windows and offset[1] - windows[-1][0][0] <= window_size:
+            windows[-1].append(offset)
+        elif top is None or len(windows) < top:
+            windows.append([offset])
+        else:
+            break
+    if not windows:
+        return []
+    with open(path) as file_open:
+        content = file_open.read(windows[-1][-1][1] + surround_size)
+
+    snippets = []
+    for window in windows:
+        position = max(0, window[0][0] - surround_size)
+        parts = []
+        for start, end, number in window:
+            if start < position:  # Overlapping matches
+                continue
+            parts.append(html.escape(content[position:start], quote=False))
+            parts.append('<b class="match term{}">{}</b>'.format(
+                number, html.escape(content[start:end], quote=False)))
+            position = end
+        parts.append(html.escape(content[position:window[-1][1] + surround_size], quote=False))
+        snippets.append(''.join(parts))
+    return snippets
+
+
 if __name__ == '__main__':
     #cltk_index = CLTKIndex('latin', 'phi5')
     #cltk_index = CLTKIndex('latin', 'phi5', chunk='work')
@@ -0,0 +1,318 @@
+"""Positional inverted index of a corpus's files, for narrowing the regex
+searches of ``cltk.ir.query.search_corpus()``.
+
+Every word (``\\w+``) of every file is recorded, casefolded, with the number
+of its file and its character offsets. To search a regex, the words made of
+the literal characters the pattern requires are looked up, as whole words,
+or as prefixes, suffixes or substrings of indexed words, depending on
+whether the pattern fixes their boundaries. Only the files containing the
+rarest of these words are searched; if the length of the pattern's matches
+is bounded, only the text around that word's occurrences is searched. Other
+patterns are searched in every file.
+
+An index dir holds:
+
+* ``meta.json``: version, and path, mtime and size of the files indexed
+* ``terms.cltkmap``: ``MmapDict`` of each word to its first posting and its
+  number of postings
+* ``docs.npy``, ``starts.npy``, ``ends.npy``: the postings, i.e. file number
+  and offsets of every occurrence of a word, sorted by word, file and offset
+
+    >>> index = PositionalIndex.build(paths, positional_index_dir('latin', 'phi5'))  # doctest: +SKIP
+    >>> index.spans(r'\\bamicitia')  # doctest: +SKIP
+"""
+
+import json
+import os
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+import regex
+
+from cltk.utils.binary_data import MmapDict
+from cltk.utils.binary_data import write_mmap_dict
+from cltk.utils.cltk_logger import logger
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+__license__ = 'MIT License. See LICENSE.'
+
+
+POSITIONAL_INDEX_VERSION = 1
+WORD = regex.compile(r'\w+', flags=regex.VERSION1)
+# Longest match around which to search; longer patterns search whole files
+MAX_WIDTH = 10000
+# Files with more occurrences are searched whole, which is then faster
+MAX_SPANS = 1000
+# Words with a greater share of all occurrences do not narrow searches enough
+# to be worth looking up
+MAX_SHARE = 0.25
+# Max number of characters a character may match when ignoring case, eg 'ß' and 'ss'
+CASEFOLD_FACTOR = 3
+# Parsed as literals by sre_parse, but syntax in the regex module (eg, fuzzy
+# matching and set operations)
+_AMBIGUOUS_LITERALS = {ord(char) for char in '{}[]'}
+# Lookarounds and backreferences can see text outside a match's span
+_UNBOUNDED_CONTEXT = regex.compile(r'\(\?<?[=!]|\(\?P=|\\[1-9]|\\g<', flags=regex.VERSION1)
+
+
+def positional_index_dir(lang, corpus):
+    """Return the default dir of the positional index of a corpus."""
+    return os.path.join(get_cltk_data_dir(), lang, 'index', corpus, 'positional')
+
+
+def _run_words(run, starts_word, ends_word):
+    """Yield the words of a run of literal characters of a pattern, with
+    whether each is known to start and end a word of the text.
+    :param run: str
+    :param starts_word: bool, whether the run is preceded by a word boundary
+    :param ends_word: bool, whether the run is followed by a word boundary
+    """
+    for match in WORD.finditer(run):
+        yield (match.group().casefold(),
+               match.start() > 0 or starts_word,
+               match.end() < len(run) or ends_word)
+
+
+def required_words(pattern):
+    """Return the words which every match of a regex contains, i.e. those of
+    the literal characters at its top level. Returns None for patterns which
+    cannot be parsed (eg, using syntax particular to the regex module).
+    :param pattern: str
+    :return: list of (str, bool, bool): casefolded word, and whether the word
+    is known to start and end a word of the matched text
+    :rtype: list or None
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            parsed = sre_parse.parse(pattern)
+    except Exception:  # pylint: disable=broad-except
+        return None
+    words = []  # type: List[Tuple[str, bool, bool]]
+    run = []  # type: List[str]
+    starts_word = False
+    for op, value in parsed:
+        if op is sre_parse.LITERAL:
+            if value in _AMBIGUOUS_LITERALS:
+                return None
+            run.append(chr(value))
+            continue
+        boundary = op is sre_parse.AT and value is not sre_parse.AT_NON_BOUNDARY
+        words.extend(_run_words(''.join(run), starts_word, boundary))
+        run = []
+        starts_word = boundary
+    words.extend(_run_words(''.join(run), starts_word, False))
+    return words
+
+
+def max_width(pattern, case_insensitive=True):
+    """Return the max length of a regex's matches, or None if it is
+    unbounded or the matches depend on text outside them.
+    :rtype: int or None
+    """
+    if _UNBOUNDED_CONTEXT.search(pattern):
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            width = sre_parse.parse(pattern).getwidth()[1]
+    except Exception:  # pylint: disable=broad-except
+        return None
+    if case_insensitive:
+        width *= CASEFOLD_FACTOR
+    if width > MAX_WIDTH:
+        return None
+    return width
+
+
+def _merge_spans(starts, ends, width):
+    """Return the sorted spans of text in which matches of at most width
+    characters, containing one of the given occurrences, start; overlapping
+    spans are merged.
+    :rtype: list of (int, int)
+    """
+    spans = []  # type: List[List[int]]
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        start = max(0, start - width)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    return [(start, end) for start, end in spans]
+
+
+class PositionalIndex:
+    """Memory-mapped index of the words of a set of files, and of their
+    offsets.
+    """
+
+    def __init__(self, directory):
+        """Open an index written by ``build()``.
+        :param directory: str
+        """
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as file_open:
+            meta = json.load(file_open)
+        if meta.get('version') != POSITIONAL_INDEX_VERSION:
+            raise ValueError("Positional index '{}' has version {}, expected {}.".format(
+                directory, meta.get('version'), POSITIONAL_INDEX_VERSION))
+        self.paths = meta['paths']
+        self.stats = [tuple(stat) for stat in meta['stats']]
+        self._numbers = {path: number for number, path in enumerate(self.paths)}
+        self.terms = MmapDict(os.path.join(directory, 'terms.cltkmap'))
+        self.docs = numpy.load(os.path.join(directory, 'docs.npy'), mmap_mode='r')
+        self.starts = numpy.load(os.path.join(directory, 'starts.npy'), mmap_mode='r')
+        self.ends = numpy.load(os.path.join(directory, 'ends.npy'), mmap_mode='r')
+
+    @classmethod
+    def build(cls, paths, directory):
+        """Index the words of files, and write the index to directory.
+        :param paths: iterable of str, paths of files
+        :param directory: str, dir to write the index to
+        :rtype: PositionalIndex
+        """
+        paths = [os.path.abspath(path) for path in paths]
+        vocabulary = {}  # type: Dict[str, int]
+        term_ids, docs, starts, ends = [], [], [], []
+        stats = []
+        for number, path in enumerate(paths):
+            stat = os.stat(path)
+            stats.append((stat.st_mtime, stat.st_size))
+            with open(path) as file_open:
+                text = file_open.read()
+            ids, offsets = [], []
+            for match in WORD.finditer(text):
+                ids.append(vocabulary.setdefault(match.group().casefold(), len(vocabulary)))
+                offsets.append(match.span())
+            term_ids.append(numpy.array(ids, dtype=numpy.uint32))
+            offsets_array = numpy.array(offsets, dtype=numpy.uint32).reshape(-1, 2)
+            starts.append(offsets_array[:, 0])
+            ends.append(offsets_array[:, 1])
+            docs.append(numpy.full(len(ids), number, dtype=numpy.uint32))
+            if (number + 1) % 100 == 0:
+                logger.info('Indexed file %s.', number + 1)
+
+        term_ids_array = numpy.concatenate(term_ids) if term_ids else numpy.empty(0, numpy.uint32)
+        # Stable, so postings of a word stay sorted by file and offset
+        order = numpy.argsort(term_ids_array, kind='stable')
+        counts = numpy.bincount(term_ids_array, minlength=len(vocabulary))
+        firsts = numpy.cumsum(counts) - counts
+        terms = {term: (int(firsts[term_id]), int(counts[term_id]))
+                 for term, term_id in vocabulary.items()}
+
+        os.makedirs(directory, exist_ok=True)
+        for name, arrays in (('docs', docs), ('starts', starts), ('ends', ends)):
+            array = numpy.concatenate(arrays) if arrays else numpy.empty(0, numpy.uint32)
+            numpy.save(os.path.join(directory, name + '.npy'), array[order])
+        write_mmap_dict(os.path.join(directory, 'terms.cltkmap'), terms)
+        # Written last, so that an interrupted build cannot be opened
+        meta = {'version': POSITIONAL_INDEX_VERSION, 'paths': paths, 'stats': stats}
+        with open(os.path.join(directory, 'meta.json'), 'w') as file_open:
+            json.dump(meta, file_open, ensure_ascii=False)
+        logger.info("Indexed %s words of %s files in '%s'.", len(term_ids_array), len(paths), directory)
+        return cls(directory)
+
+    def is_current(self, path):
+        """Return whether a file is indexed, and unchanged since.
+        :rtype: bool
+        """
+        number = self._numbers.get(os.path.abspath(path))
+        if number is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        return self.stats[number] == (stat.st_mtime, stat.st_size)
+
+    def matching_terms(self, word, starts_word=True, ends_word=True):
+        """Yield the indexed words a (casefolded) word of a pattern may be
+        part of: itself, if it is a whole word, else the words it is a
+        prefix, suffix or substring of.
+        :rtype: iterator of str
+        """
+        if starts_word and ends_word:
+            if word in self.terms:
+                yield word
+        elif starts_word:
+            yield from self.terms.keys_with_prefix(word)
+        elif ends_word:
+            yield from (term for term in self.terms if term.endswith(word))
+        else:
+            yield from (term for term in self.terms if word in term)
+
+    def postings(self, terms):
+        """Return the file numbers and offsets of the occurrences of words,
+        sorted by file and offset.
+        :param terms: iterable of str
+        :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        """
+        slices = [slice(first, first + count)
+                  for first, count in (self.terms[term] for term in terms)]
+        if not slices:
+            empty = numpy.empty(0, dtype=numpy.uint32)
+            return empty, empty, empty
+        docs = numpy.concatenate([self.docs[part] for part in slices])
+        starts = numpy.concatenate([self.starts[part] for part in slices])
+        ends = numpy.concatenate([self.ends[part] for part in slices])
+        order = numpy.lexsort((starts, docs))
+        return docs[order], starts[order], ends[order]
+
+    def _rarest_terms(self, words):
+        """Return the indexed words matching the pattern word with the
+        fewest occurrences, and their number. Substrings need a scan of all
+        indexed words, so they are only looked up if no word has a known
+        start.
+        """
+        candidates = [word for word in words if word[1]] or words
+        best_terms, best_count = None, None
+        for word, starts_word, ends_word in candidates:
+            terms = list(self.matching_terms(word, starts_word, ends_word))
+            count = sum(self.terms[term][1] for term in terms)
+            if best_count is None or count < best_count:
+                best_terms, best_count = terms, count
+        return best_terms, best_count
+
+    def spans(self, pattern, case_insensitive=True):
+        """Return where in each indexed file a regex may match: the files
+        containing the rarest word the pattern requires, mapped to the spans
+        of text in which matches may start (those overlapping an occurrence
+        of the word), or to None (for the whole file) if the length of
+        matches is not bounded or the word is frequent in the file. Returns
+        None, so that every file must be searched, if the pattern requires no
+        word, or only words too frequent to narrow the search.
+        :param pattern: str
+        :param case_insensitive: bool, as in ``match_regex()``
+        :rtype: dict or None
+        """
+        words = required_words(pattern)
+        if not words:
+            return None
+        terms, count = self._rarest_terms(words)
+        if count > MAX_SHARE * len(self):
+            return None
+        docs, starts, ends = self.postings(terms)
+        width = max_width(pattern, case_insensitive)
+        spans = {}  # type: Dict[str, Optional[List[Tuple[int, int]]]]
+        boundaries = numpy.flatnonzero(numpy.diff(docs)) + 1
+        for doc_starts, doc_ends, doc in zip(numpy.split(starts, boundaries),
+                                             numpy.split(ends, boundaries),
+                                             docs[numpy.r_[0, boundaries]] if len(docs) else []):
+            path = self.paths[int(doc)]
+            if width is None or len(doc_starts) > MAX_SPANS:
+                spans[path] = None
+            else:
+                spans[path] = _merge_spans(doc_starts, doc_ends, width)
+        return spans
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __repr__(self):
+        return '<{}: {} words of {} files in {}>'.format(
+            type(self).__name__, len(self), len(self.paths), self.directory)
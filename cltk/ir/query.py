@@ -8,33 +8,64 @@ TODO: Add option of outputting to plaintext file.
 TODO: For whatever output, generate statistics on # of matches found, # docs searched.
 """
 
+from functools import lru_cache
+import multiprocessing
 import os
 import string
+from typing import List
 
 from cltk.corpus.greek.tlg_index import TLG_INDEX
 from cltk.corpus.latin.phi5_index import PHI5_INDEX
 from cltk.corpus.utils.formatter import assemble_phi5_author_filepaths
 from cltk.corpus.utils.formatter import assemble_tlg_author_filepaths
+from cltk.ir.positional import PositionalIndex
+from cltk.ir.positional import max_width
+from cltk.ir.positional import positional_index_dir
+from cltk.utils.model_cache import load_model
+from cltk.utils.parallel import imap_bounded
 import regex
 
 __author__ = ['Kyle P. Johnson <kyle@kyle-p-johnson.com>']
 __license__ = 'MIT License. See LICENSE.'
 
 
-def _regex_span(_regex, _str, case_insensitive=True):
+@lru_cache(maxsize=256)
+def _compile(_regex, case_insensitive=True):
+    """Compile a pattern with the flags of ``_regex_span()``, once."""
+    if case_insensitive:
+        flags = regex.IGNORECASE | regex.FULLCASE | regex.VERSION1
+    else:
+        flags = regex.VERSION1
+    return regex.compile(_regex, flags=flags)
+
+
+_max_width = lru_cache(maxsize=256)(max_width)
+
+
+def _regex_span(_regex, _str, case_insensitive=True, spans=None):
     """Return all matches in an input string.
     :rtype : regex.match.span
     :param _regex: A regular expression pattern.
     :param _str: Text on which to run the pattern.
+    :param spans: Sorted, non-overlapping (start, end) offsets between which
+    matches may start, eg from ``PositionalIndex.spans()``; None for all.
+    Ignored for patterns whose matches have no max length (see
+    ``max_width()``).
     """
-    if case_insensitive:
-        flags = regex.IGNORECASE | regex.FULLCASE | regex.VERSION1
-    else:
-        flags = regex.VERSION1
-    comp = regex.compile(_regex, flags=flags)
-    matches = comp.finditer(_str)
-    for match in matches:
-        yield match
+    comp = _compile(_regex, case_insensitive)
+    # Show the pattern as much text after a span as it can examine
+    width = _max_width(_regex, case_insensitive)
+    if spans is None or width is None:
+        yield from comp.finditer(_str)
+        return
+    position = 0
+    for start, end in spans:
+        # Skip matches overlapping the previous span's last match
+        for match in comp.finditer(_str, max(start, position), end + width + 1):
+            if match.start() >= end:
+                break
+            yield match
+            position = match.end()
 
 
 def _sentence_context(match, language='latin', case_insensitive=True):
@@ -150,7 +181,7 @@ def _window_match(match, window=100):
     return snippet
 
 
-def match_regex(input_str, pattern, language, context, case_insensitive=True):
+def match_regex(input_str, pattern, language, context, case_insensitive=True, spans=None):
     """Take input string and a regex pattern, then yield generator of matches
      in desired format.
 
@@ -161,6 +192,7 @@ def match_regex(input_str, pattern, language, context, case_insensitive=True):
     :param pattern:
     :param language:
     :param context: Integer or 'sentence' 'paragraph'
+    :param spans: Parts of input_str to search, as in ``_regex_span()``
     :rtype : str
     """
     if type(context) is str:
@@ -168,7 +200,7 @@ def match_regex(input_str, pattern, language, context, case_insensitive=True):
         assert context in contexts or type(context) is int, 'Available contexts: {}'.format(contexts)
     else:
         context = int(context)
-    for match in _regex_span(pattern, input_str, case_insensitive=case_insensitive):
+    for match in _regex_span(pattern, input_str, case_insensitive=case_insensitive, spans=spans):
         if context == 'sentence':
             yield _sentence_context(match, language)
         elif context == 'paragraph':
@@ -177,13 +209,119 @@ def match_regex(input_str, pattern, language, context, case_insensitive=True):
             yield _window_match(match, context)
 
 
-def search_corpus(pattern, corpus, context, case_insensitive=True, expand_keyword=False, lemmatized=False, threshold=0.70):
+def _corpus_files(corpus):
+    """Return the language, author index and author file paths of a corpus."""
+    corpora = ['tlg', 'phi5']
+    assert corpus in corpora, "Available corpora: '{}'.".format(corpora)
+    if corpus == 'phi5':
+        return 'latin', PHI5_INDEX, assemble_phi5_author_filepaths()
+    return 'greek', TLG_INDEX, assemble_tlg_author_filepaths()
+
+
+def build_positional_index(corpus):
+    """Index the words of the author files of TLG or PHI5, for
+    ``search_corpus()`` to search only the files (and parts of files) which
+    may match. The index must be rebuilt for changed files to benefit.
+
+    >>> # build_positional_index('phi5')  # doctest: +SKIP
+
+    :rtype: PositionalIndex
+    """
+    lang, _, paths = _corpus_files(corpus)
+    return PositionalIndex.build(paths, positional_index_dir(lang, corpus))
+
+
+def _open_positional_index(meta_path):
+    """Open the positional index whose meta.json is at meta_path, for the
+    model cache.
+    """
+    return PositionalIndex(os.path.dirname(meta_path))
+
+
+def _load_positional_index(lang, corpus):
+    """Return the positional index of a corpus, or None if it has not been
+    built.
+    """
+    meta_path = os.path.join(positional_index_dir(lang, corpus), 'meta.json')
+    if not os.path.isfile(meta_path):
+        return None
+    return load_model(lang, ('positional_index', corpus), meta_path, _open_positional_index)
+
+
+_WORKER_SEARCH = None
+
+
+def _init_search_worker(language, context, case_insensitive):
+    """Set the search options of a worker process."""
+    global _WORKER_SEARCH  # pylint: disable=global-statement
+    _WORKER_SEARCH = (language, context, case_insensitive)
+
+
+def _search_file(path, searches, language, context, case_insensitive):
+    """Yield the matches in context of patterns in a file.
+    :param path: Path of file
+    :param searches: List of (pattern, spans) to search the file for
+    """
+    with open(path) as file_open:
+        text = file_open.read()
+    for pattern, spans in searches:
+        yield from match_regex(text, pattern, language=language, context=context,
+                               case_insensitive=case_insensitive, spans=spans)
+
+
+def _search_file_in_worker(task):
+    """Search one file in a worker process.
+    :param task: Path of file, and list of (pattern, spans) to search it for
+    :return: Path, and list of matches in context
+    :rtype: tuple
+    """
+    path, searches = task
+    return path, list(_search_file(path, searches, *_WORKER_SEARCH))
+
+
+def _file_spans(positional_index, pattern_spans, path, patterns):
+    """Return the spans of a file in which any of patterns may match, from
+    a positional index: None to search the whole file, [] if none can match.
+    :rtype: list or None
+    """
+    if positional_index is None or not positional_index.is_current(path):
+        return None
+    path = os.path.abspath(path)
+    spans = []
+    for one_pattern in patterns:
+        if pattern_spans[one_pattern] is None:
+            return None
+        if path not in pattern_spans[one_pattern]:
+            continue
+        if pattern_spans[one_pattern][path] is None:
+            return None
+        spans.extend(pattern_spans[one_pattern][path])
+    merged = []  # type: List[List[int]]
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def search_corpus(pattern, corpus, context, case_insensitive=True, expand_keyword=False, lemmatized=False, threshold=0.70, use_index=True, workers=1):
     """Search for pattern in TLG or PHI5.
+
+    If a positional index of the corpus has been made with
+    ``build_positional_index()``, and ``use_index`` is True, only the files,
+    and parts of files, containing the words required by the pattern are
+    searched. Files changed since the index was built are searched in full.
+
+    With ``workers`` other than 1, files are searched in a pool of processes,
+    and the same results are yielded file by file as they arrive, in no
+    particular order of files.
+
+    :param workers: Number of worker processes; -1 for one per CPU
+
     TODO: Cleanup hyphenation.
     """
-
-    corpora = ['tlg', 'phi5']
-    assert corpus in corpora, "Available corpora: '{}'.".format(corpora)
+    lang, index, paths = _corpus_files(corpus)
 
     if type(context) is str:
         contexts = ['sentence', 'paragraph']
@@ -191,15 +329,6 @@ def search_corpus(pattern, corpus, context, case_insensitive=True, expand_keywor
     else:
         context = int(context)
 
-    if corpus == 'phi5':
-        lang = 'latin'
-        index = PHI5_INDEX
-        paths = assemble_phi5_author_filepaths()
-    elif corpus == 'tlg':
-        index = TLG_INDEX
-        lang = 'greek'
-        paths = assemble_tlg_author_filepaths()
-
     if expand_keyword:
         # Strip off all regex characters from pattern for Word2Vec lookup
         # First rm escaped chars
@@ -213,20 +342,44 @@ def search_corpus(pattern, corpus, context, case_insensitive=True, expand_keywor
         pattern = ''.join(ch for ch in pattern if ch not in punctuation)
         similar_vectors = _keyword_expander(pattern, lang, lemmatized=lemmatized, threshold=threshold)
         print("The following similar terms will be added to the '{0}' query: '{1}'.".format(pattern, similar_vectors))
-        pattern = [pattern]
+        patterns = [pattern]
         if similar_vectors:
-            pattern += similar_vectors
-        else:
-            pattern = pattern
-
-    for path in paths:
-        with open(path) as file_open:
-            text = file_open.read()
-        for one_pattern in pattern:
-            _matches = match_regex(text, one_pattern, language=lang, context=context, case_insensitive=case_insensitive)
-            for _match in _matches:
-                _id = os.path.split(path)[1][:-4]
-                author = index[_id]
+            patterns += similar_vectors
+    else:
+        patterns = [pattern]
+
+    if workers == -1:
+        workers = os.cpu_count()
+
+    positional_index = _load_positional_index(lang, corpus) if use_index else None
+    pattern_spans = {}
+    if positional_index is not None:
+        pattern_spans = {one_pattern: positional_index.spans(one_pattern, case_insensitive)
+                         for one_pattern in patterns}
+
+    def _tasks():
+        for path in paths:
+            # Each pattern separately, reporting overlapping matches of different patterns
+            searches = []
+            for one_pattern in patterns:
+                spans = _file_spans(positional_index, pattern_spans, path, [one_pattern])
+                if spans != []:
+                    searches.append((one_pattern, spans))
+            if searches:
+                yield path, searches
+
+    initargs = (lang, context, case_insensitive)
+    if workers == 1:
+        for path, searches in _tasks():
+            author = index[os.path.split(path)[1][:-4]]
+            for _match in _search_file(path, searches, *initargs):
+                yield (author, _match)
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_search_worker, initargs=initargs) as pool:
+        for path, matches in imap_bounded(pool, _search_file_in_worker, _tasks(), 2 * workers):
+            author = index[os.path.split(path)[1][:-4]]
+            for _match in matches:
                 yield (author, _match)
 
 
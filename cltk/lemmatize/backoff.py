@@ -10,6 +10,7 @@ http://www.nltk.org/_modules/nltk/tag/sequential.html
 """
 
 import os
+import pickle
 import re
 
 from typing import List, Dict, Tuple, Set, Any, Generator
@@ -19,7 +20,9 @@ from nltk.probability import ConditionalFreqDist
 from nltk.tag.api import TaggerI
 from nltk.tag.sequential import SequentialBackoffTagger, ContextTagger, DefaultTagger, NgramTagger, UnigramTagger, RegexpTagger
 
+from cltk.utils.cltk_logger import logger
 from cltk.utils.file_operations import open_pickle
+from cltk.utils.model_cache import load_model
 
 
 # Unused for now
@@ -29,6 +32,59 @@ from cltk.utils.file_operations import open_pickle
 #        backoff = cls(train_sents, backoff=backoff)
 #    return backoff
 
+# Version of the format written by ``save_backoff_model()``; increment when
+# the contents of the saved dict change.
+BACKOFF_MODEL_VERSION = 1
+
+
+def save_backoff_model(path: str, language: str, seed: int, lookups: Dict[str, dict], sources: List[str]):
+    """
+    Save the lookup tables of a trained backoff lemmatizer, so that it can
+    later be set up for inference without loading or training on its
+    training data.
+
+    :type path: str
+    :param path: File path to write pickle to
+    :type language: str
+    :param language: Language of lemmatizer, checked on load
+    :type seed: int
+    :param seed: Seed with which training data was shuffled
+    :type lookups: dict
+    :param lookups: Dict of name to {TOKEN: LEMMA} dict
+    :type sources: list
+    :param sources: Paths of the model files the lookups were built from;
+        their mtimes are recorded to detect stale models
+    """
+    model = {'version': BACKOFF_MODEL_VERSION,
+             'language': language,
+             'seed': seed,
+             'sources': {os.path.basename(source): os.path.getmtime(source) for source in sources},
+             'lookups': lookups}
+    with open(path, 'wb') as opened_pickle:
+        pickle.dump(model, opened_pickle, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_backoff_model(path: str, language: str, sources_dir: str = None):
+    """
+    Load lookup tables saved by ``save_backoff_model()`` from the model
+    cache, checking their version and language. If ``sources_dir`` is given
+    and the model files found there have changed since the lookups were
+    built, a warning is logged.
+
+    :rtype: dict
+    """
+    model = load_model(language, 'backoff_lookups', path)
+    if model.get('version') != BACKOFF_MODEL_VERSION or model.get('language') != language:
+        raise ValueError(f"'{path}' is not a version {BACKOFF_MODEL_VERSION} {language} backoff model; "
+                         "rebuild it with save_inference_model().")
+    if sources_dir:
+        for source, mtime in model['sources'].items():
+            source_path = os.path.join(sources_dir, source)
+            if os.path.isfile(source_path) and os.path.getmtime(source_path) != mtime:
+                logger.warning("'%s' has changed since '%s' was built; rebuild it with save_inference_model().",
+                               source_path, path)
+    return model
+
 
 class SequentialBackoffLemmatizer(SequentialBackoffTagger):
     """
@@ -84,18 +140,54 @@ class SequentialBackoffLemmatizer(SequentialBackoffTagger):
         :type tokens: list
         :param tokens: List of tokens to tag
         """
-        tags = []
-        taggers = []
-        for i in range(len(tokens)):
-            tag, tagger = self.tag_one(tokens, i, tags)
-            tags.append(tag)
-            taggers.append(str(tagger)) if tag else taggers.append(None)
+        if all(_can_choose_tags(tagger) for tagger in self._taggers):
+            tags, taggers = self._tag_by_stage(tokens)
+        else:
+            tags = []
+            taggers = []
+            for i in range(len(tokens)):
+                tag, tagger = self.tag_one(tokens, i, tags)
+                tags.append(tag)
+                taggers.append(tagger if tag else None)
 
         if self.VERBOSE:
-            return list(zip(tokens, tags, taggers))
+            names = {}
+            for tagger in taggers:
+                if tagger is not None and id(tagger) not in names:
+                    names[id(tagger)] = str(tagger)
+            return list(zip(tokens, tags, [names.get(id(tagger)) for tagger in taggers]))
         else:
             return list(zip(tokens, tags))
 
+    def _tag_by_stage(self: object, tokens: List[str]):
+        """
+        Tag tokens stage by stage rather than token by token: each tagger
+        in the backoff chain is given all tokens still without a lemma, and
+        passes on to the next those it cannot lemmatize. Only used when no
+        tagger in the chain depends on ``history``, so that the result is
+        the same as calling ``tag_one()`` on each token.
+
+        :rtype: tuple
+        :return: List of tags and list of the tagger which assigned each
+            tag (or None)
+        """
+        tags = [None] * len(tokens)
+        taggers = [None] * len(tokens)
+        unresolved = list(range(len(tokens)))
+        for tagger in self._taggers:
+            if not unresolved:
+                break
+            remaining = []
+            for index, lemma in zip(unresolved, tagger.choose_tags(tokens, unresolved)):
+                if lemma is None:
+                    remaining.append(index)
+                else:
+                    tags[index] = lemma
+                    if lemma:
+                        taggers[index] = tagger
+            unresolved = remaining
+        return tags, taggers
+
     def tag_one(self: object, tokens: List[str], index: int, history: List[str]):
         """
         Determine an appropriate tag for the specified token, and
@@ -126,6 +218,22 @@ class SequentialBackoffLemmatizer(SequentialBackoffTagger):
         return self.tag(tokens)
 
 
+def _can_choose_tags(tagger: object) -> bool:
+    """
+    Check whether a tagger can lemmatize many tokens at once through
+    ``choose_tags()``, i.e., that it defines ``choose_tags()`` and that no
+    subclass has since overridden ``choose_tag()`` or ``context()``, which
+    may then depend on ``history``.
+    """
+    owners = {}
+    for name in ('choose_tags', 'choose_tag', 'context'):
+        owners[name] = next((cls for cls in type(tagger).__mro__ if name in vars(cls)), None)
+    if owners['choose_tags'] is None:
+        return False
+    return all(owner is None or issubclass(owners['choose_tags'], owner)
+               for owner in (owners['choose_tag'], owners['context']))
+
+
 class DefaultLemmatizer(SequentialBackoffLemmatizer):
     """
     Lemmatizer that assigns the same lemma to every token. Useful as the final
@@ -146,6 +254,9 @@ class DefaultLemmatizer(SequentialBackoffLemmatizer):
     def choose_tag(self: object, tokens: List[str], index: int, history: List[str]):
         return self.lemma
 
+    def choose_tags(self: object, tokens: List[str], indices: List[int]):
+        return [self.lemma] * len(indices)
+
     def __repr__(self: object):
         return f'<{type(self).__name__}: lemma={self.lemma}>'
 
@@ -169,6 +280,9 @@ class IdentityLemmatizer(SequentialBackoffLemmatizer):
     def choose_tag(self: object, tokens: List[str], index: int, history: List[str]):
         return tokens[index]
 
+    def choose_tags(self: object, tokens: List[str], indices: List[int]):
+        return [tokens[index] for index in indices]
+
     def __repr__(self: object):
         return f'<{type(self).__name__}>'
 
@@ -202,9 +316,19 @@ class DictLemmatizer(SequentialBackoffLemmatizer):
         :type history: list
         :param history: List with tokens that have already been lemmatized; NOT USED
         """
-        keys = self.lemmas.keys()
-        if tokens[index] in keys:
-            return self.lemmas[tokens[index]]
+        return self.lemmas.get(tokens[index])
+
+    def choose_tags(self: object, tokens: List[str], indices: List[int]):
+        """
+        Looks up many tokens at once; cf. ``choose_tag()``.
+        :rtype: list
+        :type tokens: list
+        :param tokens: List of tokens to be lemmatized
+        :type indices: list
+        :param indices: List of ints with tokens to lemmatize
+        """
+        lookup = self.lemmas.get
+        return [lookup(tokens[index]) for index in indices]
 
     def __repr__(self: object):
         if self.source:
@@ -228,6 +352,16 @@ class UnigramLemmatizer(SequentialBackoffLemmatizer, UnigramTagger):
         self.train = train
         self.source = source
 
+    def choose_tags(self: object, tokens: List[str], indices: List[int]):
+        """
+        Looks up many tokens at once in the trained model; cf.
+        ``choose_tag()``, whose context for a unigram tagger is the
+        token itself.
+        :rtype: list
+        """
+        lookup = self._context_to_tag.get
+        return [lookup(tokens[index]) for index in indices]
+
     def __repr__(self: object):
         if self.source:
             return f'<{type(self).__name__}: {self.source}>'
@@ -235,6 +369,78 @@ class UnigramLemmatizer(SequentialBackoffLemmatizer, UnigramTagger):
             return f'<{type(self).__name__}: {self.repr.repr(self.train)}>'
 
 
+_REGEX_LITERAL = r'[^\\.^$*+?{}\[\]|()]'
+_FINAL_LITERALS = re.compile(rf'(?:\(((?:{_REGEX_LITERAL}+\|)*{_REGEX_LITERAL}+)\)|({_REGEX_LITERAL}))\$$')
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """Return whether pattern has an unescaped '|' outside any group or
+    character class, e.g. '^ab|cd$', whose '$' then only applies to the last
+    alternative.
+    :rtype: bool
+    """
+    depth = 0
+    in_class = False
+    chars = iter(pattern)
+    for char in chars:
+        if char == '\\':
+            next(chars, None)
+        elif in_class:
+            if char == ']':
+                in_class = False
+        elif char == '[':
+            in_class = True
+            # A ']' straight after '[' or '[^' is a literal
+            char = next(chars, None)
+            if char == '^':
+                char = next(chars, None)
+            if char == '\\':
+                next(chars, None)
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return True
+    return False
+
+
+def _final_chars(pattern: str) -> Set[str]:
+    """Return the characters with which a string matched by pattern may end,
+    for patterns ending in a literal or a group of literal alternatives
+    followed by '$', e.g. '(.)tat(is|i|em)$' -> {'s', 'i', 'm'}. Returns None
+    for any other pattern, inc. those with alternatives outside a group.
+    :rtype: set or None
+    """
+    if not isinstance(pattern, str) or '(?' in pattern or _has_top_level_alternation(pattern):
+        return None
+    match = _FINAL_LITERALS.search(pattern)
+    if not match:
+        return None
+    if match.group(1):
+        return {alternative[-1] for alternative in match.group(1).split('|')}
+    preceding = pattern[:match.start(2)]
+    if (len(preceding) - len(preceding.rstrip('\\'))) % 2:
+        return None
+    return {match.group(2)}
+
+
+def _index_by_final_char(regexps: List[Tuple[str, str]], compiled_regexs: List[Tuple[Any, str]]):
+    """Build a dispatch table from a token's final character to the
+    (compiled) patterns which could match it, in their original order.
+    Patterns whose final character cannot be determined are kept in every
+    entry, and on their own for characters without an entry.
+    :rtype: tuple (dict, list)
+    """
+    finals = [_final_chars(pattern) for pattern, _ in regexps]
+    chars = set().union(*[final for final in finals if final])
+    regexs_by_final_char = {char: [regex for regex, final in zip(compiled_regexs, finals)
+                                   if final is None or char in final]
+                            for char in chars}
+    default_regexs = [regex for regex, final in zip(compiled_regexs, finals) if final is None]
+    return regexs_by_final_char, default_regexs
+
+
 class RegexpLemmatizer(SequentialBackoffLemmatizer, RegexpTagger):
     """"""
     def __init__(self: object, regexps=None, source=None, backoff=None, verbose: bool = False):
@@ -246,6 +452,8 @@ class RegexpLemmatizer(SequentialBackoffLemmatizer, RegexpTagger):
         SequentialBackoffLemmatizer.__init__(self, backoff=None, verbose=verbose)
         RegexpTagger.__init__(self, regexps, backoff)
         self._regexs = regexps
+        self._compiled_regexs = [(re.compile(pattern), replace) for pattern, replace in regexps]
+        self._regexs_by_final_char, self._default_regexs = _index_by_final_char(regexps, self._compiled_regexs)
         self.source = source
 
     def choose_tag(self: object, tokens: List[str], index: int, history: List[str]):
@@ -260,12 +468,30 @@ class RegexpLemmatizer(SequentialBackoffLemmatizer, RegexpTagger):
         :type history: list
         :param history: List with tokens that have already been lemmatized; NOT USED
         """
-        for pattern, replace in self._regexs:
-            if re.search(pattern, tokens[index]):
-                return re.sub(pattern, replace, tokens[index])
+        return self._lemmatize_token(tokens[index])
+
+    def choose_tags(self: object, tokens: List[str], indices: List[int]):
+        """Lemmatize many tokens at once; cf. ``choose_tag()``.
+        :rtype: list
+        """
+        lemmatize_token = self._lemmatize_token
+        return [lemmatize_token(tokens[index]) for index in indices]
+
+    def _lemmatize_token(self: object, token: str):
+        # Only try the patterns which can match a token's final character;
+        # '$' also matches before a trailing newline, so such tokens (and
+        # empty ones) get the full list.
+        if token and token[-1] != '\n':
+            regexs = self._regexs_by_final_char.get(token[-1], self._default_regexs)
+        else:
+            regexs = self._compiled_regexs
+        for pattern, replace in regexs:
+            if pattern.search(token):
+                return pattern.sub(replace, token)
 
     def __repr__(self: object):
         if self.source:
             return f'<{type(self).__name__}: {self.source}>'
         else:
             return f'<{type(self).__name__}: {self.repr.repr(self._regexs)}>'
+
@@ -1,12 +1,47 @@
 from cltk.tokenize.word import WordTokenizer
 from cltk.lemmatize.french.french import regex
+from cltk.utils.binary_data import load_py_data
+from cltk.utils.model_cache import load_model
+from functools import lru_cache
 import os
-import importlib.machinery
 
 __author__ = ['Natasha Voake <natashavoake@gmail.com>']
 __license__ = 'MIT License. See LICENSE.'
 
 
+def _index_entries(entries):
+    """Key entries by lemma, the first item of each entry."""
+    index = {}
+    for entry in entries:
+        index.setdefault(entry[0], entry)
+    return index
+
+
+def _load_entries_module(path):
+    return load_py_data(path, 'entries', to_mapping=_index_entries)
+
+
+def _invert_forms_and_lemmas(forms_and_lemmas):
+    """Turn {LEMMA: [FORMS]} into {FORM: [LEMMAS]}, keeping lemmas in the
+    order of the original dict."""
+    lemmas_by_form = {}
+    for lemma, forms in forms_and_lemmas.items():
+        for form in forms:
+            lemmas = lemmas_by_form.setdefault(form, [])
+            if not lemmas or lemmas[-1] != lemma:
+                lemmas.append(lemma)
+    return lemmas_by_form
+
+
+def _load_lemmas_by_form(path):
+    return load_py_data(path, 'forms_and_lemmas', to_mapping=_invert_forms_and_lemmas)
+
+
+# The regex rules are tried in turn on each token; tokens recur often enough
+# in a text that remembering the outcome is worthwhile.
+_regex = lru_cache(maxsize=2 ** 16)(regex)
+
+
 class LemmaReplacer(object):  # pylint: disable=too-few-public-methods
     """Lemmatize French words by replacing input words with corresponding
     values from a replacement list.
@@ -14,7 +49,7 @@ class LemmaReplacer(object):  # pylint: disable=too-few-public-methods
     def __init__(self):
 
         self.entries = self._load_entries()
-        self.forms_and_lemmas = self._load_forms_and_lemmas()
+        self.lemmas_by_form = self._load_lemmas_by_form()
 
     def _load_entries(self):
         """Check for availability of lemmatizer for French."""
@@ -25,47 +60,39 @@ class LemmaReplacer(object):  # pylint: disable=too-few-public-methods
                                 ,'entries.py')
         path = os.path.expanduser(rel_path)
         #logger.info('Loading entries. This may take a minute.')
-        loader = importlib.machinery.SourceFileLoader('entries', path)
-        module = loader.load_module()
-        entries = module.entries
-        return entries
-
-    def _load_forms_and_lemmas(self):
+        return load_model('french', 'entries', path, _load_entries_module)
 
+    def _load_lemmas_by_form(self):
+        """Load index of forms to their lemmas, built from the lemmas and
+        forms list."""
         rel_path = os.path.join(get_cltk_data_dir(),
                                 'french',
                                 'text', 'french_data_cltk',
                                 'forms_and_lemmas.py')
         path = os.path.expanduser(rel_path)
-        # logger.info('Loading forms and lemmas. This may take a minute.')
-        loader = importlib.machinery.SourceFileLoader('forms_and_lemmas', path)
-        module = loader.load_module()
-        forms_and_lemmas = module.forms_and_lemmas
-        return forms_and_lemmas
+        return load_model('french', 'lemmas_by_form', path, _load_lemmas_by_form)
 
     def lemmatize(self, tokens):
-        """define list of lemmas"""
+        """Provide a lemma for each token"""
         entries = self.entries
-        forms_and_lemmas = self.forms_and_lemmas
+        lemmas_by_form = self.lemmas_by_form
 
-        lemma_list = [x[0] for x in entries]
-        """Provide a lemma for each token"""
         lemmatized = []
         for token in tokens:
             """check for a match between token and list of lemmas"""
-            if token in lemma_list:
+            if token in entries:
                 lemmed = (token, token)
                 lemmatized.append(lemmed)
             else:
                 """if no match check for a match between token and list of lemma forms"""
-                lemma = [k for k, v in forms_and_lemmas.items() if token in v]
-                if lemma != []:
+                lemma = lemmas_by_form.get(token)
+                if lemma:
                     lemmed = (token, lemma)
                     lemmatized.append(lemmed)
-                elif lemma == []:
+                else:
                     """if no match apply regular expressions and check for a match against the list of lemmas again"""
-                    regexed = regex(token)
-                    if regexed in lemma_list:
+                    regexed = _regex(token)
+                    if regexed in entries:
                         lemmed = (token, regexed)
                         lemmatized.append(lemmed)
                     else:
@@ -10,9 +10,10 @@ from typing import List, Dict, Tuple, Set, Any, Generator
 import reprlib
 
 from cltk.lemmatize.backoff import DefaultLemmatizer, IdentityLemmatizer, DictLemmatizer, RegexpLemmatizer, UnigramLemmatizer
+from cltk.lemmatize.backoff import load_backoff_model, save_backoff_model
 from cltk.lemmatize.latin.latin import latin_sub_patterns, latin_pps, rn_patterns
 
-from cltk.utils.file_operations import open_pickle
+from cltk.utils.model_cache import load_model
 
 
 class RomanNumeralLemmatizer(RegexpLemmatizer):
@@ -52,6 +53,12 @@ class RomanNumeralLemmatizer(RegexpLemmatizer):
                 else:
                     return replace
 
+    def choose_tags(self: object, tokens: List[str], indices: List[int]):
+        """Lemmatize many tokens at once; cf. ``choose_tag()``.
+        :rtype: list
+        """
+        return [self.choose_tag(tokens, index, None) for index in indices]
+
     def __repr__(self: object):
         return f'<{type(self).__name__}: CLTK Roman Numeral Patterns>'
 
@@ -66,23 +73,43 @@ class BackoffLatinLemmatizer(object):
     """
 
     models_path = os.path.normpath(get_cltk_data_dir() + '/latin/model/latin_models_cltk/lemmata/backoff')
+    inference_model = 'latin_backoff_lookups.pickle'
 
-    def __init__(self: object, train: List[list] = None, seed: int = 3, verbose: bool = False):
+    def __init__(self: object, train: List[list] = None, seed: int = 3, verbose: bool = False,
+                 inference_model: str = None):
+        """
+        :param inference_model: Path of lookup tables saved with
+            ``save_inference_model()``; if given, they are used instead of
+            loading the training sentences and training on them, and seed
+            is the one they were saved with
+        """
         self.models_path = BackoffLatinLemmatizer.models_path
+        self.latin_sub_patterns = latin_sub_patterns # Move to latin_models_cltk
+        self.VERBOSE=verbose
+
+        if inference_model:
+            try:
+                model = load_backoff_model(inference_model, 'latin', sources_dir=self.models_path)
+            except FileNotFoundError as err:
+                raise type(err)(f"No inference model at '{inference_model}'. Build it with BackoffLatinLemmatizer().save_inference_model().")  # pylint: disable=line-too-long
+            self.train = self.pos_train_sents = self.train_sents = self.test_sents = None
+            self.LATIN_OLD_MODEL = model['lookups']['old_model']
+            self.LATIN_MODEL = model['lookups']['model']
+            self.seed = model['seed']
+            self._define_lemmatizer(unigram_model=model['lookups']['unigram'])
+            return
 
         missing_models_message = "BackoffLatinLemmatizer requires the ```latin_models_cltk``` to be in cltk_data. Please load this corpus."
 
         try:
-            self.train =  open_pickle(os.path.join(self.models_path, 'latin_pos_lemmatized_sents.pickle'))
-            self.LATIN_OLD_MODEL =  open_pickle(os.path.join(self.models_path, 'latin_lemmata_cltk.pickle'))
-            self.LATIN_MODEL =  open_pickle(os.path.join(self.models_path, 'latin_model.pickle'))
+            # Copy the cached training sentences, since they are shuffled in place below
+            self.train = list(self._load_model('latin_pos_lemmatized_sents'))
+            self.LATIN_OLD_MODEL = self._load_model('latin_lemmata_cltk')
+            self.LATIN_MODEL = self._load_model('latin_model')
         except FileNotFoundError as err:
             raise type(err)(missing_models_message)
 
-        self.latin_sub_patterns = latin_sub_patterns # Move to latin_models_cltk
-
         self.seed = seed
-        self.VERBOSE=verbose
 
         def _randomize_data(train: List[list], seed: int):
             import random
@@ -98,13 +125,44 @@ class BackoffLatinLemmatizer(object):
         self.pos_train_sents, self.train_sents, self.test_sents = _randomize_data(self.train, self.seed)
         self._define_lemmatizer()
 
-    def _define_lemmatizer(self: object):
+    def _load_model(self: object, name: str):
+        """Return pickled model from the process-wide model cache."""
+        return load_model('latin', name, os.path.join(self.models_path, name + '.pickle'))
+
+    @classmethod
+    def from_inference_model(cls, path: str = None, verbose: bool = False):
+        """Setup the lemmatizer from lookup tables saved with
+        ``save_inference_model()``, without loading the training sentences
+        or training on them; useful where startup time matters. The
+        returned lemmatizer cannot ``evaluate()``.
+        :param path: Path of saved model; defaults to ``inference_model``
+            in ``models_path``
+        """
+        path = path or os.path.join(cls.models_path, cls.inference_model)
+        return cls(verbose=verbose, inference_model=path)
+
+    def save_inference_model(self: object, path: str = None):
+        """Save the lookup tables of this lemmatizer, inc. its trained
+        unigram model, for use with ``from_inference_model()``.
+        :param path: Path to save model to; defaults to ``inference_model``
+            in ``models_path``
+        """
+        path = path or os.path.join(self.models_path, self.inference_model)
+        lookups = {'old_model': self.LATIN_OLD_MODEL,
+                   'model': self.LATIN_MODEL,
+                   'unigram': self.backoff4._context_to_tag}
+        sources = [os.path.join(self.models_path, name + '.pickle')
+                   for name in ('latin_pos_lemmatized_sents', 'latin_lemmata_cltk', 'latin_model')]
+        save_backoff_model(path, 'latin', self.seed, lookups, sources)
+        return path
+
+    def _define_lemmatizer(self: object, unigram_model: dict = None):
         # Suggested backoff chain--should be tested for optimal order
         self.backoff0 = None
         self.backoff1 = IdentityLemmatizer(verbose=self.VERBOSE)
         self.backoff2 = DictLemmatizer(lemmas=self.LATIN_OLD_MODEL, source='Morpheus Lemmas', backoff=self.backoff1, verbose=self.VERBOSE)
         self.backoff3 = RegexpLemmatizer(self.latin_sub_patterns, source='CLTK Latin Regex Patterns', backoff=self.backoff2, verbose=self.VERBOSE)
-        self.backoff4 = UnigramLemmatizer(self.train_sents, source='CLTK Sentence Training Data', backoff=self.backoff3, verbose=self.VERBOSE)
+        self.backoff4 = UnigramLemmatizer(self.train_sents, model=unigram_model, source='CLTK Sentence Training Data', backoff=self.backoff3, verbose=self.VERBOSE)
         self.backoff5 = DictLemmatizer(lemmas=self.LATIN_MODEL, source='Latin Model', backoff=self.backoff4, verbose=self.VERBOSE)
         self.lemmatizer = self.backoff5
 
@@ -115,6 +173,8 @@ class BackoffLatinLemmatizer(object):
     def evaluate(self: object):
         if self.VERBOSE:
             raise AssertionError("evaluate() method only works when verbose: bool = False")
+        if self.test_sents is None:
+            raise AssertionError("evaluate() method needs training data; not available with from_inference_model()")
         return self.lemmatizer.evaluate(self.test_sents)
 
     def __repr__(self: object):
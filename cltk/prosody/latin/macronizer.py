@@ -12,10 +12,11 @@ Morpheus entry, the Macronizer class allows for multiple POS to be used.
 # TODO Determine how to disambiguate tags (see logger)
 
 import os
-import importlib.machinery
 
 from cltk.tag.pos import POSTag
+from cltk.utils.binary_data import load_py_data
 from cltk.utils.cltk_logger import logger
+from cltk.utils.model_cache import load_model
 
 __author__ = ['Tyler Kirby <tyler.kirby9398@gmail.com>']
 __license__ = 'MIT License. See LICENSE.'
@@ -37,14 +38,24 @@ class Macronizer:
         self.tagger = tagger.lower()
         assert self.tagger in AVAILABLE_TAGGERS, \
             "Macronizer not available for '{0}' tagger.".format(self.tagger)
+        self._pos_tagger = None
+
+    @staticmethod
+    def _load_macrons(path):
+        return load_py_data(path, 'vowel_len_map')
 
     def _setup_macrons_data(self):
         rel_path = get_cltk_data_dir() + "/latin/model/latin_models_cltk/taggers/macrons/macrons.py"
         path = os.path.expanduser(rel_path)
-        loader = importlib.machinery.SourceFileLoader("macrons", path)
-        module = loader.load_module()
-        macrons = module.vowel_len_map
-        return macrons
+        return load_model('latin', 'macrons', path, self._load_macrons)
+
+    @property
+    def pos_tagger(self):
+        """POSTag instance shared across calls; its models come from the
+        process-wide model cache."""
+        if self._pos_tagger is None:
+            self._pos_tagger = POSTag('latin')
+        return self._pos_tagger
 
     def _retrieve_tag(self, text):
         """Tag text with chosen tagger and clean tags.
@@ -56,13 +67,13 @@ class Macronizer:
         :rtype : list
         """
         if self.tagger == 'tag_ngram_123_backoff':  # Data format: Perseus Style (see https://github.com/cltk/latin_treebank_perseus)
-            tags = POSTag('latin').tag_ngram_123_backoff(text.lower())
+            tags = self.pos_tagger.tag_ngram_123_backoff(text.lower())
             return [(tag[0], tag[1]) for tag in tags]
         elif self.tagger == 'tag_tnt':
-            tags = POSTag('latin').tag_tnt(text.lower())
+            tags = self.pos_tagger.tag_tnt(text.lower())
             return [(tag[0], tag[1]) for tag in tags]
         elif self.tagger == 'tag_crf':
-            tags = POSTag('latin').tag_crf(text.lower())
+            tags = self.pos_tagger.tag_crf(text.lower())
             return [(tag[0], tag[1]) for tag in tags]
 
     def _retrieve_morpheus_entry(self, word):
@@ -5,12 +5,18 @@ __license__ = 'MIT License. See LICENSE.'
 
 import warnings
 from cltk.utils.cltk_logger import logger
-import importlib.machinery
+from cltk.utils.binary_data import load_py_data
+from cltk.utils.model_cache import load_model
 from nltk.tokenize.punkt import PunktLanguageVars
 import os
 
 AVAILABLE_LANGUAGES = ['greek', 'latin']
 
+
+def _load_lemmata(path):
+    """Load ``LEMMATA`` dict of lemmata file, via its binary version."""
+    return load_py_data(path, 'LEMMATA')
+
 # Deprecated; remove from future release?
 class LemmaReplacer(object):  # pylint: disable=too-few-public-methods
     """Lemmatize Latin words by replacing input words with corresponding
@@ -37,7 +43,7 @@ class LemmaReplacer(object):  # pylint: disable=too-few-public-methods
                                     'lemmata','latin_lemmata_cltk.py')
             path = os.path.expanduser(rel_path)
             #logger.info('Loading lemmata. This may take a minute.')
-            loader = importlib.machinery.SourceFileLoader('latin_lemmata_cltk', path)
+            module_name = 'latin_lemmata_cltk'
 
         elif self.language == 'greek':
             rel_path = os.path.join(get_cltk_data_dir(),
@@ -46,10 +52,9 @@ class LemmaReplacer(object):  # pylint: disable=too-few-public-methods
                                     'lemmata','greek_lemmata_cltk.py')
             path = os.path.expanduser(rel_path)
             #logger.info('Loading lemmata. This may take a minute.')
-            loader = importlib.machinery.SourceFileLoader('greek_lemmata_cltk', path)
-        module = loader.load_module()
-        lemmata = module.LEMMATA
-        return lemmata
+            module_name = 'greek_lemmata_cltk'
+
+        return load_model(self.language, module_name, path, _load_lemmata)
 
     def lemmatize(self, input_text, return_raw=False, return_string=False):
         """Take incoming string or list of tokens. Lookup done against a
@@ -66,6 +71,7 @@ class LemmaReplacer(object):  # pylint: disable=too-few-public-methods
         else:
             tokens = input_text
 
+        lemmata = self.lemmata
         lemmatized_tokens = []
         for token in tokens:
             # check for final period
@@ -74,9 +80,9 @@ class LemmaReplacer(object):  # pylint: disable=too-few-public-methods
                 final_period = True
                 token = token[:-1]
 
-            # look for token in lemma dict keys
-            if token.lower() in self.lemmata.keys():
-                headword = self.lemmata[token.lower()]
+            # look for token in lemma dict
+            headword = lemmata.get(token.lower())
+            if headword is not None:
 
                 # re-add final period if rm'd
                 if final_period:
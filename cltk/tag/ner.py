@@ -1,10 +1,12 @@
 """Named entity recognition (NER)."""
 
+from collections import deque
 from cltk.corpus.utils.importer import CorpusImporter
 from nltk.tokenize.punkt import PunktLanguageVars
 from cltk.tokenize.word import WordTokenizer
+from cltk.utils.binary_data import load_py_data
+from cltk.utils.model_cache import load_model
 import os
-import importlib.machinery
 
 __author__ = ['Natasha Voake <natashavoake@gmail.com>']
 __license__ = 'MIT License. See LICENSE.'
@@ -13,11 +15,102 @@ NER_DICT = {'greek': get_cltk_data_dir() + '/greek/model/greek_models_cltk/ner/p
             'latin': get_cltk_data_dir() + '/latin/model/latin_models_cltk/ner/proper_names.txt'}
 
 
+_END = None  # key of the kind stored at the node ending a name in the trie
+
+
+class EntityIndex(object):
+    """Index of named entities for matching against a stream of tokens.
+    Single-word names are looked up in a mapping; names of several
+    (whitespace-separated) words are kept in a trie keyed by token, so that
+    the longest name starting at each token is found in one walk.
+    """
+
+    def __init__(self, names):
+        """Setup variables.
+        :param names: Mapping of name to kind of entity
+        """
+        self.names = names
+        self._trie = {}
+        self.max_length = 1
+        for name in names:
+            words = name.split()
+            if len(words) < 2:
+                continue
+            node = self._trie
+            for word in words:
+                node = node.setdefault(word, {})
+            node.setdefault(_END, names[name])
+            self.max_length = max(self.max_length, len(words))
+
+    def _longest_match(self, tokens):
+        """Return number of tokens and kind of the longest multi-word name at
+        the start of tokens, or (0, None)."""
+        length, kind = 0, None
+        node = self._trie
+        for count, token in enumerate(tokens, 1):
+            node = node.get(token)
+            if node is None:
+                break
+            if _END in node:
+                length, kind = count, node[_END]
+        return length, kind
+
+    def tag(self, tokens):
+        """Yield (token, kind) for each token, where kind is None for tokens
+        which are not part of a name. Every token of a multi-word name gets
+        the name's kind. Tokens are read lazily, at most ``max_length`` ahead.
+        :param tokens: Iterable of str tokens
+        :rtype: iterator
+        """
+        names = self.names
+        if not self._trie:
+            for token in tokens:
+                yield token, names.get(token)
+            return
+        tokens = iter(tokens)
+        window = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(window) < self.max_length:
+                try:
+                    window.append(next(tokens))
+                except StopIteration:
+                    exhausted = True
+            if not window:
+                return
+            length, kind = self._longest_match(window)
+            if length:
+                for _ in range(length):
+                    yield window.popleft(), kind
+            else:
+                token = window.popleft()
+                yield token, names.get(token)
+
+
+def _index_entities(entities):
+    """Key (name, kind) entities by name; the first kind listed wins."""
+    index = {}
+    for name, kind in entities:
+        index.setdefault(name, kind)
+    return index
+
+
+def _load_entities(path):
+    return EntityIndex(load_py_data(path, 'entities', to_mapping=_index_entities))
+
+
+def _load_proper_names(path):
+    """Read a proper names file, one name per line."""
+    with open(path) as file_open:
+        return EntityIndex({line: 'Entity' for line in file_open.read().split('\n') if line})
+
+
 class NamedEntityReplacer(object):
 
     def __init__(self):
 
-        self.entities = self._load_necessary_data()
+        self.index = self._load_necessary_data()
+        self.entities = self.index.names
 
 
     def _load_necessary_data(self):
@@ -26,37 +119,29 @@ class NamedEntityReplacer(object):
                                 'text', 'french_data_cltk',
                                 'named_entities_fr.py')
         path = os.path.expanduser(rel_path)
-        # logger.info('Loading entries. This may take a minute.')
-        loader = importlib.machinery.SourceFileLoader('entities', path)
-        module = loader.load_module()
-        entities = module.entities
-        return entities
+        return load_model('french', 'named_entities', path, _load_entities)
 
     """tags named entities in a string and outputs a list of tuples in the following format:
     (name, "entity", kind_of_entity)"""
 
     def tag_ner_fr(self, input_text, output_type=list):
 
-        entities = self.entities
-
-        for entity in entities:
-            (name, kind) = entity
+        return list(self.tag_ner_iter(input_text))
 
-        word_tokenizer = WordTokenizer('french')
-        tokenized_text = word_tokenizer.tokenize(input_text)
-        ner_tuple_list = []
+    def tag_ner_iter(self, input_text):
+        """Yield the tags of ``tag_ner_fr()`` one token at a time.
+        :param input_text: String, or iterable of tokens (e.g., a generator
+        over a large text)
+        """
+        if isinstance(input_text, str):
+            word_tokenizer = WordTokenizer('french')
+            input_text = word_tokenizer.tokenize(input_text)
 
-        match = False
-        for word in tokenized_text:
-            for name, kind in entities:
-                if word == name:
-                    named_things = ([(name, 'entity', kind)])
-                    ner_tuple_list.append(named_things)
-                    match = True
-                    break
+        for word, kind in self.index.tag(input_text):
+            if kind is not None:
+                yield [(word, 'entity', kind)]
             else:
-                ner_tuple_list.append((word,))
-        return ner_tuple_list
+                yield (word,)
 
 
 def _check_latest_data(lang):
@@ -72,47 +157,56 @@ def _check_latest_data(lang):
         corpus_importer.import_corpus('{}_models_cltk'.format(lang))
 
 
+def _load_ner_index(lang):
+    """Return the index of proper names for lang, loaded once per process."""
+    _check_latest_data(lang)
+    ner_file_path = os.path.expanduser(NER_DICT[lang])
+    return load_model(lang, 'proper_names', ner_file_path, _load_proper_names)
+
+
+def _tokenize_ner(input_text):
+    """Split a string into tokens, separating final periods."""
+    punkt = PunktLanguageVars()
+    for word in punkt.word_tokenize(input_text):
+        if word.endswith('.'):
+            yield word[:-1]
+            yield '.'
+        else:
+            yield word
+
+
+def tag_ner_iter(lang, input_text):
+    """Run NER for chosen language, yielding a tuple per token: (token,
+    'Entity') for proper names, else (token,).
+    :param lang: Language, one of ``NER_DICT``
+    :param input_text: String, or iterable of tokens (e.g., a generator over
+    a large text)
+    """
+    assert lang in NER_DICT.keys(), \
+        'Invalid language. Choose from: {}'.format(', '.join(NER_DICT.keys()))
+
+    index = _load_ner_index(lang)
+    if isinstance(input_text, str):
+        input_text = _tokenize_ner(input_text)
+
+    for word_token, kind in index.tag(input_text):
+        if kind is not None:
+            yield (word_token, kind)
+        else:
+            yield (word_token,)
+
+
 def tag_ner(lang, input_text, output_type=list):
     """Run NER for chosen language.
     """
 
-    _check_latest_data(lang)
-
     assert lang in NER_DICT.keys(), \
         'Invalid language. Choose from: {}'.format(', '.join(NER_DICT.keys()))
     types = [str, list]
     assert type(input_text) in types, 'Input must be: {}.'.format(', '.join(types))
     assert output_type in types, 'Output must be a {}.'.format(', '.join(types))
 
-    if type(input_text) == str:
-        punkt = PunktLanguageVars()
-        tokens = punkt.word_tokenize(input_text)
-        new_tokens = []
-        for word in tokens:
-            if word.endswith('.'):
-                new_tokens.append(word[:-1])
-                new_tokens.append('.')
-            else:
-                new_tokens.append(word)
-        input_text = new_tokens
-
-    ner_file_path = os.path.expanduser(NER_DICT[lang])
-    with open(ner_file_path) as file_open:
-        ner_str = file_open.read()
-    ner_list = ner_str.split('\n')
-
-    ner_tuple_list = []
-    for count, word_token in enumerate(input_text):
-        match = False
-        for ner_word in ner_list:
-            # the replacer slows things down, but is necessary
-            if word_token == ner_word:
-                ner_tuple = (word_token, 'Entity')
-                ner_tuple_list.append(ner_tuple)
-                match = True
-                break
-        if not match:
-            ner_tuple_list.append((word_token,))
+    ner_tuple_list = list(tag_ner_iter(lang, input_text))
 
     if output_type is str:
         string = ''
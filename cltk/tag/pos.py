@@ -1,11 +1,17 @@
 """Tag part of speech (POS) using CLTK taggers."""
 
+from itertools import chain, islice
+import multiprocessing
 import os
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
 
 from nltk.tag import CRFTagger
 from nltk.tokenize import wordpunct_tokenize
 
 from cltk.utils.file_operations import open_pickle
+from cltk.utils.model_cache import load_model
+from cltk.utils.model_cache import evict as evict_models
+from cltk.utils.parallel import imap_bounded
 
 
 __author__ = ['Kyle P. Johnson <kyle@kyle-p-johnson.com>']
@@ -44,6 +50,53 @@ TAGGERS = {'greek':
            }}
 
 
+def _load_crf_tagger(path: str) -> CRFTagger:
+    """Return a CRFTagger with model file set."""
+    tagger = CRFTagger()
+    tagger.set_model_file(path)
+    return tagger
+
+
+def _load_tagger_model(language: str, tagger: str, path: str):
+    """Return tagger model from the process-wide model cache."""
+    loader = _load_crf_tagger if tagger == 'crf' else open_pickle
+    return load_model(language, tagger, path, loader)
+
+
+def _tokenize(text: Union[str, Sequence[str]]) -> List[str]:
+    """Tokenize a string with ``wordpunct_tokenize()``; pass through a
+    sentence that is already tokenized.
+    """
+    if isinstance(text, str):
+        return wordpunct_tokenize(text)
+    return list(text)
+
+
+def _batches(texts: Iterable, batch_size: int) -> Iterator[list]:
+    """Split an iterable into lists of at most batch_size items."""
+    texts = iter(texts)
+    while True:
+        batch = list(islice(texts, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+# Model of a worker process of ``POSTag.tag_many()``, loaded once per worker
+_WORKER_TAGGER = None
+
+
+def _init_worker(language: str, tagger: str, path: str):
+    """Load the tagger model into a worker process."""
+    global _WORKER_TAGGER  # pylint: disable=global-statement
+    _WORKER_TAGGER = _load_tagger_model(language, tagger, path)
+
+
+def _tag_batch_in_worker(batch: list) -> List[List[Tuple[str, str]]]:
+    """Tokenize and tag a batch of texts in a worker process."""
+    return _WORKER_TAGGER.tag_sents([_tokenize(text) for text in batch])
+
+
 class POSTag:
     """Tag words' parts-of-speech."""
 
@@ -72,6 +125,61 @@ class POSTag:
             tagger_paths[tagger_key] = tagger_path
         return tagger_paths
 
+    def _load_tagger(self, tagger: str):
+        """Return tagger model from the process-wide model cache, so that it
+        is unpickled only once, not on each call.
+        :param tagger: Key of tagger in ``TAGGERS``
+        :rtype : object
+        """
+        return _load_tagger_model(self.language, tagger, self.available_taggers[tagger])
+
+    def preload(self, *taggers: str):
+        """Load taggers into the model cache ahead of use. With no arguments,
+        all taggers available for the language are loaded.
+        :param taggers: Names of taggers, e.g. 'tnt', 'crf'
+        """
+        for tagger in taggers or self.available_taggers:
+            self._load_tagger(tagger)
+
+    def evict(self, *taggers: str):
+        """Remove taggers from the model cache. With no arguments, all of the
+        language's taggers are removed.
+        :param taggers: Names of taggers, e.g. 'tnt', 'crf'
+        """
+        if not taggers:
+            evict_models(self.language)
+        for tagger in taggers:
+            evict_models(self.language, tagger)
+
+    def tag_many(self, texts: Iterable[Union[str, Sequence[str]]], tagger: str = 'tnt',
+                 n_jobs: int = 1, batch_size: int = 256) -> Iterator[List[Tuple[str, str]]]:
+        """Tag many texts, yielding the tagged tokens of each, in input order.
+        Texts are tagged in batches, each with a single call to the tagger's
+        ``tag_sents()``. With ``n_jobs`` other than 1, batches are spread
+        across a pool of processes, each of which loads the model once, and
+        texts are only read as tagged batches are consumed.
+        :param texts: Untagged strings, which are tokenized with
+        ``wordpunct_tokenize()``, or lists of tokens
+        :param tagger: Name of tagger, e.g. 'tnt', 'crf'
+        :param n_jobs: Number of worker processes; -1 for one per CPU
+        :param batch_size: Number of texts sent to the tagger at once
+        :rtype : generator
+        """
+        assert tagger in self.available_taggers, \
+            "Tagger '{0}' not available for {1}.".format(tagger, self.language)
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+        if n_jobs == 1:
+            model = self._load_tagger(tagger)
+            for batch in _batches(texts, batch_size):
+                yield from model.tag_sents([_tokenize(text) for text in batch])
+            return
+        initargs = (self.language, tagger, self.available_taggers[tagger])
+        with multiprocessing.Pool(n_jobs, initializer=_init_worker, initargs=initargs) as pool:
+            tagged_batches = imap_bounded(pool, _tag_batch_in_worker, _batches(texts, batch_size),
+                                          2 * n_jobs, ordered=True)
+            yield from chain.from_iterable(tagged_batches)
+
     def tag_unigram(self, untagged_string: str):
         """Tag POS with unigram tagger.
         :type untagged_string: str
@@ -79,8 +187,7 @@ class POSTag:
         :rtype tagged_text: str
         """
         untagged_tokens = wordpunct_tokenize(untagged_string)
-        pickle_path = self.available_taggers['unigram']
-        tagger = open_pickle(pickle_path)
+        tagger = self._load_tagger('unigram')
         tagged_text = tagger.tag(untagged_tokens)
         return tagged_text
 
@@ -91,8 +198,7 @@ class POSTag:
         :rtype tagged_text: str
         """
         untagged_tokens = wordpunct_tokenize(untagged_string)
-        pickle_path = self.available_taggers['bigram']
-        tagger = open_pickle(pickle_path)
+        tagger = self._load_tagger('bigram')
         tagged_text = tagger.tag(untagged_tokens)
         return tagged_text
 
@@ -103,8 +209,7 @@ class POSTag:
         :rtype tagged_text: str
         """
         untagged_tokens = wordpunct_tokenize(untagged_string)
-        pickle_path = self.available_taggers['trigram']
-        tagger = open_pickle(pickle_path)
+        tagger = self._load_tagger('trigram')
         tagged_text = tagger.tag(untagged_tokens)
         return tagged_text
 
@@ -115,8 +220,7 @@ class POSTag:
         :rtype tagged_text: str
         """
         untagged_tokens = wordpunct_tokenize(untagged_string)
-        pickle_path = self.available_taggers['ngram_123_backoff']
-        tagger = open_pickle(pickle_path)
+        tagger = self._load_tagger('ngram_123_backoff')
         tagged_text = tagger.tag(untagged_tokens)
         return tagged_text
     
@@ -127,8 +231,7 @@ class POSTag:
         :rtype tagged_text: str
         """
         untagged_tokens = wordpunct_tokenize(untagged_string)
-        pickle_path = self.available_taggers['ngram_12_backoff']
-        tagger = open_pickle(pickle_path)
+        tagger = self._load_tagger('ngram_12_backoff')
         tagged_text = tagger.tag(untagged_tokens)
         return tagged_text     
     
@@ -139,8 +242,7 @@ class POSTag:
         :rtype tagged_text: str
         """
         untagged_tokens = wordpunct_tokenize(untagged_string)
-        pickle_path = self.available_taggers['tnt']
-        tagger = open_pickle(pickle_path)
+        tagger = self._load_tagger('tnt')
         tagged_text = tagger.tag(untagged_tokens)
         return tagged_text
 
@@ -151,9 +253,7 @@ class POSTag:
         :rtype tagged_text: str
         """
         untagged_tokens = wordpunct_tokenize(untagged_string)
-        pickle_path = self.available_taggers['crf']
-        tagger = CRFTagger()
-        tagger.set_model_file(pickle_path)
+        tagger = self._load_tagger('crf')
         tagged_text = tagger.tag(untagged_tokens)
         return tagged_text
 
@@ -164,7 +264,6 @@ class POSTag:
         :rtype tagged_text: str
         """
         untagged_tokens = wordpunct_tokenize(untagged_string)
-        pickle_path = self.available_taggers['perceptron']
-        tagger = open_pickle(pickle_path)
+        tagger = self._load_tagger('perceptron')
         tagged_text = tagger.tag(untagged_tokens)
         return tagged_text
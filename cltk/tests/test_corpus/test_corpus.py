@@ -1,10 +1,16 @@
 """Test cltk.corpus."""
 from unicodedata import normalize
+import io
+import json
 import os
+import shutil
+import sys
+import tempfile
 import unittest
 from unittest.mock import patch
 
 import nltk
+from nltk.tokenize import RegexpTokenizer, WordPunctTokenizer
 
 from cltk.corpus.greek.alphabet import expand_iota_subscript
 from cltk.corpus.greek.alphabet import filter_non_greek
@@ -29,7 +35,10 @@ from cltk.corpus.greek.tlg.parse_tlg_indices import get_date_of_author
 from cltk.corpus.greek.tlg.parse_tlg_indices import _get_epoch
 from cltk.corpus.greek.tlg.parse_tlg_indices import _check_number
 from cltk.corpus.greek.tlg.parse_tlg_indices import _handle_splits
+from cltk.corpus.greek.tei import iter_tei_body_text
+from cltk.corpus.greek.tei import onekgreek_tei_xml_to_text
 from cltk.corpus.greek.tlgu import TLGU
+from cltk.corpus.greek.tlgu import convert_files
 from cltk.corpus.middle_english.alphabet import normalize_middle_english
 from cltk.corpus.old_norse import runes
 from cltk.corpus.utils.formatter import assemble_phi5_author_filepaths
@@ -37,10 +46,12 @@ from cltk.corpus.utils.formatter import assemble_phi5_works_filepaths
 from cltk.corpus.utils.formatter import assemble_tlg_author_filepaths
 from cltk.corpus.utils.formatter import assemble_tlg_works_filepaths
 from cltk.corpus.utils.formatter import phi5_plaintext_cleanup
+from cltk.corpus.utils.formatter import phi5_plaintext_cleanup_stream
 from cltk.corpus.utils.formatter import remove_non_ascii
 from cltk.corpus.utils.formatter import remove_non_latin
 from cltk.corpus.utils.formatter import tonos_oxia_converter
 from cltk.corpus.utils.formatter import tlg_plaintext_cleanup
+from cltk.corpus.utils.formatter import tlg_plaintext_cleanup_stream
 from cltk.corpus.utils.formatter import cltk_normalize
 from cltk.corpus.utils.importer import CorpusImporter
 from cltk.corpus.utils.importer import CorpusImportError
@@ -55,6 +66,8 @@ from cltk.corpus.egyptian.transliterate_mdc import mdc_unicode
 from cltk.corpus.utils.formatter import normalize_fr
 from cltk.corpus.swadesh import Swadesh
 from cltk.corpus.readers import assemble_corpus, get_corpus_reader
+from cltk.corpus.readers import FilteredPlaintextCorpusReader, JsonfileCorpusReader
+from cltk.corpus.token_cache import TokenCache, read_tokenized, write_tokenized
 from cltk.corpus.latin.latin_library_corpus_types import corpus_texts_by_type, \
     corpus_directories_by_type
 from cltk.utils.matrix_corpus_fun import distinct_words
@@ -199,6 +212,31 @@ argenteo polubro, aureo eclutro. """
         target = 'Ì Virum áge mihi'
         self.assertEqual(clean, target)
 
+    def test_tlg_plaintext_cleanup_stream(self):
+        """Test post-TLGU cleanup of a file object of Greek TLG text."""
+        dirty = """{ΑΘΗΝΑΙΟΥ ΝΑΥΚΡΑΤΙΤΟΥ}\n  Ἀθήναιος (μὲν) ὁ τῆς 999 βίβ-\nλου πατήρ:\n\n ποιεῖται δὲ."""
+        target = tlg_plaintext_cleanup(dirty, rm_punctuation=True, rm_periods=True)
+        self.assertEqual(target, ' Ἀθήναιος ὁ τῆς βίβλου πατήρ ποιεῖται δὲ')
+        for chunk_size in [1, 5, 1000]:
+            chunks = tlg_plaintext_cleanup_stream(io.StringIO(dirty), rm_punctuation=True,
+                                                  rm_periods=True, chunk_size=chunk_size)
+            self.assertEqual(''.join(chunks), target)
+
+    def test_phi5_plaintext_cleanup_stream(self):
+        """Test post-TLGU cleanup of a file object of Latin PHI5 text."""
+        dirty = """        {ODYSSIA}
+Virum áge 999 mihi, Camena, (insece) versutum.
+Pater noster, Saturni filie . . .  """
+        target = phi5_plaintext_cleanup(dirty)
+        for chunk_size in [1, 7, 1000]:
+            chunks = phi5_plaintext_cleanup_stream(io.StringIO(dirty), chunk_size=chunk_size)
+            self.assertEqual(''.join(chunks), target)
+
+    def test_plaintext_cleanup_only_punctuation(self):
+        """Test that text of only punctuation is removed entirely."""
+        self.assertEqual(tlg_plaintext_cleanup(',:', rm_punctuation=True), '')
+        self.assertEqual(phi5_plaintext_cleanup(',:', rm_punctuation=True), '')
+
     def test_cltk_normalize_compatible(self):
         """Test Normalizing Text with compatibility True"""
         s1 = 'café'
@@ -788,6 +826,234 @@ class TestFilteredCorpus(unittest.TestCase):
             """Test filtered corpus sizes method."""
             self.assertTrue(len(list(self.reader.sizes())) > 0)
 
+class TestTokenCache(unittest.TestCase):
+    """Test the on-disk cache of tokenized files, and the readers using it."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, 'cache')
+        self.corpus_dir = os.path.join(self.temp_dir, 'corpus')
+        os.mkdir(self.corpus_dir)
+        with open(os.path.join(self.corpus_dir, 'caesar.txt'), 'w') as file_open:
+            file_open.write('Gallia est omnis divisa in partes tres. Quarum unam incolunt Belgae.\n\n'
+                            'The Latin Library\n\n'
+                            'Hi omnes lingua, institutis, legibus inter se differunt.\n')
+        with open(os.path.join(self.corpus_dir, 'cicero__de_amicitia__latin.json'), 'w') as file_open:
+            json.dump({'text': {'2': {'1': ' Nam et secundas res splendidiores facit amicitia. ',
+                                      '2': 'Latin Library'},
+                                '1': 'Quintus Mucius augur multa narrare solebat. Est amicitia.'}},
+                      file_open)
+        self.tokenizers = {'sent_tokenizer': RegexpTokenizer(r'[^.\s][^.]*\.?'),
+                           'word_tokenizer': WordPunctTokenizer()}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _readers(self, token_cache=None):
+        return [FilteredPlaintextCorpusReader(self.corpus_dir, r'.*\.txt', skip_keywords=['Library'],
+                                              token_cache=token_cache, **self.tokenizers),
+                JsonfileCorpusReader(self.corpus_dir, skip_keywords=['Library'],
+                                     target_language='latin', token_cache=token_cache,
+                                     **self.tokenizers)]
+
+    def test_write_read_tokenized(self):
+        """Test that a tokenized file is read back as written, only with the same key and stat."""
+        os.mkdir(self.cache_dir)
+        path = os.path.join(self.cache_dir, 'test.cltktok')
+        paras = [('Gallia est. Omnis.', [('Gallia est.', ['Gallia', 'est', '.']),
+                                         ('Omnis.', ['Omnis', '.'])]),
+                 ('', []),
+                 ('Ἄνδρα μοι', [('Ἄνδρα μοι', ['Ἄνδρα', 'μοι'])])]
+        write_tokenized(path, paras, (1.5, 10), b'k' * 16)
+        self.assertEqual(read_tokenized(path, (1.5, 10), b'k' * 16), paras)
+        self.assertIsNone(read_tokenized(path, (2.5, 10), b'k' * 16))
+        self.assertIsNone(read_tokenized(path, (1.5, 10), b'j' * 16))
+        untexted = [(None, [(None, words) for _, words in sents]) for _, sents in paras]
+        write_tokenized(path, untexted, (1.5, 10), b'k' * 16)
+        self.assertEqual(read_tokenized(path, (1.5, 10), b'k' * 16), untexted)
+
+    def test_readers_token_cache(self):
+        """Test that cached readers give the same results as uncached ones, and tokenize once."""
+        expected = [[list(getattr(reader, method)()) for method in ('paras', 'sents', 'words')]
+                    for reader in self._readers()]
+        self.assertEqual(expected[1][0], ['Quintus Mucius augur multa narrare solebat. Est amicitia.',
+                                          'Nam et secundas res splendidiores facit amicitia.'])
+        for reader, reader_expected in zip(self._readers(self.cache_dir), expected):
+            for method, method_expected in zip(('paras', 'sents', 'words'), reader_expected):
+                self.assertEqual(list(getattr(reader, method)()), method_expected)
+            with patch.object(reader, '_tokenize_file', side_effect=AssertionError):
+                self.assertEqual(list(reader.words()), reader_expected[2])
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_token_cache_key(self):
+        """Test that different tokenizers, and changed files, are not served stale tokens."""
+        reader = self._readers(self.cache_dir)[0]
+        list(reader.words())
+        reader_2 = FilteredPlaintextCorpusReader(self.corpus_dir, r'.*\.txt',
+                                                 token_cache=self.cache_dir,
+                                                 sent_tokenizer=self.tokenizers['sent_tokenizer'],
+                                                 word_tokenizer=RegexpTokenizer(r'\w+'))
+        self.assertNotIn('.', list(reader_2.words()))
+        path = os.path.join(self.corpus_dir, 'caesar.txt')
+        with open(path, 'a') as file_open:
+            file_open.write('\nFinis.\n')
+        self.assertEqual(list(reader.words())[-2:], ['Finis', '.'])
+        self.assertEqual(TokenCache(self.cache_dir).clear(), 2)
+
+
+class TestParallelReaders(unittest.TestCase):
+    """Test reading files in worker processes."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        for number in range(5):
+            with open(os.path.join(self.temp_dir, 'text{}.txt'.format(number)), 'w') as file_open:
+                file_open.write('Liber {0}. Gallia est omnis divisa.\n\nCapitulum {0}.\n'.format(number))
+            with open(os.path.join(self.temp_dir, 'text{}__latin.json'.format(number)), 'w') as file_open:
+                json.dump({'text': {'1': 'Liber {}. Est amicitia.'.format(number), '2': 'Finis.'}},
+                          file_open)
+        self.tokenizers = {'sent_tokenizer': RegexpTokenizer(r'[^.\s][^.]*\.?'),
+                           'word_tokenizer': WordPunctTokenizer()}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _readers(self, workers):
+        return [FilteredPlaintextCorpusReader(self.temp_dir, r'.*\.txt', workers=workers,
+                                              **self.tokenizers),
+                JsonfileCorpusReader(self.temp_dir, target_language='latin', workers=workers,
+                                     **self.tokenizers)]
+
+    def test_parallel_readers(self):
+        """Test that reading in workers gives the same results, in the same order."""
+        for serial, parallel in zip(self._readers(1), self._readers(2)):
+            for method in ('docs', 'paras', 'sents', 'words'):
+                self.assertEqual(list(getattr(parallel, method)()), list(getattr(serial, method)()))
+            fileids = serial.fileids()[1:3]
+            self.assertEqual(list(parallel.words(fileids)), list(serial.words(fileids)))
+
+    def test_unordered(self):
+        """Test that unordered() gives the results of each file, tagged with its fileid."""
+        for serial, parallel in zip(self._readers(1), self._readers(2)):
+            expected = [(fileid, list(serial.sents([fileid]))) for fileid in serial.fileids()]
+            self.assertEqual(list(serial.unordered('sents')), expected)
+            self.assertEqual(sorted(parallel.unordered('sents')), expected)
+
+    def test_worker_errors(self):
+        """Test that errors in worker processes reach the caller."""
+        with open(os.path.join(self.temp_dir, 'text5__latin.json'), 'w') as file_open:
+            json.dump({'title': 'Sine textu'}, file_open)
+        reader = self._readers(2)[1]
+        with self.assertRaises(KeyError):
+            list(reader.sents())
+        with self.assertRaises(KeyError):
+            list(reader.unordered('sents'))
+
+
+class TestTEI(unittest.TestCase):
+    """Test conversion of TEI XML to plaintext."""
+
+    TEI = """<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader><title>Header</title></teiHeader>
+<text><front>Front</front><body>a<div n="1"><l>ἐν ἀρχῇ <hi>ἦν</hi> ὁ λόγος<!-- comment --></l>b<lb/>c<l>d<note>e</note></l></div>
+<div n="2">f</div>g</body><back>Back</back></text></TEI>"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xml_dir = os.path.join(self.temp_dir, 'greek', 'text', 'greek_text_first1kgreek', 'data', 'tlg0001', 'tlg001')  # pylint: disable=line-too-long
+        os.makedirs(self.xml_dir)
+        self.xml_path = os.path.join(self.xml_dir, 'tlg0001.tlg001.1st1K-grc1.xml')
+        with open(self.xml_path, 'w') as file_open:
+            file_open.write(self.TEI)
+        with open(os.path.join(self.xml_dir, '__cts__.xml'), 'w') as file_open:
+            file_open.write(self.TEI)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_iter_tei_body_text(self):
+        """Test that only the text within the body is kept, in order."""
+        text = ''.join(iter_tei_body_text(self.xml_path))
+        self.assertEqual(text, 'aἐν ἀρχῇ ἦν ὁ λόγοςbcde\nfg')
+
+    def test_onekgreek_tei_xml_to_text(self):
+        """Test that files are converted, and skipped until they change."""
+        with patch('cltk.corpus.greek.tei.get_cltk_data_dir', create=True, return_value=self.temp_dir):
+            plaintext_paths = onekgreek_tei_xml_to_text()
+            self.assertEqual([os.path.basename(path) for path in plaintext_paths],
+                             ['tlg0001.tlg001.1st1K-grc1.txt'])
+            with open(plaintext_paths[0]) as file_open:
+                self.assertEqual(file_open.read(), 'aἐν ἀρχῇ ἦν ὁ λόγοςbcde\nfg')
+            self.assertEqual(onekgreek_tei_xml_to_text(), [])
+            os.utime(self.xml_path, (os.path.getmtime(plaintext_paths[0]) + 10,) * 2)
+            self.assertEqual(onekgreek_tei_xml_to_text(workers=2), plaintext_paths)
+
+
+class TestTLGUScheduler(unittest.TestCase):
+    """Test conversion of files with tlgu, replaced by a script copying its
+    input (and dividing it into two works, with ``-W``)."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.fake_tlgu = os.path.join(self.temp_dir, 'tlgu')
+        with open(self.fake_tlgu, 'w') as file_open:
+            file_open.write("""#!{}
+import shutil, sys
+*options, input_path, output_path = sys.argv[1:]
+if 'FAIL' in input_path:
+    sys.exit(1)
+if '-W' in options:
+    for work in ('-001.txt', '-002.txt'):
+        shutil.copy(input_path, output_path + work)
+else:
+    shutil.copy(input_path, output_path)
+""".format(sys.executable))
+        os.chmod(self.fake_tlgu, 0o755)
+        self.orig_dir = os.path.join(self.temp_dir, 'orig')
+        self.target_dir = os.path.join(self.temp_dir, 'target')
+        os.mkdir(self.orig_dir)
+        os.mkdir(self.target_dir)
+        for name in ('TLG0001.TXT', 'TLG0002.TXT', 'TLGFAIL.TXT'):
+            with open(os.path.join(self.orig_dir, name), 'w') as file_open:
+                file_open.write(name)
+        self.manifest_path = os.path.join(self.target_dir, '.tlgu_manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _jobs(self, options):
+        return [(os.path.join(self.orig_dir, name), os.path.join(self.target_dir, name), options)
+                for name in sorted(os.listdir(self.orig_dir))]
+
+    def test_convert_files(self):
+        """Test that files are converted once, and failures are not recorded."""
+        with patch('cltk.corpus.greek.tlgu.TLGU_BINARY', self.fake_tlgu):
+            converted = convert_files(self._jobs([]), self.manifest_path, workers=2)
+            self.assertEqual(sorted(converted), ['TLG0001.TXT', 'TLG0002.TXT'])
+            self.assertEqual(sorted(converted['TLG0001.TXT']['outputs']), ['TLG0001.TXT'])
+            self.assertEqual(sorted(os.listdir(self.target_dir)),
+                             ['.tlgu_manifest.json', 'TLG0001.TXT', 'TLG0002.TXT'])
+            # Only the failed file is tried again
+            self.assertEqual(convert_files(self._jobs([]), self.manifest_path), {})
+            # Changed options and changed inputs are converted again
+            self.assertEqual(len(convert_files(self._jobs(['-r']), self.manifest_path)), 2)
+            input_path = os.path.join(self.orig_dir, 'TLG0001.TXT')
+            os.utime(input_path, (os.path.getmtime(input_path) + 10,) * 2)
+            self.assertEqual(list(convert_files(self._jobs(['-r']), self.manifest_path)),
+                             ['TLG0001.TXT'])
+            self.assertEqual(len(convert_files(self._jobs(['-r']), self.manifest_path, force=True)), 2)
+
+    def test_convert_files_divide_works(self):
+        """Test that divided works are recorded and skipped."""
+        with patch('cltk.corpus.greek.tlgu.TLGU_BINARY', self.fake_tlgu):
+            converted = convert_files(self._jobs(['-W']), self.manifest_path)
+            self.assertEqual(sorted(converted['TLG0002.TXT']['outputs']),
+                             ['TLG0002.TXT-001.txt', 'TLG0002.TXT-002.txt'])
+            os.remove(os.path.join(self.target_dir, 'TLG0002.TXT-002.txt'))
+            self.assertEqual(list(convert_files(self._jobs(['-W']), self.manifest_path)),
+                             ['TLG0002.TXT'])
+
+
 class TestUnicode(unittest.TestCase):
     "Test py23char"
 
@@ -4,16 +4,26 @@ TODO: Test Greek version of some of these.
 TODO: Figure out how to test functions relying on word2vec/gensim.
 TODO: Update tests for keyword exapansion additions to ir.py module.
 
-TODO: Figure out a way to test boolean module (which relies on local corpora).
+TODO: Test boolean module against the real corpora (which must be local).
 """
 
+import os
+import shutil
+import tempfile
 import unittest
+from unittest.mock import patch
 
+from whoosh.index import open_dir
+
+from cltk.ir.boolean import CLTKIndex
+from cltk.ir.positional import PositionalIndex
+from cltk.ir.positional import required_words
 from cltk.ir.query import _window_match
 from cltk.ir.query import _regex_span
 from cltk.ir.query import _paragraph_context
 from cltk.ir.query import _sentence_context
 from cltk.ir.query import match_regex
+from cltk.ir.query import search_corpus
 
 __license__ = 'MIT License. See LICENSE.'
 
@@ -123,5 +133,162 @@ Et si volueris attendere, maxima pars vitae elabitur male agentibus, magna nihil
         self.assertEqual(sent, sent_target)
 
 
+class TestCLTKIndex(unittest.TestCase):
+    """Test CLTKIndex on a small corpus in a temporary dir."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cltk_index = CLTKIndex('latin', 'phi5')
+        self.cltk_index.corpus_path = os.path.join(self.temp_dir, 'plaintext')
+        self.cltk_index.index_path = os.path.join(self.temp_dir, 'index')
+        self.cltk_index.manifest_path = os.path.join(self.temp_dir, 'index', 'manifest.json')
+        os.makedirs(self.cltk_index.corpus_path)
+        self._write('LAT0474.TXT', 'quae est amicitia')
+        self._write('LAT0119.TXT', 'miles gloriosus')
+        self._write('LAT9999.TXT', 'amicitia ignota')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, text):
+        with open(os.path.join(self.cltk_index.corpus_path, name), 'w') as file_open:
+            file_open.write(text)
+
+    def _authors(self, word):
+        with open_dir(self.cltk_index.index_path).searcher() as searcher:
+            return sorted(fields['author'] for fields in searcher.documents(content=word))
+
+    def test_index_corpus_incremental(self):
+        """Test that only changed files are re-indexed."""
+        self.assertEqual(self.cltk_index.index_corpus(), (2, 0))
+        self.assertEqual(self._authors('amicitia'), ['Marcus Tullius Cicero, Cicero, Tully'])
+        self.assertEqual(self.cltk_index.index_corpus(incremental=True), (0, 0))
+        # A new mtime with the same content only updates the manifest
+        os.utime(os.path.join(self.cltk_index.corpus_path, 'LAT0119.TXT'), (1, 1))
+        self.assertEqual(self.cltk_index.index_corpus(incremental=True), (0, 0))
+        self._write('LAT0474.TXT', 'de senectute')
+        os.remove(os.path.join(self.cltk_index.corpus_path, 'LAT0119.TXT'))
+        self.assertEqual(self.cltk_index.index_corpus(incremental=True), (1, 1))
+        self.assertEqual(self._authors('amicitia'), [])
+        self.assertEqual(self._authors('senectute'), ['Marcus Tullius Cicero, Cicero, Tully'])
+        self.assertEqual(self._authors('miles'), [])
+
+    def test_index_corpus_no_manifest(self):
+        """Test that an index without a manifest is re-indexed, not added to."""
+        self.cltk_index.index_corpus()
+        os.remove(self.cltk_index.manifest_path)
+        self.assertEqual(self.cltk_index.index_corpus(incremental=True), (2, 0))
+        with open_dir(self.cltk_index.index_path).searcher() as searcher:
+            self.assertEqual(searcher.doc_count(), 2)
+        self.assertEqual(self._authors('amicitia'), ['Marcus Tullius Cicero, Cicero, Tully'])
+
+    def test_index_corpus_procs(self):
+        """Test indexing in several processes."""
+        self.assertEqual(self.cltk_index.index_corpus(procs=2, multisegment=True), (2, 0))
+        self.assertEqual(self._authors('gloriosus'), ['Titus Maccius Plautus'])
+
+    def test_corpus_query_iter(self):
+        """Test paging through hits with offsets and snippets."""
+        self._write('LAT0119.TXT', 'amicitia, amicitia & miles')
+        self.cltk_index.index_corpus()
+        hits = list(self.cltk_index.corpus_query_iter('amicitia OR miles', pagelen=1,
+                                                      surround_size=3))
+        self.assertEqual(len(hits), 2)
+        hit = [hit for hit in hits if hit.author == 'Titus Maccius Plautus'][0]
+        self.assertEqual(hit.path, os.path.join(self.cltk_index.corpus_path, 'LAT0119.TXT'))
+        self.assertEqual(hit.offsets, [(0, 8, 0), (10, 18, 0), (21, 26, 1)])
+        self.assertEqual(hit.snippets, ['<b class="match term0">amicitia</b>, '
+                                        '<b class="match term0">amicitia</b> &amp; '
+                                        '<b class="match term1">miles</b>'])
+        total, page = self.cltk_index.corpus_query_page('gloriosus amicitia')
+        self.assertEqual((total, page), (0, []))
+        output = self.cltk_index.corpus_query('miles')
+        self.assertTrue(output.startswith('Docs containing hits: 1.'))
+
+    def test_corpus_query_refresh(self):
+        """Test that the searcher kept open sees changes to the index."""
+        self.cltk_index.index_corpus()
+        self.assertEqual(self.cltk_index.corpus_query_page('senectute')[0], 0)
+        searcher = self.cltk_index._searcher()
+        self._write('LAT0474.TXT', 'de senectute')
+        self.cltk_index.index_corpus(incremental=True)
+        self.assertEqual(self.cltk_index.corpus_query_page('senectute')[0], 1)
+        self.assertTrue(searcher.is_closed)
+        self.cltk_index.close()
+        self.assertEqual(self.cltk_index.corpus_query_page('amicitia')[0], 0)
+        self.cltk_index.close()
+
+
+class TestPositionalIndex(unittest.TestCase):
+    """Test PositionalIndex on files in a temporary dir."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        texts = ['Quae est amicitia? Amicitiae de senectute.\nAmicitia est.',
+                 'Straße et amicus est, de amico.',
+                 'Nihil.']
+        self.paths = []
+        for number, text in enumerate(texts):
+            path = os.path.join(self.temp_dir, 'LAT000{}.TXT'.format(number))
+            with open(path, 'w') as file_open:
+                file_open.write(text)
+            self.paths.append(path)
+        self.index = PositionalIndex.build(self.paths, os.path.join(self.temp_dir, 'index'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_required_words(self):
+        """Test required_words()."""
+        self.assertEqual(required_words(r'de amic\w+'), [('de', False, True), ('amic', True, False)])
+        self.assertEqual(required_words(r'\bAmicitia'), [('amicitia', True, False)])
+        self.assertEqual(required_words(r'amicitia|nihil'), [])
+        self.assertIsNone(required_words(r'(?:amicitia){e<=1}'))
+
+    def test_spans(self):
+        """Test that searching spans finds the same matches as a full search."""
+        self.assertEqual(len(self.index), 15)
+        self.assertEqual(sorted(self.index.spans(r'\bamicitia\b')), [self.paths[0]])
+        self.assertEqual(sorted(self.index.spans(r'strasse')), [self.paths[1]])
+        self.assertIsNone(self.index.spans(r'amicitia|nihil'))
+        self.assertIsNone(self.index.spans(r'e'))
+        for pattern in [r'\bamicitia\b', r'amicitia', r'de amic\w', r'est\.', r'strasse', r'icu']:
+            spans = self.index.spans(pattern)
+            if spans is None:  # Too frequent in so small a corpus
+                continue
+            for path in self.paths:
+                with open(path) as file_open:
+                    text = file_open.read()
+                expected = [match.span() for match in _regex_span(pattern, text)]
+                found = [match.span() for match in _regex_span(pattern, text, spans=spans[path])] \
+                    if path in spans else []
+                self.assertEqual(found, expected)
+
+    def test_is_current(self):
+        """Test that changed files are detected."""
+        self.assertTrue(self.index.is_current(self.paths[0]))
+        os.utime(self.paths[0], (1, 1))
+        self.assertFalse(self.index.is_current(self.paths[0]))
+        self.assertFalse(self.index.is_current(os.path.join(self.temp_dir, 'LAT9999.TXT')))
+
+    def test_search_corpus_workers(self):
+        """Test that searching in worker processes finds the same matches,
+        including overlapping matches of different patterns."""
+        corpus_files = ('latin', {'LAT0000': 'Cicero', 'LAT0001': 'Plautus', 'LAT0002': 'Seneca'},
+                        self.paths)
+        with patch('cltk.ir.query._corpus_files', return_value=corpus_files), \
+                patch('cltk.ir.query._load_positional_index', return_value=self.index), \
+                patch('cltk.ir.query._keyword_expander', return_value=['amic']), \
+                patch('builtins.print'):
+            for use_index in [False, True]:
+                matches = [sorted(search_corpus('amicitia', 'phi5', context=5, expand_keyword=True,
+                                                use_index=use_index, workers=workers))
+                           for workers in [1, 2]]
+                self.assertEqual(matches[0], matches[1])
+                self.assertEqual(matches[0][:2], [('Cicero', ' est *amic*itia?'),
+                                                  ('Cicero', ' est *amicitia*? Ami')])
+                self.assertEqual(len(matches[0]), 8)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,6 @@
 """Test cltk.lemmatize."""
 import os
+import tempfile
 import unittest
 from unittest.mock import patch
 
@@ -12,6 +13,7 @@ from cltk.lemmatize.backoff import IdentityLemmatizer
 from cltk.lemmatize.backoff import UnigramLemmatizer
 from cltk.lemmatize.backoff import DictLemmatizer
 from cltk.lemmatize.backoff import RegexpLemmatizer
+from cltk.lemmatize.backoff import save_backoff_model
 
 from cltk.lemmatize.latin.backoff import BackoffLatinLemmatizer
 from cltk.lemmatize.latin.backoff import RomanNumeralLemmatizer # Removed temporarily
@@ -89,6 +91,32 @@ class TestSequenceFunctions(unittest.TestCase):
         lemmas = lemmatizer.lemmatize(tokens)
         self.assertEqual(lemmas, target)
 
+    def test_backoff_chain_verbose(self):
+        """Test a backoff chain lemmatized stage by stage, with verbose output"""
+        identity = IdentityLemmatizer(verbose=True)
+        regexp = RegexpLemmatizer([('(.)tat(is|i|em|e|es|um|ibus)$', r'\1tas')], source='Regex', backoff=identity, verbose=True)  # pylint: disable=line-too-long
+        unigram = UnigramLemmatizer(train=[[('cano', 'cano')]], source='Train', backoff=regexp, verbose=True)
+        lemmatizer = DictLemmatizer(lemmas={'arma': 'arma', 'uirum': 'uir'}, source='Dict', backoff=unigram, verbose=True)  # pylint: disable=line-too-long
+        tokens = 'arma uirum nobilitatis cano que'.split()
+        target = [('arma', 'arma', '<DictLemmatizer: Dict>'),
+                  ('uirum', 'uir', '<DictLemmatizer: Dict>'),
+                  ('nobilitatis', 'nobilitas', '<RegexpLemmatizer: Regex>'),
+                  ('cano', 'cano', '<UnigramLemmatizer: Train>'),
+                  ('que', 'que', '<IdentityLemmatizer>')]
+        self.assertEqual(lemmatizer.lemmatize(tokens), target)
+
+    def test_backoff_chain_with_history(self):
+        """Test that a backoff chain with a lemmatizer which uses ``history``
+        is lemmatized token by token"""
+        class PreviousLemmatizer(DictLemmatizer):
+            """Lemmatize a token as the lemma of the one before it."""
+            def choose_tag(self, tokens, index, history):
+                return history[-1] if history else None
+
+        lemmatizer = PreviousLemmatizer(lemmas={}, backoff=DictLemmatizer(lemmas={'arma': 'ARMA'}))
+        target = [('arma', 'ARMA'), ('uirum', 'ARMA'), ('cano', 'ARMA')]
+        self.assertEqual(lemmatizer.lemmatize(['arma', 'uirum', 'cano']), target)
+
     def test_regex_lemmatizer(self):
         """Test regex_lemmatizer()"""
         sub = [('(.)ab(o|is|it|imus|itis|unt)$', r'\1o')]
@@ -103,6 +131,24 @@ class TestSequenceFunctions(unittest.TestCase):
         lemmas = lemmatizer.lemmatize(tokens)
         self.assertEqual(lemmas, target)
 
+    def test_regex_lemmatizer_pattern_order(self):
+        """Test that regex_lemmatizer() applies the first matching pattern,
+        inc. patterns which are not anchored to the end of the token"""
+        sub = [('(.)tat(is|i|em)$', r'\1tas'),
+               ('(b)(o|is)$', r'\1X'),
+               ('^(nobil)', r'\1Y'),
+               ('(.)is$', r'\1Z')]
+        lemmatizer = RegexpLemmatizer(sub)
+        tokens = ['nobilitatis', 'nobilis', 'crudelis', 'bibo', 'arma', '']
+        target = [('nobilitatis', 'nobilitas'), ('nobilis', 'nobilYis'),
+                  ('crudelis', 'crudelZ'), ('bibo', 'bibX'), ('arma', None), ('', None)]
+        self.assertEqual(lemmatizer.lemmatize(tokens), target)
+        # '$' applies only to the last alternative
+        lemmatizer = RegexpLemmatizer([('^ab|cd$', 'X'), (r'[|\]]x|y$', 'Y')])
+        self.assertEqual(lemmatizer.lemmatize(['abz', 'cd', 'zcdz', ']xz', 'zy', 'zx']),
+                         [('abz', 'Xz'), ('cd', 'X'), ('zcdz', None), (']xz', 'Yz'),
+                          ('zy', 'zY'), ('zx', None)])
+
     def test_roman_numeral_lemmatizer(self):
         """Test roman_numeral_lemmatizer()"""
         lemmatizer = RomanNumeralLemmatizer()
@@ -170,6 +216,23 @@ class TestSequenceFunctions(unittest.TestCase):
             with self.assertRaises(FileNotFoundError):
                 lemmatizer = BackoffLatinLemmatizer()
 
+    def test_backoff_latin_lemmatizer_inference_model(self):
+        """Test BackoffLatinLemmatizer set up from saved lookup tables"""
+        lemmatizer = BackoffLatinLemmatizer()
+        tokens = 'arma uirumque cano nobilitatis'.split()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = lemmatizer.save_inference_model(os.path.join(temp_dir, 'latin_backoff_lookups.pickle'))
+            fast_lemmatizer = BackoffLatinLemmatizer.from_inference_model(path)
+        self.assertEqual(fast_lemmatizer.lemmatize(tokens), lemmatizer.lemmatize(tokens))
+        self.assertIsNone(fast_lemmatizer.train)
+        with self.assertRaises(AssertionError):
+            fast_lemmatizer.evaluate()
+
+    def test_backoff_latin_lemmatizer_inference_model_not_present(self):
+        """Test error for missing BackoffLatinLemmatizer inference model"""
+        with self.assertRaises(FileNotFoundError):
+            BackoffLatinLemmatizer.from_inference_model('cltk/tests/doesnt_exist.pickle')
+
     def test_backoff_greek_lemmatizer(self):
         """Test backoffLatinLemmatizer"""
         train = [[('χθὲς', 'χθές'), ('εἰς', 'εἰς'), ('μετὰ', 'μετά'), ('τοῦ', 'ὁ')]]  # pylint: disable=line-too-long
@@ -197,5 +260,25 @@ class TestSequenceFunctions(unittest.TestCase):
         target = [('li', 'li'), ('rois', 'rois'), ('pense', 'pense'), ('que', 'que'), ('par', 'par'), ('folie', 'folie'), (',', ['PUNK']), ('sire', 'sire'), ('tristran', 'None'), (',', ['PUNK']), ('vos', 'vos'), ('aie', ['avoir']), ('amé', 'amer'), (';', ['PUNK']), ('mais', 'mais'), ('dé', 'dé'), ('plevis', 'plevir'), ('ma', 'ma'), ('loiauté', 'loiauté'), (',', ['PUNK']), ('qui', 'qui'), ('sor', 'sor'), ('mon', 'mon'), ('cors', 'cors'), ('mete', 'mete'), ('flaele', 'flaele'), (',', ['PUNK']), ("s'", "s'"), ('onques', 'onques'), ('fors', 'fors'), ('cil', 'cil'), ('qui', 'qui'), ("m'", "m'"), ('ot', 'ot'), ('pucele', 'pucele'), ('out', ['avoir']), ("m'", "m'"), ('amistié', 'amistié'), ('encor', 'encor'), ('nul', 'nul'), ('jor', 'jor'), ('!', ['PUNK'])]
         self.assertEqual(lemmas, target)
 
+class TestInferenceModel(unittest.TestCase):
+    """Test backoff lemmatizers set up from saved lookup tables, without the
+    models in cltk_data."""
+
+    def test_from_inference_model(self):
+        """Test that from_inference_model() goes through __init__() and uses the saved lookups"""
+        lookups = {'old_model': {'cano': 'cano'}, 'model': {'arma': 'arma'}, 'unigram': {'uirumque': 'uir'}}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for cls, language in ((BackoffLatinLemmatizer, 'latin'), (BackoffGreekLemmatizer, 'greek')):
+                path = os.path.join(temp_dir, language + '.pickle')
+                save_backoff_model(path, language, 7, lookups, [])
+                with patch.object(cls, '__init__', side_effect=cls.__init__, autospec=True) as init:
+                    lemmatizer = cls.from_inference_model(path)
+                init.assert_called_once()
+                self.assertEqual(lemmatizer.seed, 7)
+                self.assertIsNone(lemmatizer.train)
+                self.assertEqual(lemmatizer.lemmatize(['arma', 'uirumque', 'cano']),
+                                 [('arma', 'arma'), ('uirumque', 'uir'), ('cano', 'cano')])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,13 +1,18 @@
 """Test cltk.tag."""
 
 import os
+import pickle
 import shutil
+import tempfile
 import unittest
+from unittest.mock import patch
+
+from nltk.tag import UnigramTagger
 
 from cltk.corpus.utils.importer import CorpusImporter
 from cltk.stem.latin.j_v import JVReplacer
 from cltk.tag import ner
-from cltk.tag.ner import NamedEntityReplacer
+from cltk.tag.ner import EntityIndex, NamedEntityReplacer
 from cltk.tag.pos import POSTag
 
 __license__ = 'MIT License. See LICENSE.'
@@ -122,6 +127,15 @@ class TestSequenceFunctions(unittest.TestCase):  # pylint: disable=R0904
         tagged = tagger.tag_tnt('Gallia est omnis divisa in partes tres')
         self.assertTrue(tagged)
 
+    def test_pos_tag_many_latin(self):
+        """Test batch tagging Latin POS, serially and with worker processes."""
+        tagger = POSTag('latin')
+        texts = ['Gallia est omnis divisa in partes tres',
+                 ['quarum', 'unam', 'incolunt', 'Belgae']]
+        expected = [tagger.tag_unigram(texts[0]), tagger.tag_unigram(' '.join(texts[1]))]
+        self.assertEqual(list(tagger.tag_many(texts, tagger='unigram')), expected)
+        self.assertEqual(list(tagger.tag_many(texts, tagger='unigram', n_jobs=2, batch_size=1)), expected)
+
     def test_pos_crf_tagger_latin(self):
         """Test tagging Latin POS with CRF tagger."""
         tagger = POSTag('latin')
@@ -267,5 +281,57 @@ class TestSequenceFunctions(unittest.TestCase):  # pylint: disable=R0904
         tagged = tagger.tag_perceptron('Hwæt! We Gardena in geardagum, þeodcyninga, þrym gefrunon, hu ða æþelingas ellen fremedon.')
         self.assertTrue(tagged)
 
+
+class TestPOSTagMany(unittest.TestCase):
+    """Test batch tagging with a small tagger, which needs no data download."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'unigram.pickle')
+        with open(self.path, 'wb') as file_open:
+            pickle.dump(UnigramTagger([[('Gallia', 'N'), ('est', 'V'), ('omnis', 'A')]]), file_open)
+        with patch.object(POSTag, '_setup_language_variables', return_value={'unigram': self.path}):
+            self.tagger = POSTag('latin')
+
+    def tearDown(self):
+        self.tagger.evict()
+        shutil.rmtree(self.temp_dir)
+
+    def test_tag_many_generator(self):
+        """Test that texts from a generator are tagged in order in worker processes."""
+        texts = ['Gallia est omnis', 'omnis Gallia', ['est'], 'divisa est'] * 5
+        expected = list(self.tagger.tag_many(texts, tagger='unigram'))
+        self.assertEqual(expected[:2], [[('Gallia', 'N'), ('est', 'V'), ('omnis', 'A')],
+                                        [('omnis', 'A'), ('Gallia', 'N')]])
+        read = []
+
+        def _texts():
+            for text in texts:
+                read.append(text)
+                yield text
+
+        tagged = self.tagger.tag_many(_texts(), tagger='unigram', n_jobs=2, batch_size=3)
+        self.assertEqual(next(tagged), expected[0])
+        # No more than 2 batches per worker are read ahead of the caller
+        self.assertLessEqual(len(read), 2 * 2 * 3)
+        self.assertEqual([expected[0]] + list(tagged), expected)
+
+
+class TestEntityIndex(unittest.TestCase):
+    """Test the entity index used by NER, which needs no data download."""
+
+    def test_entity_index_tag(self):
+        """Test longest multi-word names are matched, and single words looked
+        up otherwise."""
+        index = EntityIndex({'Caesar': 'Entity',
+                             'Marcus Tullius': 'Entity',
+                             'Marcus Tullius Cicero': 'Person'})
+        tokens = ['Caesar', 'et', 'Marcus', 'Tullius', 'Cicero', 'et', 'Marcus', 'Tullius', 'Tiro', 'Marcus']
+        target = [('Caesar', 'Entity'), ('et', None), ('Marcus', 'Person'), ('Tullius', 'Person'),
+                  ('Cicero', 'Person'), ('et', None), ('Marcus', 'Entity'), ('Tullius', 'Entity'),
+                  ('Tiro', None), ('Marcus', None)]
+        self.assertEqual(list(index.tag(iter(tokens))), target)
+        self.assertEqual(index.max_length, 3)
+
 if __name__ == '__main__':
     unittest.main()
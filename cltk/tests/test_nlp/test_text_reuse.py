@@ -4,12 +4,19 @@ __author__ = ['Luke Hollis <lukehollis@gmail.com>']
 __license__ = 'MIT License. See LICENSE.'
 
 import unittest
+import os
+import tempfile
+from cltk.text_reuse.automata import FuzzyLexicon
 from cltk.text_reuse.levenshtein import Levenshtein
 from cltk.text_reuse.text_reuse import TextReuse
+from cltk.text_reuse.comparison import common_substrings
 from cltk.text_reuse.comparison import long_substring
 from cltk.text_reuse.comparison import minhash
 from cltk.text_reuse.comparison import Needleman_Wunsch
+from cltk.text_reuse.comparison import Needleman_Wunsch_many
 from cltk.text_reuse.comparison import Default_Matrix
+from cltk.text_reuse.lsh import candidate_pairs
+from cltk.text_reuse.reuse_index import ReuseIndex
 
 
 demo_verg = """
@@ -57,7 +64,18 @@ class TestSequenceFunctions(unittest.TestCase):  # pylint: disable=R0904
         l = Levenshtein()
         dist = l.Levenshtein_Distance("now grete glorious god through grace of himselven","and the precious prayer of his pris moder")
         self.assertEqual(dist, 36)
-        
+
+    def test_levenshtein_distance_max_distance(self):
+        """Test Levenshtein Distance bounded by max_distance"""
+        l = Levenshtein()
+        dist = l.Levenshtein_Distance("now grete glorious god through grace of himselven","and the precious prayer of his pris moder", max_distance=10)
+        self.assertEqual(dist, 11)
+
+    def test_levenshtein_distances(self):
+        """Test Levenshtein Distance between a word and a list of words"""
+        dists = Levenshtein.distances("pece", ["pes", "pease", "", "pece", "poisen"])
+        self.assertEqual(dists.tolist(), [2, 2, 4, 0, 4])
+
     def test_damerau_levenshtein_distance(self):
         """Test for Damerau-Levenshtein Distance between two words"""
         l = Levenshtein()
@@ -82,6 +100,15 @@ class TestSequenceFunctions(unittest.TestCase):  # pylint: disable=R0904
         substring = long_substring(demo_verg, demo_prop)
         self.assertEqual(substring,"dique deaeque omnes,")
 
+    def test_common_substrings(self):
+        """Test finding all maximal common substrings of the two passages with their offsets"""
+        matches = common_substrings(demo_verg, demo_prop, min_length=8)
+        self.assertIn(('\ndique deaeque omnes, ', demo_verg.index('\ndique'), [demo_prop.index('\ndique')]), matches)
+        for substring, offset_a, offsets_b in matches:
+            self.assertEqual(demo_verg[offset_a:offset_a + len(substring)], substring)
+            for offset_b in offsets_b:
+                self.assertEqual(demo_prop[offset_b:offset_b + len(substring)], substring)
+
     def test_minhash(self):
         """Test for finding the similarity between two sentences using Minhash"""
         score = minhash(demo_verg, demo_prop)
@@ -92,11 +119,82 @@ class TestSequenceFunctions(unittest.TestCase):  # pylint: disable=R0904
         w1, w2 = "michtis","myht"
         al = Needleman_Wunsch(w1, w2)
         self.assertEqual(al,('michtis', 'm-yht--'))
+
+    def test_Needleman_Wunsch_many(self):
+        """Test aligning a word against many, with any characters and affine gaps"""
+        als = Needleman_Wunsch_many("michtis", ["myht", "michtis"])
+        self.assertEqual(als, [('michtis', 'm-yht--'), ('michtis', 'michtis')])
+        als = Needleman_Wunsch_many("þurh", ["þurȝ", "þorow"], alphabet=None)
+        self.assertEqual(als, [('þurh', 'þurȝ'), ('þur-h', 'þorow')])
+        al = Needleman_Wunsch("abcdef", "abef", d=-0.5, gap_open=-2)
+        self.assertEqual(al, ('abcdef', 'ab--ef'))
     
     def test_Default_Matrix(self):
         """Test for the default similarity matrix"""
         A = Default_Matrix(3, 1, -1)
         self.assertEqual(A, [[1, -1, -1], [-1, 1, -1], [-1, -1, 1]])
 
+    def test_candidate_pairs(self):
+        """Test finding similar strings with locality-sensitive hashing"""
+        texts_a = ["dique deaeque omnes, studium quibus arua tueri,", "ter centum niuei tondent dumeta iuuenci;"]
+        texts_b = ["ipse nemus linquens patrium saltusque Lycaei", "dique deaeque omnes, studium quibus arua tueri"]
+        pairs = [(i, j) for i, j, _ in candidate_pairs(texts_a, texts_b, threshold=0.5)]
+        self.assertEqual(pairs, [(0, 1)])
+
+    def test_compare_sliding_window_iter(self):
+        """Test streaming comparisons of only similar windows"""
+        t = TextReuse()
+        comparisons = list(t.compare_sliding_window_iter(demo_verg, demo_prop, threshold=0.3))
+        matrix = t.compare_sliding_window(demo_verg, demo_prop)
+        ratios = {(c.str_a, c.str_b): c.ratio for row in matrix for c in row}
+        self.assertTrue(comparisons)
+        for comparison in comparisons:
+            self.assertEqual(comparison.ratio, ratios[comparison.str_a, comparison.str_b])
+
+    def test_reuse_index(self):
+        """Test finding reused passages in a corpus, before and after saving the index"""
+        index = ReuseIndex(threshold=0.5)
+        index.add_documents([('verg.txt', demo_verg), ('prop.txt', demo_prop)])
+        line = "Neptune; et cultor nemorum, cui pinguia Ceae"
+        results = index.query(line)
+        self.assertEqual(results[0].work_b, 'verg.txt')
+        self.assertEqual(results[0].str_b, index.texts[0][int(results[0].text_n_b):][:50])
+        pairs = list(index.all_pairs())
+        self.assertTrue(all(pair.work_a != pair.work_b for pair in pairs))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index.save(tmp_dir)
+            loaded = ReuseIndex.load(tmp_dir)
+            self.assertEqual([(c.work_b, c.text_n_b) for c in loaded.query(line)],
+                             [(c.work_b, c.text_n_b) for c in results])
+            self.assertEqual(len(list(loaded.all_pairs())), len(pairs))
+
+    def test_reuse_index_save_loaded(self):
+        """Test saving an index over the directory it was loaded from"""
+        index = ReuseIndex(threshold=0.5)
+        index.add_documents([('verg.txt', demo_verg)])
+        line = "dique deaeque omnes, quibus est tutela per agros"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index.save(tmp_dir)
+            loaded = ReuseIndex.load(tmp_dir)
+            loaded.add_documents([('prop.txt', demo_prop)])
+            loaded.save(tmp_dir)
+            reloaded = ReuseIndex.load(tmp_dir)
+            self.assertEqual(reloaded.fileids, ['verg.txt', 'prop.txt'])
+            self.assertEqual(len(reloaded), len(loaded))
+            self.assertEqual(reloaded.query(line)[0].work_b, 'prop.txt')
+            reloaded.save(tmp_dir)
+            self.assertEqual(len(ReuseIndex.load(tmp_dir)), len(loaded))
+
+    def test_fuzzy_lexicon(self):
+        """Test approximate lookup in a lexicon, before and after saving it"""
+        lexicon = FuzzyLexicon(['thurgh', 'thorugh', 'thorow', 'through', 'grace', 'grece'])
+        self.assertEqual(lexicon.lookup('thorough', depth=1), ['thorugh', 'through'])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'lexicon.pickle')
+            lexicon.save(path)
+            loaded = FuzzyLexicon.load(path)
+        self.assertEqual(len(loaded), 6)
+        self.assertEqual(loaded.lookup_many(['grase', 'grase'], depth=1), [['grace'], ['grace']])
+
 if __name__ == '__main__':
     unittest.main()
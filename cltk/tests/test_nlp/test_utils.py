@@ -3,12 +3,18 @@
 from collections import Counter
 from collections import defaultdict
 from importlib import reload
+import multiprocessing
 import os
+import pickle
 from pickle import UnpicklingError
+import tempfile
 import unittest
 
 from cltk.corpus.utils.importer import CorpusImporter
 from cltk.utils.cltk_logger import logger
+from cltk.utils.binary_data import MmapDict
+from cltk.utils.binary_data import load_py_data
+from cltk.utils.binary_data import write_mmap_dict
 from cltk.utils.contributors import find_write_contribs
 from cltk.utils.contributors import write_contribs
 from cltk.utils.contributors import scantree
@@ -16,6 +22,8 @@ from cltk.utils.contributors import get_authors
 from cltk.utils.file_operations import make_cltk_path
 from cltk.utils.file_operations import open_pickle
 from cltk.utils.frequency import Frequency
+from cltk.utils.model_cache import ModelCache
+from cltk.utils.parallel import imap_bounded
 from cltk.utils import philology
 
 
@@ -175,5 +183,177 @@ class TestPathCreation(unittest.TestCase):
         reload(cltk)
 
 
+class TestModelCache(unittest.TestCase):
+    """Class for the process-wide model cache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.temp_dir.name, 'model_{}.pickle'.format(i))
+            with open(path, 'wb') as file_open:
+                pickle.dump({'model': i}, file_open)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_model_cache_loads_once(self):
+        """Test that a model is only loaded on first use."""
+        calls = []
+
+        def loader(path):
+            calls.append(path)
+            return open_pickle(path)
+
+        cache = ModelCache()
+        first = cache.get('latin', 'tnt', self.paths[0], loader)
+        second = cache.get('latin', 'tnt', self.paths[0], loader)
+        self.assertEqual(first, {'model': 0})
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+
+    def test_model_cache_reload_on_mtime(self):
+        """Test that a model changed on disk is reloaded."""
+        cache = ModelCache()
+        cache.get('latin', 'tnt', self.paths[0])
+        with open(self.paths[0], 'wb') as file_open:
+            pickle.dump({'model': 'new'}, file_open)
+        stat = os.stat(self.paths[0])
+        os.utime(self.paths[0], (stat.st_atime, stat.st_mtime + 10))
+        self.assertEqual(cache.get('latin', 'tnt', self.paths[0]), {'model': 'new'})
+
+    def test_model_cache_key_path(self):
+        """Test that models of the same name from different paths are kept apart."""
+        calls = []
+
+        def loader(path):
+            calls.append(path)
+            return open_pickle(path)
+
+        cache = ModelCache()
+        for _ in range(2):
+            self.assertEqual(cache.get('latin', 'tnt', self.paths[0], loader), {'model': 0})
+            self.assertEqual(cache.get('latin', 'tnt', self.paths[1], loader), {'model': 1})
+        self.assertEqual(calls, self.paths[:2])
+        self.assertEqual(len(cache), 2)
+
+    def test_model_cache_lru(self):
+        """Test that the least recently used model is evicted."""
+        cache = ModelCache(maxsize=2)
+        cache.preload('latin', 0, self.paths[0])
+        cache.preload('latin', 1, self.paths[1])
+        cache.get('latin', 0, self.paths[0])
+        cache.preload('latin', 2, self.paths[2])
+        self.assertEqual([key[:2] for key in cache.keys()], [('latin', 0), ('latin', 2)])
+
+    def test_model_cache_evict(self):
+        """Test evicting by language and by name."""
+        cache = ModelCache()
+        cache.preload('latin', 0, self.paths[0])
+        cache.preload('latin', 1, self.paths[1])
+        cache.preload('greek', 0, self.paths[2])
+        self.assertEqual(cache.evict('latin', 1), 1)
+        self.assertNotIn(('latin', 1), cache)
+        self.assertEqual(cache.evict('latin'), 1)
+        self.assertEqual(cache.keys(), [('greek', 0, os.path.realpath(self.paths[2]))])
+        self.assertEqual(cache.evict(), 1)
+        self.assertEqual(len(cache), 0)
+
+
+class TestBinaryData(unittest.TestCase):
+    """Class for memory-mapped binary data files."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_py(self, name, source):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'w') as file_open:
+            file_open.write(source)
+        return path
+
+    def test_mmap_dict_lookup(self):
+        """Test lookups in a binary dict of str values."""
+        path = os.path.join(self.temp_dir.name, 'lemmata.cltkmap')
+        lemmata = {'arma': 'arma', 'uirum': 'uir', 'ἄνδρα': 'ἀνήρ', 'cano': 'cano'}
+        write_mmap_dict(path, lemmata)
+        mmap_dict = MmapDict(path)
+        self.assertEqual(len(mmap_dict), 4)
+        self.assertEqual(mmap_dict['uirum'], 'uir')
+        self.assertEqual(mmap_dict.get('ἄνδρα'), 'ἀνήρ')
+        self.assertIsNone(mmap_dict.get('troiae'))
+        self.assertNotIn('troiae', mmap_dict)
+        self.assertNotIn(None, mmap_dict)
+        with self.assertRaises(KeyError):
+            mmap_dict['troiae']  # pylint: disable=pointless-statement
+        self.assertEqual(list(mmap_dict), ['arma', 'cano', 'uirum', 'ἄνδρα'])
+        self.assertEqual(list(mmap_dict.keys_with_prefix('ca')), ['cano'])
+        self.assertEqual(list(mmap_dict.keys_with_prefix('')), list(mmap_dict))
+        self.assertEqual(list(mmap_dict.keys_with_prefix('b')), [])
+        self.assertEqual(dict(mmap_dict.items()), lemmata)
+        self.assertEqual(pickle.loads(pickle.dumps(mmap_dict))['cano'], 'cano')
+        mmap_dict.close()
+
+    def test_load_py_data(self):
+        """Test converting a Python data file, inc. after it changes."""
+        path = self._write_py('macrons.py', "vowel_len_map = {'tres': [('m--------', 'tres', 'trēs')]}\n")
+        macrons = load_py_data(path, 'vowel_len_map')
+        self.assertIsInstance(macrons, MmapDict)
+        self.assertEqual(macrons['tres'], [('m--------', 'tres', 'trēs')])
+        self.assertEqual([name for name in os.listdir(self.temp_dir.name) if name.endswith('.cltkmap')],
+                         [os.path.basename(macrons.path)])
+        self.assertEqual(load_py_data(path, 'vowel_len_map')['tres'][0][2], 'trēs')
+
+        self._write_py('macrons.py', "vowel_len_map = {'partes': [('n-p---fa-', 'partes', 'partēs')]}\n")
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        macrons = load_py_data(path, 'vowel_len_map')
+        self.assertEqual(list(macrons), ['partes'])
+
+    def test_load_py_data_to_mapping(self):
+        """Test converting a Python data file holding a list."""
+        path = self._write_py('entities.py', "entities = [('Artus', 'PERS'), ('Artus', 'LOC'), ('Rome', 'LOC')]\n")
+        entities = load_py_data(path, 'entities', to_mapping=lambda data: dict(reversed(data)))
+        self.assertEqual(dict(entities.items()), {'Artus': 'PERS', 'Rome': 'LOC'})
+
+    def test_load_py_data_key(self):
+        """Test that another variable or transform of the same file is not served stale data."""
+        path = self._write_py('data.py', "first = {'a': 'first'}\nsecond = {'a': 'second'}\n")
+        self.assertEqual(load_py_data(path, 'first')['a'], 'first')
+        self.assertEqual(load_py_data(path, 'second')['a'], 'second')
+
+        def upper(data):
+            return {key: value.upper() for key, value in data.items()}
+
+        self.assertEqual(load_py_data(path, 'first', to_mapping=upper)['a'], 'FIRST')
+        self.assertEqual(load_py_data(path, 'first')['a'], 'first')
+
+
+
+class TestParallel(unittest.TestCase):
+    """Class for bounded submission of tasks to a pool."""
+
+    def test_imap_bounded(self):
+        """Test imap_bounded(), in and out of order."""
+        with multiprocessing.Pool(2) as pool:
+            results = imap_bounded(pool, abs, range(-10, 0), 3)
+            self.assertEqual(sorted(results), list(range(1, 11)))
+            results = imap_bounded(pool, abs, range(-10, 0), 3, ordered=True)
+            self.assertEqual(list(results), list(range(10, 0, -1)))
+            with self.assertRaises(TypeError):
+                list(imap_bounded(pool, abs, ['x'], 3))
+
+    def test_imap_bounded_dead_worker(self):
+        """Test that the death of a worker is raised instead of waited for."""
+        with multiprocessing.Pool(2) as pool:
+            with self.assertRaises(RuntimeError):
+                list(imap_bounded(pool, os._exit, [1], 3))
+            self.assertEqual(list(imap_bounded(pool, abs, [-1, -2], 3, ordered=True)), [1, 2])
+
+
 if __name__ == '__main__':
     unittest.main()
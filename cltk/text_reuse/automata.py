@@ -25,7 +25,11 @@ __author__ = ['Eleftheria Chatziargyriou <ele.hatzy@gmail.com>']
 __license__ = 'MIT License. See LICENSE.'
 
 import logging
+import pickle
+from array import array
+from bisect import bisect_left
 from cltk.exceptions import InputError
+from cltk.utils.file_operations import open_pickle
 
 LOG = logging.getLogger(__name__)
 LOG.addHandler(logging.NullHandler())
@@ -617,23 +621,229 @@ def walk_trie(dicts, w, q, A):
     track of the active Automaton state, producing the intersection of the
     given Automaton and the trie (which is equivalent to a DFA). Once an 
     invalid "terminating" state is reached, the children nodes are immediately
-    dismissed from the recursive stack
+    dismissed. The trie is walked depth-first with an explicit stack, so
+    there is no limit on the length of words.
     """
-    
-    if q in A.F and '__end__' in dicts:
-        yield w
+    path = list(w)
+    # Entries are (node, state, length of word at node, last char of word)
+    stack = [(dicts, q, len(path), None)]
+    while stack:
+        node, q, depth, key = stack.pop()
+        if key is not None:
+            del path[depth - 1:]
+            path.append(key)
+        if q in A.F and '__end__' in node:
+            yield ''.join(path)
+
+        children = []
+        for key, child in node.items():
+            if key == '__end__':
+                continue
+            next_q = A.transition_function(q, key)
+            if next_q is not None:
+                children.append((child, next_q, depth + 1, key))
+        # Pushed in reverse, to be visited in the trie's order
+        stack.extend(reversed(children))
+
+
+class WordTrie:
+    """
+    Trie of a word list stored in flat arrays, which takes far less memory
+    than nested dictionaries. Characters are coded as integers (in sorted
+    order), and nodes are numbered breadth-first, so that the children of
+    each node are contiguous:
 
-    for key in dicts.keys():
-        if key == '__end__':
-            continue
+        labels[n]: code of the character leading to node n
+        first_child[n] .. first_child[n + 1] - 1: children of node n, by label
+        final[n]: whether the word leading to node n is in the word list
 
-        if A.transition_function(q, key) is None:
-            return
+    Node 0 is the root.
 
-        try:
-            yield from walk_trie(dicts[key], w + key, A.transition_function(q, key), A)
-        except:
-            return
+    >>> T = WordTrie(['einander', 'einen', 'neben'])
+
+    >>> len(T), 'einen' in T, 'ein' in T
+    (3, True, False)
+
+    >>> A = LevenshteinAutomaton('eben', 1).convert_to_deterministic()
+
+    >>> list(T.walk(A))
+    ['neben']
+    """
+
+    def __init__(self, wordlist):
+        words = sorted(set(wordlist))
+        self.chars = sorted(set(''.join(words)))
+        self.codes = {c: i for i, c in enumerate(self.chars)}
+        self.labels = array('I', [0])
+        self.first_child = array('I')
+        self.final = bytearray()
+        self.size = len(words)
+
+        # Each node is the range of (sorted) words starting with its prefix
+        ranges = [(0, len(words), 0)]
+        node = 0
+        while node < len(ranges):
+            lo, hi, depth = ranges[node]
+            self.first_child.append(len(ranges))
+            if lo < hi and len(words[lo]) == depth:
+                self.final.append(1)
+                lo += 1
+            else:
+                self.final.append(0)
+            while lo < hi:
+                l = words[lo][depth]
+                end = lo + 1
+                while end < hi and words[end][depth] == l:
+                    end += 1
+                ranges.append((lo, end, depth + 1))
+                self.labels.append(self.codes[l])
+                lo = end
+            node += 1
+        self.first_child.append(len(ranges))
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, word):
+        node = 0
+        for l in word:
+            node = self.child(node, l)
+            if node < 0:
+                return False
+        return bool(self.final[node])
+
+    def child(self, node, l):
+        """Return the child of node along character l, or -1."""
+        code = self.codes.get(l)
+        if code is None:
+            return -1
+        lo, hi = self.first_child[node], self.first_child[node + 1]
+        i = bisect_left(self.labels, code, lo, hi)
+        if i < hi and self.labels[i] == code:
+            return i
+        return -1
+
+    def walk(self, A):
+        """
+        Yield the words of the trie accepted by the deterministic automaton A,
+        in sorted order. The trie is walked depth-first with an explicit stack,
+        following only the transitions A allows.
+        """
+        chars, labels, first_child, final = self.chars, self.labels, self.first_child, self.final
+        transitions = {}
+        path = []
+        stack = [(0, A.s, 0)]
+        while stack:
+            node, q, depth = stack.pop()
+            if depth:
+                del path[depth - 1:]
+                path.append(chars[labels[node]])
+            if final[node] and q in A.F:
+                yield ''.join(path)
+
+            # Pushed in reverse, to be visited in sorted order
+            for child in range(first_child[node + 1] - 1, first_child[node] - 1, -1):
+                code = labels[child]
+                try:
+                    next_q = transitions[q, code]
+                except KeyError:
+                    next_q = transitions[q, code] = A.transition_function(q, chars[code])
+                if next_q is not None:
+                    stack.append((child, next_q, depth + 1))
+
+
+class FuzzyLexicon:
+    """
+    Word list indexed for approximate lookup. The word trie (a WordTrie) is
+    built once, and each lookup walks it while simulating the Levenshtein
+    automaton of the query on the fly: the state reached at a trie node is the
+    row of edit distances between the query's prefixes and the node's prefix,
+    and a branch is dismissed as soon as every distance in its row exceeds the
+    depth. No automaton has to be built or determinized per query.
+
+    >>> lexicon = FuzzyLexicon(['pes', 'pesse', 'pease', 'peis', 'peisse', 'pise', 'peose', 'poese', 'poisen'])
+
+    >>> lexicon.lookup('pese', depth = 1)
+    ['pease', 'peose', 'pes', 'pesse', 'pise', 'poese']
+
+    >>> lexicon.lookup_many(['pece', 'peis'], depth = 1)
+    [[], ['peis', 'pes']]
+    """
+
+    def __init__(self, wordlist = ()):
+        self.trie = WordTrie(wordlist)
+
+    def __contains__(self, word):
+        return word in self.trie
+
+    def __len__(self):
+        return len(self.trie)
+
+    def lookup(self, word, depth = 2):
+        """
+        Return all words w' of the lexicon with LevenshteinDistance(word, w') <= depth,
+        sorted
+
+        :param word: str
+        :param depth: int: maximum edit distance
+        :return: str list
+        """
+        trie = self.trie
+        chars, labels, first_child, final = trie.chars, trie.labels, trie.first_child, trie.final
+        first_row = list(range(len(word) + 1))
+        results = []
+        if final[0] and first_row[-1] <= depth:
+            results.append('')
+
+        path = []
+        # Explicit stack of (node, length of prefix, row) to be expanded
+        stack = [(0, 0, first_row)]
+        while stack:
+            node, prefix_length, previous_row = stack.pop()
+            if prefix_length:
+                del path[prefix_length - 1:]
+                path.append(chars[labels[node]])
+            for child in range(first_child[node], first_child[node + 1]):
+                key = chars[labels[child]]
+                row = [previous_row[0] + 1]
+                for j, l in enumerate(word):
+                    row.append(min(row[j] + 1,
+                                   previous_row[j + 1] + 1,
+                                   previous_row[j] + (l != key)))
+                if row[-1] <= depth and final[child]:
+                    results.append(''.join(path) + key)
+                if min(row) <= depth:
+                    stack.append((child, prefix_length + 1, row))
+        return sorted(results)
+
+    def lookup_many(self, words, depth = 2):
+        """
+        Look up each of a list of words, looking up repeated words only once
+
+        :param words: str list
+        :param depth: int: maximum edit distance
+        :return: list of str lists, in the order of words
+        """
+        found = {}
+        results = []
+        for word in words:
+            if word not in found:
+                found[word] = self.lookup(word, depth)
+            results.append(found[word])
+        return results
+
+    def save(self, path):
+        """Write the lexicon to a pickle file."""
+        with open(path, 'wb') as file_open:
+            pickle.dump(self, file_open, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Read a lexicon written by save()."""
+        lexicon = open_pickle(path)
+        if not isinstance(lexicon, cls):
+            raise InputError("'{}' does not contain a {}.".format(path, cls.__name__))
+        return lexicon
 
 
 def spellcheck(word, wordlist, depth = 2):
@@ -641,6 +851,9 @@ def spellcheck(word, wordlist, depth = 2):
     Given a word list and a depth parameter, return all words w' in the wordlist
     with LevenshteinDistance(word, w') <= depth
 
+    To check many words against the same word list, build a FuzzyLexicon
+    once instead.
+
     :param word:
     :param wordlist:
 
@@ -651,8 +864,4 @@ def spellcheck(word, wordlist, depth = 2):
     >>> spellcheck('pece', Dic, depth = 3)
     ['pease', 'peis', 'peisse', 'peose', 'pes', 'pesse', 'pise', 'poese']
     """
-    Aut = LevenshteinAutomaton(word, depth = depth).convert_to_deterministic()
-    W = make_worlist_trie(wordlist)
-
-    return sorted(list(walk_trie(W, '', Aut.s, Aut)))
-
+    return FuzzyLexicon(wordlist).lookup(word, depth)
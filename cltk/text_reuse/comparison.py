@@ -3,6 +3,8 @@
 A comparison class to help with tracking string comparison values
 """
 
+import numpy
+
 from cltk.utils.cltk_logger import logger
 
 
@@ -102,23 +104,179 @@ class Comparison:
 
         return
 
+class SuffixAutomaton:
+    """
+    Suffix automaton of a string: the smallest automaton accepting all its
+    substrings, built in linear time (Blumer et al., 1985). Each state stands
+    for a set of substrings with the same end positions in the text, and it
+    allows the common substrings of the text and any other text to be found
+    in a single scan of the other text.
+
+    >>> automaton = SuffixAutomaton('dique deaeque omnes')
+    >>> 'deaeque' in automaton, 'deaque' in automaton
+    (True, False)
+    """
+
+    def __init__(self, text):
+        self.text = text
+        # Per state: length of its longest substring, suffix link, transitions,
+        # end position of its first occurrence, and whether it was cloned
+        self.length = [0]
+        self.link = [-1]
+        self.next = [{}]
+        self.first_end = [-1]
+        self.is_clone = [False]
+        last = 0
+        for position, char in enumerate(text):
+            last = self._extend(last, position, char)
+        self._children = None
+
+    def _new_state(self, length, link, transitions, first_end, is_clone):
+        self.length.append(length)
+        self.link.append(link)
+        self.next.append(transitions)
+        self.first_end.append(first_end)
+        self.is_clone.append(is_clone)
+        return len(self.length) - 1
+
+    def _extend(self, last, position, char):
+        """Add a character to the automaton, returning the new last state."""
+        current = self._new_state(self.length[last] + 1, -1, {}, position, False)
+        state = last
+        while state != -1 and char not in self.next[state]:
+            self.next[state][char] = current
+            state = self.link[state]
+        if state == -1:
+            self.link[current] = 0
+            return current
+        following = self.next[state][char]
+        if self.length[state] + 1 == self.length[following]:
+            self.link[current] = following
+            return current
+        clone = self._new_state(self.length[state] + 1, self.link[following],
+                                dict(self.next[following]), self.first_end[following], True)
+        while state != -1 and self.next[state].get(char) == following:
+            self.next[state][char] = clone
+            state = self.link[state]
+        self.link[following] = clone
+        self.link[current] = clone
+        return current
+
+    def __contains__(self, substring):
+        state = 0
+        for char in substring:
+            state = self.next[state].get(char)
+            if state is None:
+                return False
+        return True
+
+    def _matches(self, text):
+        """Yield (end position in text, length, state) of the longest substring
+        of the automaton's text ending at each position of text."""
+        state, length = 0, 0
+        for position, char in enumerate(text):
+            while state and char not in self.next[state]:
+                state = self.link[state]
+                length = self.length[state]
+            if char in self.next[state]:
+                state = self.next[state][char]
+                length += 1
+            yield position, length, state
+
+    def longest_common_substring(self, text):
+        """
+        Return (start in text, start in the automaton's text, length) of the
+        longest common substring, the first in text if several are longest
+        :param text: str
+        :return: (int, int, int)
+        """
+        best = (0, 0, 0)
+        for position, length, state in self._matches(text):
+            if length > best[2]:
+                end = self.first_end[state]
+                best = (position - length + 1, end - length + 1, length)
+        return best
+
+    def end_positions(self, state):
+        """Return sorted end positions of the substrings of a state."""
+        if self._children is None:
+            self._children = [[] for _ in self.length]
+            for child, parent in enumerate(self.link):
+                if parent >= 0:
+                    self._children[parent].append(child)
+        ends = []
+        stack = [state]
+        while stack:
+            current = stack.pop()
+            if not self.is_clone[current]:
+                ends.append(self.first_end[current])
+            stack.extend(self._children[current])
+        return sorted(ends)
+
+    def maximal_matches(self, text, min_length=1):
+        """
+        Yield (substring, start in text, starts in the automaton's text) of the
+        common substrings of at least min_length characters which cannot be
+        extended left or right in text
+        :param text: str
+        :param min_length: int
+        """
+        previous = None
+        for match in self._matches(text):
+            if previous is not None and match[1] <= previous[1]:
+                yield from self._maximal_match(text, previous, min_length)
+            previous = match
+        if previous is not None:
+            yield from self._maximal_match(text, previous, min_length)
+
+    def _maximal_match(self, text, match, min_length):
+        position, length, state = match
+        if length < min_length or not length:
+            return
+        start = position - length + 1
+        yield (text[start:position + 1], start,
+               [end - length + 1 for end in self.end_positions(state)])
+
+
 def long_substring(str_a, str_b):
     """
     Looks for a longest common string between any two given strings passed
     :param str_a: str
     :param str_b: str
 
-    Big Thanks to Pulkit Kathuria(@kevincobain2000) for the function
-    The function is derived from jProcessing toolkit suite
+    The longest common substring is found in linear time with the suffix
+    automaton of str_b; if there are several, the first in str_a is returned.
+
+    >>> long_substring("dique deaeque omnes, studium quibus arua tueri,", "dique deaeque omnes, quibus est tutela per agros,")
+    'dique deaeque omnes,'
+    """
+    start, _, length = SuffixAutomaton(str_b).longest_common_substring(str_a)
+    return str_a[start:start + length].strip()
+
+def common_substrings(str_a, str_b, min_length=10):
+    """
+    Finds all maximal common substrings of two strings of at least min_length
+    characters, i.e. those that cannot be extended left or right in str_a
+    :param str_a: str
+    :param str_b: str
+    :param min_length: int
+    :return: list of tuples (substring, offset in str_a, list of offsets in str_b)
+
+    >>> common_substrings("dique deaeque omnes, studium quibus arua tueri,", "dique deaeque omnes, quibus est tutela per agros,", min_length=5)
+    [('dique deaeque omnes, ', 0, [0]), (' quibus ', 28, [20])]
+    """
+    return list(SuffixAutomaton(str_b).maximal_matches(str_a, min_length))
+
+def shingles(text, size=3):
+    """
+    Return the set of substrings of a given length (shingles) of a string
+    :param text: str
+    :param size: int
+
+    >>> sorted(shingles('arma'))
+    ['arm', 'rma']
     """
-    data = [str_a, str_b]
-    substr = ''
-    if len(data) > 1 and len(data[0]) > 0:
-        for i in range(len(data[0])):
-            for j in range(len(data[0])-i+1):
-                if j > len(substr) and all(data[0][i:i+j] in x for x in data):
-                    substr = data[0][i:i+j]
-    return substr.strip()
+    return set(text[i:i+size] for i in range(len(text)-size+1))
 
 def minhash(str_a, str_b):
         """
@@ -135,7 +293,6 @@ def minhash(str_a, str_b):
         score = 0.0
         tok_sent_1 = str_a
         tok_sent_2 = str_b
-        shingles = lambda s: set(s[i:i+3] for i in range(len(s)-2))
         try:
             jaccard_distance = lambda seta, setb: len(seta & setb)/float(len(seta | setb))
             score = jaccard_distance(shingles(tok_sent_1), shingles(tok_sent_2))
@@ -144,12 +301,22 @@ def minhash(str_a, str_b):
 
 def Default_Matrix(n, match, substitution):return [[match if i==j else substitution for i in range(n)] for j in range(n)]
 
-def Needleman_Wunsch(w1, w2, d=-1, alphabet = "abcdefghijklmnopqrstuvwxyz", S = Default_Matrix(26, 1, -1) ):
+def Needleman_Wunsch(w1, w2, d=-1, alphabet = "abcdefghijklmnopqrstuvwxyz", S = Default_Matrix(26, 1, -1), gap_open=None):
     """
      Computes allignment using Needleman-Wunsch algorithm. The alphabet
     parameter is used for specifying the alphabetical order of the similarity
-    matrix. Similarity matrix is initialized to an unweighted matrix that
-    returns 1 for match and -1 for substitution.
+    matrix; it may hold any Unicode characters. Similarity matrix is
+    initialized to an unweighted matrix that returns 1 for match and -1 for
+    substitution. If no alphabet is given, the characters of both words are
+    used, with the unweighted matrix.
+
+    Gaps are penalized by d per character. With gap_open, gaps are affine
+    instead (Gotoh's algorithm): a gap of k characters scores
+    gap_open + (k - 1) * d.
+
+    The dynamic programming table is filled one anti-diagonal at a time
+    with NumPy, since the cells of an anti-diagonal only depend on the
+    previous two.
 
     Args:
         :param w1: str
@@ -157,6 +324,7 @@ def Needleman_Wunsch(w1, w2, d=-1, alphabet = "abcdefghijklmnopqrstuvwxyz", S =
         :param d: int/float
         :param alphabet: str
         :param S: list
+        :param gap_open: int/float, penalty for the first character of a gap
         :return: str tuple
 
     Examples:
@@ -190,52 +358,167 @@ def Needleman_Wunsch(w1, w2, d=-1, alphabet = "abcdefghijklmnopqrstuvwxyz", S =
         >>> Needleman_Wunsch('pescare', 'piscia', alphabet = "aceiprs", S = M)
         ('pescare', 'pisci-a')
 
+        Any characters can be aligned, and affine gaps keep gaps together:
+
+        >>> Needleman_Wunsch('λόγος', 'λόγοι', alphabet = None)
+        ('λόγος', 'λόγοι')
+
+        >>> Needleman_Wunsch('abcdef', 'abef', d = -0.5, gap_open = -2)
+        ('abcdef', 'ab--ef')
+
+    """
+
+    return Needleman_Wunsch_many(w1, [w2], d, alphabet, S, gap_open)[0]
+
+def Needleman_Wunsch_many(w1, words, d=-1, alphabet = "abcdefghijklmnopqrstuvwxyz", S = Default_Matrix(26, 1, -1), gap_open=None):
+    """
+    Computes the Needleman-Wunsch allignment of a word with each of a list of
+    words (e.g. of a witness with other witnesses), filling their tables
+    together. Takes the same parameters as Needleman_Wunsch.
+
+    Args:
+        :param w1: str
+        :param words: str list
+        :return: list of str tuples
+
+    Examples:
+
+        >>> Needleman_Wunsch_many('piscis', ['pesce', 'piscis'])
+        [('piscis', 'pesc-e'), ('piscis', 'piscis')]
     """
 
+    if alphabet is None:
+        alphabet = sorted(set(w1).union(*words))
+        S = Default_Matrix(len(alphabet), 1, -1)
+
     #S must be a square matrix matching the length of your alphabet
     if len(S) != len(alphabet) or len(S[0])!= len(alphabet):
         raise AssertionError("Unexpected dimensions of Similarity matrix, S."
                              " S must be a n by n square matrix, where n is the"
                              " length of your predefined alphabet")
 
-    m,n = len(w1), len(w2)
-    F = [[0 for i in range(n+1)] for j in range(m+1)]
-
-    for i in range(m+1):
-        F[i][0] = d*i
-
-    for i in range(n+1):
-        F[0][i] = d*i
+    if not words:
+        return []
+
+    codes = {c: i for i, c in enumerate(alphabet)}
+    for w in [w1] + list(words):
+        for c in w:
+            if c not in codes:
+                raise ValueError("Character {!r} of {!r} is not in the alphabet.".format(c, w))
+
+    m, n = len(w1), max(len(w) for w in words)
+    a = numpy.array([codes[c] for c in w1], dtype=numpy.intp)
+    # Words are padded at the end, which does not change the cells they use
+    b = numpy.zeros((len(words), n), dtype=numpy.intp)
+    for k, w in enumerate(words):
+        b[k, :len(w)] = [codes[c] for c in w]
+    similarity = numpy.array(S, dtype=float)
+
+    if gap_open is None:
+        F = _linear_gap_table(a, b, similarity, d)
+        return [_linear_gap_traceback(w1, w, F[k], similarity, a, b[k], d) for k, w in enumerate(words)]
+
+    H, E, F = _affine_gap_tables(a, b, similarity, d, gap_open)
+    return [_affine_gap_traceback(w1, w, H[k], E[k], F[k], similarity, a, b[k], d, gap_open)
+            for k, w in enumerate(words)]
+
+def _anti_diagonals(m, n):
+    """Yield the row and column indices of the cells of each anti-diagonal of
+    an (m + 1) by (n + 1) table, leaving out the first row and column."""
+    for total in range(2, m + n + 1):
+        i = numpy.arange(max(1, total - n), min(m, total - 1) + 1)
+        yield i, total - i
+
+def _linear_gap_table(a, b, similarity, d):
+    """Fill the tables of scores of the word codes a against each of the rows of b."""
+    K, m, n = len(b), len(a), b.shape[1]
+    F = numpy.zeros((K, m + 1, n + 1))
+    F[:, :, 0] = d * numpy.arange(m + 1)
+    F[:, 0, :] = d * numpy.arange(n + 1)
 
     #F[i][j] is given by the reccurence relation F[i][j] = max(F[i-1][j-1] + S(A[i],B[i]), F[i][j-1] + d, F[i-1][j] + d)
     #Where S the similarity matrix and d the gap penalty
 
-    for i in range(1,m+1):
-        for j in range(1,n+1):
-            F[i][j] = max(F[i-1][j-1] + S[alphabet.index(w1[i-1])][alphabet.index(w2[j-1])], F[i-1][j] + d,F[i][j-1] + d)
+    for i, j in _anti_diagonals(m, n):
+        match = F[:, i-1, j-1] + similarity[a[i-1], b[:, j-1]]
+        F[:, i, j] = numpy.maximum(numpy.maximum(match, F[:, i-1, j] + d), F[:, i, j-1] + d)
+    return F
 
-    A1, A2 = "", ""
-    i, j = m, n
+def _linear_gap_traceback(w1, w2, F, similarity, a, b, d):
+    A1, A2 = [], []
+    i, j = len(w1), len(w2)
 
     #Since F[n][m] gives the maximum score, we can now reconstruct the alignment by determining whether the optimal move
     #is a match, insertion or deletion
 
     while i>0 or j>0:
 
-        if i>0 and j>0 and F[i][j] == F[i-1][j-1] + S[alphabet.index(w1[i-1])][alphabet.index(w2[j-1])]:
-            A1 = w1[i-1] + A1
-            A2 = w2[j-1] + A2
+        if i>0 and j>0 and F[i][j] == F[i-1][j-1] + similarity[a[i-1], b[j-1]]:
+            A1.append(w1[i-1])
+            A2.append(w2[j-1])
             i -= 1
             j -= 1
 
-        elif i>0 and F[i][j] == F[i-1][j] + d:
-            A1 = w1[i-1] + A1
-            A2 = "-" + A2
+        elif i>0 and (j == 0 or F[i][j] == F[i-1][j] + d):
+            A1.append(w1[i-1])
+            A2.append("-")
+            i -= 1
+
+        else:
+            A1.append("-")
+            A2.append(w2[j-1])
+            j -= 1
+
+    return ("".join(reversed(A1)), "".join(reversed(A2)))
+
+def _affine_gap_tables(a, b, similarity, d, gap_open):
+    """Fill the tables of scores of the word codes a against each of the rows
+    of b, ending in any move (H), a gap in a (E) or a gap in b (F)."""
+    K, m, n = len(b), len(a), b.shape[1]
+    H = numpy.zeros((K, m + 1, n + 1))
+    E = numpy.full((K, m + 1, n + 1), -numpy.inf)
+    F = numpy.full((K, m + 1, n + 1), -numpy.inf)
+    H[:, 1:, 0] = F[:, 1:, 0] = gap_open + d * numpy.arange(m)
+    H[:, 0, 1:] = E[:, 0, 1:] = gap_open + d * numpy.arange(n)
+
+    for i, j in _anti_diagonals(m, n):
+        E[:, i, j] = numpy.maximum(E[:, i, j-1] + d, H[:, i, j-1] + gap_open)
+        F[:, i, j] = numpy.maximum(F[:, i-1, j] + d, H[:, i-1, j] + gap_open)
+        match = H[:, i-1, j-1] + similarity[a[i-1], b[:, j-1]]
+        H[:, i, j] = numpy.maximum(numpy.maximum(match, F[:, i, j]), E[:, i, j])
+    return H, E, F
+
+def _affine_gap_traceback(w1, w2, H, E, F, similarity, a, b, d, gap_open):
+    A1, A2 = [], []
+    i, j = len(w1), len(w2)
+    table = H
+
+    while i>0 or j>0:
+
+        if table is H:
+            if i>0 and j>0 and H[i][j] == H[i-1][j-1] + similarity[a[i-1], b[j-1]]:
+                A1.append(w1[i-1])
+                A2.append(w2[j-1])
+                i -= 1
+                j -= 1
+            elif i>0 and (j == 0 or H[i][j] == F[i][j]):
+                table = F
+            else:
+                table = E
+
+        elif table is F:
+            A1.append(w1[i-1])
+            A2.append("-")
+            # The gap was opened here, or goes on above
+            if F[i][j] == H[i-1][j] + gap_open:
+                table = H
             i -= 1
 
         else:
-            A1 = "-" + A1
-            A2 = w2[j-1] + A2
+            A1.append("-")
+            A2.append(w2[j-1])
+            if E[i][j] == H[i][j-1] + gap_open:
+                table = H
             j -= 1
 
-    return (A1, A2)
+    return ("".join(reversed(A1)), "".join(reversed(A2)))
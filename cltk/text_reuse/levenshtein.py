@@ -1,6 +1,16 @@
 """Tools for working with Levenshtein distance algorithm and distance ratio between strings.
+
+Levenshtein distance is computed with Myers' bit-parallel algorithm (in the
+formulation of Hyyrö, 2001): each column of the dynamic programming matrix is
+encoded as bit vectors of vertical deltas, updated with a handful of integer
+operations per character of the second string. Python ints are used as bit
+vectors, so strings of any length are handled in one block.
 """
 
+from typing import Dict, Optional
+
+import numpy
+
 __author__ = ['Luke Hollis <lukehollis@gmail.com>', 'Eleftheria Chatziargyriou <ele.hatzy@gmail.com>']
 __license__ = 'MIT License. See LICENSE.'
 
@@ -13,13 +23,16 @@ class Levenshtein:
         return
 
     @staticmethod
-    def Levenshtein_Distance(w1, w2):
+    def Levenshtein_Distance(w1, w2, max_distance=None):
         """
         Computes Levenshtein Distance between two words
 
         Args:
             :param w1: str
             :param w2: str
+            :param max_distance: int, optional bound; a distance above it is
+            returned as max_distance + 1, which allows the computation to stop
+            early
             :return: int
 
         Examples:
@@ -32,25 +45,40 @@ class Levenshtein:
 
             >>> Levenshtein.Levenshtein_Distance('orbis', 'robis')
             2
+
+            >>> Levenshtein.Levenshtein_Distance('nox', 'nochem', max_distance=2)
+            3
         """
-        m, n = len(w1), len(w2)
-        v1 = [i for i in range(n + 1)]
-        v2 = [0 for i in range(n + 1)]
+        if len(w1) > len(w2):
+            w1, w2 = w2, w1
+        return _bit_parallel_distance(_pattern_masks(w1), len(w1), w2, max_distance)
 
-        for i in range(m):
-            v2[0] = i + 1
+    @staticmethod
+    def distances(query, candidates, max_distance=None):
+        """
+        Computes Levenshtein Distance between a word and each of a list of
+        words, preparing the word only once.
 
-            for j in range(n):
-                delCost = v1[j + 1] + 1
-                insCost = v2[j] + 1
+        Args:
+            :param query: str
+            :param candidates: iterable of str
+            :param max_distance: int, optional bound; distances above it are
+            returned as max_distance + 1, which allows the computation to stop
+            early
+            :return: numpy.ndarray of int
 
-                subCost = v1[j]
-                if w1[i] != w2[j]: subCost += 1
+        Examples:
 
-                v2[j + 1] = min(delCost, insCost, subCost)
-            v1, v2 = v2, v1
+            >>> Levenshtein.distances('noctis', ['noctem', 'nox', 'noctis']).tolist()
+            [2, 4, 0]
 
-        return v1[-1]
+            >>> Levenshtein.distances('noctis', ['noctem', 'nox', 'noctis'], max_distance=2).tolist()
+            [2, 3, 0]
+        """
+        masks = _pattern_masks(query)
+        length = len(query)
+        return numpy.fromiter((_bit_parallel_distance(masks, length, candidate, max_distance)
+                               for candidate in candidates), dtype=numpy.int64)
 
     @staticmethod
     def Damerau_Levenshtein_Distance(w1, w2):
@@ -78,11 +106,8 @@ class Levenshtein:
             1
 
         """
-        # Define alphabet
-        alph = sorted(list(set(w1 + w2)))
-        # Calculate alphabet size
-        alph_s = len(alph)
-        dam_ar = [0 for _ in range(alph_s)]
+        # Last row in which each character of the alphabet was seen
+        dam_ar = dict.fromkeys(w1 + w2, 0)  # type: Dict[str, int]
         mat = [[0 for _ in range(len(w2) + 2)] for _ in range(len(w1) + 2)]
 
         max_dist = len(w1) + len(w2)
@@ -103,7 +128,7 @@ class Levenshtein:
 
             for j in range(2, len(w2) + 2):
 
-                k = dam_ar[alph.index(w2[j - 2])]
+                k = dam_ar[w2[j - 2]]
                 l = tem
 
                 if w1[i - 2] == w2[j - 2]:
@@ -116,7 +141,7 @@ class Levenshtein:
                 mat[i][j] = min(mat[i - 1][j - 1] + cost, mat[i][j - 1] + 1, mat[i - 1][j] + 1,
                                 mat[k - 1][l - 1] + i + j - k - l - 1)
 
-            dam_ar[alph.index(w1[i - 2])] = i
+            dam_ar[w1[i - 2]] = i
 
         return mat[-1][-1]
 
@@ -139,5 +164,49 @@ class Levenshtein:
             raise ImportError
 
         return fuzz.ratio(string_a, string_b) / 100
-    
-  
+
+
+def _pattern_masks(pattern: str) -> Dict[str, int]:
+    """Return, for each character of pattern, the bit vector of the positions
+    at which it occurs."""
+    masks = {}  # type: Dict[str, int]
+    for position, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks
+
+
+def _bit_parallel_distance(masks: Dict[str, int], length: int, text: str,
+                           max_distance: Optional[int] = None) -> int:
+    """Levenshtein distance between a pattern, given by its masks and length,
+    and text; if max_distance is given, any distance above it is returned as
+    max_distance + 1."""
+    if not length:
+        distance = len(text)
+    else:
+        all_ones = (1 << length) - 1
+        last = 1 << (length - 1)
+        plus_vertical = all_ones
+        minus_vertical = 0
+        distance = length
+        remaining = len(text)
+        for char in text:
+            equal = masks.get(char, 0)
+            x_vertical = equal | minus_vertical
+            x_horizontal = (((equal & plus_vertical) + plus_vertical) ^ plus_vertical) | equal
+            plus_horizontal = minus_vertical | (~(x_horizontal | plus_vertical) & all_ones)
+            minus_horizontal = plus_vertical & x_horizontal
+            if plus_horizontal & last:
+                distance += 1
+            elif minus_horizontal & last:
+                distance -= 1
+            remaining -= 1
+            # The distance can decrease by at most one per remaining char
+            if max_distance is not None and distance - remaining > max_distance:
+                return max_distance + 1
+            plus_horizontal = ((plus_horizontal << 1) | 1) & all_ones
+            minus_horizontal = (minus_horizontal << 1) & all_ones
+            plus_vertical = minus_horizontal | (~(x_vertical | plus_horizontal) & all_ones)
+            minus_vertical = plus_horizontal & x_vertical
+    if max_distance is not None and distance > max_distance:
+        return max_distance + 1
+    return distance
@@ -0,0 +1,175 @@
+"""
+Locality-sensitive hashing (LSH) of strings, for finding similar pairs
+without comparing every string with every other.
+
+Each string is reduced to a MinHash signature over its character shingles
+(as used by ``comparison.minhash``): the proportion of equal positions in
+two signatures estimates the Jaccard similarity of their shingle sets. The
+signatures are cut into bands, and two strings become a candidate pair if
+any of their bands is identical; the number of bands is chosen so that
+pairs above the Jaccard threshold are very likely to collide, and pairs
+below it unlikely to.
+
+    >>> hasher = MinHasher()
+    >>> index = LSHIndex(threshold=0.5)
+    >>> index.insert('a', hasher.signature('dique deaeque omnes, studium quibus arua tueri,'))
+    >>> index.insert('b', hasher.signature('ter centum niuei tondent dumeta iuuenci'))
+    >>> sorted(index.query(hasher.signature('dique deaeque omnes, studium quibus arua tueri')))
+    ['a']
+"""
+
+from typing import Dict, Hashable, List, Set
+import zlib
+
+import numpy
+
+from cltk.text_reuse.comparison import shingles
+
+__license__ = 'MIT License. See LICENSE.'
+
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+class MinHasher:
+    """Compute MinHash signatures of strings. Hashes are seeded, and do not
+    depend on Python's per-process string hashing, so signatures can be
+    compared across processes and stored on disk.
+    """
+
+    def __init__(self, num_perm=128, shingle_size=3, seed=1):
+        """
+        :param num_perm: int, length of signatures
+        :param shingle_size: int, number of characters per shingle
+        :param seed: int, seed of the random hash functions
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        generator = numpy.random.RandomState(seed)
+        # a * hash + b stays below 2 ** 64 for 32-bit hashes
+        self._a = generator.randint(1, 1 << 31, size=num_perm, dtype=numpy.uint64)
+        self._b = generator.randint(0, MAX_HASH, size=num_perm, dtype=numpy.uint64)
+
+    def signature(self, text):
+        """
+        Return the MinHash signature of a string; strings without any shingle
+        (i.e. shorter than shingle_size) have a signature of MAX_HASH values.
+        :param text: str
+        :return: numpy.ndarray of uint64
+        """
+        hashes = numpy.fromiter((zlib.crc32(shingle.encode('utf-8'))
+                                 for shingle in shingles(text, self.shingle_size)),
+                                dtype=numpy.uint64)
+        if not len(hashes):
+            return numpy.full(self.num_perm, MAX_HASH, dtype=numpy.uint64)
+        permuted = (numpy.outer(self._a, hashes) + self._b[:, None]) % numpy.uint64(MERSENNE_PRIME)
+        return (permuted & numpy.uint64(MAX_HASH)).min(axis=1)
+
+    def signatures(self, texts):
+        """
+        Return the signatures of several strings, as rows of a matrix
+        :param texts: iterable of str
+        :return: numpy.ndarray of uint64, of shape (len(texts), num_perm)
+        """
+        rows = [self.signature(text) for text in texts]
+        if not rows:
+            return numpy.empty((0, self.num_perm), dtype=numpy.uint64)
+        return numpy.vstack(rows)
+
+
+def estimate_jaccard(signature_a, signature_b):
+    """Estimate the Jaccard similarity of two strings from their signatures."""
+    return float(numpy.mean(signature_a == signature_b))
+
+
+def optimal_bands(threshold, num_perm):
+    """
+    Return the number of bands and rows per band minimizing the probability of
+    false positives below threshold plus false negatives above it.
+    :param threshold: float, Jaccard similarity
+    :param num_perm: int, length of signatures
+    :return: (int, int)
+    """
+    below = numpy.linspace(0.0, threshold, 101)
+    above = numpy.linspace(threshold, 1.0, 101)
+    best, best_error = (1, num_perm), None
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        # Mean probability over each interval, times its width
+        false_positive = numpy.mean(1 - (1 - below ** rows) ** bands) * threshold
+        false_negative = numpy.mean((1 - above ** rows) ** bands) * (1 - threshold)
+        error = false_positive + false_negative
+        if best_error is None or error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class LSHIndex:
+    """Banded index of MinHash signatures, returning the keys of signatures
+    likely to be above a Jaccard threshold from a query signature.
+    """
+
+    def __init__(self, threshold=0.5, num_perm=128):
+        """
+        :param threshold: float, Jaccard similarity above which strings should
+        become candidates
+        :param num_perm: int, length of signatures (as in MinHasher)
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self._tables = [{} for _ in range(self.bands)]  # type: List[Dict[bytes, List[Hashable]]]
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def insert(self, key, signature):
+        """
+        Add a signature to the index
+        :param key: hashable, returned by queries matching the signature
+        :param signature: numpy.ndarray, as returned by MinHasher.signature()
+        """
+        for table, band_key in zip(self._tables, self._band_keys(signature)):
+            table.setdefault(band_key, []).append(key)
+
+    def query(self, signature):
+        """
+        Return the keys of indexed signatures sharing a band with signature
+        :param signature: numpy.ndarray
+        :return: set
+        """
+        candidates = set()  # type: Set[Hashable]
+        for table, band_key in zip(self._tables, self._band_keys(signature)):
+            candidates.update(table.get(band_key, ()))
+        return candidates
+
+
+def candidate_pairs(texts_a, texts_b, threshold=0.5, hasher=None):
+    """
+    Yield (index in texts_a, index in texts_b, estimated Jaccard similarity)
+    for the pairs of strings whose estimated similarity is at least threshold,
+    without comparing all pairs.
+    :param texts_a: list of str
+    :param texts_b: list of str
+    :param threshold: float
+    :param hasher: MinHasher, defaults to MinHasher()
+    """
+    if hasher is None:
+        hasher = MinHasher()
+    index = LSHIndex(threshold, hasher.num_perm)
+    signatures_b = hasher.signatures(texts_b)
+    # Strings shorter than a shingle have no meaningful signature
+    for j, text in enumerate(texts_b):
+        if len(text) >= hasher.shingle_size:
+            index.insert(j, signatures_b[j])
+    for i, text in enumerate(texts_a):
+        if len(text) < hasher.shingle_size:
+            continue
+        signature = hasher.signature(text)
+        for j in sorted(index.query(signature)):
+            similarity = estimate_jaccard(signature, signatures_b[j])
+            if similarity >= threshold:
+                yield i, j, similarity
@@ -0,0 +1,378 @@
+"""
+Text reuse search over whole corpora.
+
+A ``ReuseIndex`` cuts each document of a corpus into overlapping windows of
+characters (as ``TextReuse.compare_sliding_window()`` does) and keeps the
+MinHash signature of each window. The signatures are cut into bands, and
+the hashes of each band are kept sorted, so that windows sharing a band
+with a query are found by binary search. Candidates whose estimated
+Jaccard similarity reaches the threshold are compared with the Levenshtein
+ratio, and returned as ``Comparison`` objects whose refs give the fileid
+(as ``work``) and character offset (as ``text_n``) of each window.
+
+The index can be saved to a directory, and is then memory-mapped on load.
+
+    >>> index = ReuseIndex(threshold=0.5)  # doctest: +SKIP
+    >>> index.add_corpus(get_corpus_reader('latin_text_latin_library', 'latin'), n_jobs=-1)  # doctest: +SKIP
+    >>> index.save('latin_library.reuse')  # doctest: +SKIP
+    >>> ReuseIndex.load('latin_library.reuse').query('arma virumque cano')  # doctest: +SKIP
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+import numpy
+
+from cltk.text_reuse.comparison import Comparison
+from cltk.text_reuse.levenshtein import Levenshtein
+from cltk.text_reuse.lsh import MinHasher, optimal_bands
+from cltk.utils.cltk_logger import logger
+
+__license__ = 'MIT License. See LICENSE.'
+
+
+REUSE_INDEX_VERSION = 1
+
+
+def corpus_documents(corpus_reader, fileids=None) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (fileid, text) for each document of a corpus reader
+    :param corpus_reader: CorpusReader, e.g. from ``get_corpus_reader()``
+    :param fileids: list [str], defaults to all fileids of the reader
+    """
+    if fileids is None:
+        fileids = corpus_reader.fileids()
+    for fileid in fileids:
+        if hasattr(corpus_reader, 'texts'):
+            # e.g. Tesserae, without citations
+            text = '\n'.join(corpus_reader.texts([fileid]))
+        else:
+            docs = list(corpus_reader.docs([fileid]))
+            if all(isinstance(doc, str) for doc in docs):
+                text = '\n'.join(docs)
+            else:
+                # e.g. JSON documents
+                text = '\n\n'.join(corpus_reader.paras([fileid]))
+        yield fileid, text
+
+
+def _window_starts(length: int, curse_forward: int, min_length: int) -> range:
+    """Return start offsets of the windows of a text long enough to compare."""
+    last = max(length - min_length, -1)
+    return range(0, last + 1, curse_forward)
+
+
+def _normalize(text: str) -> str:
+    """Collapse all whitespace to single spaces."""
+    return ' '.join(text.split())
+
+
+_WORKER_HASHER = None
+_WORKER_INDEX = None
+
+
+def _init_hasher_worker(num_perm: int, shingle_size: int, seed: int):
+    """Create the MinHasher of a worker process."""
+    global _WORKER_HASHER  # pylint: disable=global-statement
+    _WORKER_HASHER = MinHasher(num_perm, shingle_size, seed)
+
+
+def _signatures_in_worker(args: Tuple[str, List[int], int]) -> numpy.ndarray:
+    """Compute the signatures of the windows of a document in a worker process."""
+    text, starts, window_length = args
+    return _WORKER_HASHER.signatures([text[start:start + window_length] for start in starts])
+
+
+def _bucket_pairs(members: numpy.ndarray) -> Iterator[Tuple[numpy.ndarray, numpy.ndarray]]:
+    """Yield the pairs of windows of a bucket one window at a time, as
+    arrays of first and second windows, rather than all at once."""
+    members = numpy.sort(members)
+    for position in range(len(members) - 1):
+        second = members[position + 1:]
+        yield numpy.full(len(second), members[position], dtype=numpy.int64), second
+
+
+def _write_replacing(path: str, write: Callable[[Any], None]):
+    """Write a file under a temporary name, then move it to path, so that
+    a file memory-mapped from path is never truncated while in use.
+    :param path: str
+    :param write: callable taking the open binary file
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as file_open:
+        try:
+            write(file_open)
+        except BaseException:
+            os.remove(file_open.name)
+            raise
+    os.chmod(file_open.name, 0o644)
+    os.replace(file_open.name, path)
+
+
+def _init_index_worker(index: 'ReuseIndex'):
+    """Receive the index in a worker process."""
+    global _WORKER_INDEX  # pylint: disable=global-statement
+    _WORKER_INDEX = index
+
+
+def _band_pairs_in_worker(args: Tuple[int, float, bool]) -> List[Tuple[int, int, float]]:
+    """Find the reuse pairs first colliding in a band, in a worker process."""
+    return list(_WORKER_INDEX._band_pairs(*args))
+
+
+class ReuseIndex:
+    """Index of the windows of a corpus, for finding reused passages."""
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 128, shingle_size: int = 3,
+                 window_length: int = 50, curse_forward: int = 20, seed: int = 1):
+        """
+        :param threshold: float, Jaccard similarity (of character shingles) from
+        which windows are considered similar
+        :param num_perm: int, length of MinHash signatures
+        :param shingle_size: int, number of characters per shingle
+        :param window_length: int, number of characters per window
+        :param curse_forward: int, number of characters between window starts
+        :param seed: int, seed of the MinHash functions
+        """
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.window_length = window_length
+        self.curse_forward = curse_forward
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+
+        self.fileids = []  # type: List[str]
+        self.texts = []  # type: List[str]
+        # One row per window: (document number, start offset)
+        self.passages = numpy.empty((0, 2), dtype=numpy.int64)
+        self.signatures = numpy.empty((0, num_perm), dtype=numpy.uint64)
+        self._reset_bands()
+
+        generator = numpy.random.RandomState(seed + 1)
+        # Odd multipliers, combining the rows of a band into one 64-bit hash
+        self._band_coefficients = generator.randint(0, 1 << 62, size=self.rows, dtype=numpy.uint64) * 2 + 1
+
+    def _reset_bands(self):
+        self._band_hashes = None
+        self._band_orders = {}  # type: Dict[int, Tuple[numpy.ndarray, numpy.ndarray]]
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def add_documents(self, documents: Iterable[Tuple[str, str]], n_jobs: int = 1):
+        """
+        Add documents to the index
+        :param documents: iterable of (fileid, text)
+        :param n_jobs: int, number of worker processes computing signatures;
+        -1 for one per CPU
+        """
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+        min_length = self.hasher.shingle_size
+        passages = [self.passages]
+        signatures = [self.signatures]
+
+        def _tasks():
+            for fileid, text in documents:
+                text = _normalize(text)
+                starts = list(_window_starts(len(text), self.curse_forward, min_length))
+                document = len(self.fileids)
+                self.fileids.append(fileid)
+                self.texts.append(text)
+                passages.append(numpy.array([(document, start) for start in starts],
+                                            dtype=numpy.int64).reshape(-1, 2))
+                yield text, starts, self.window_length
+
+        if n_jobs == 1:
+            for text, starts, window_length in _tasks():
+                signatures.append(self.hasher.signatures([text[start:start + window_length] for start in starts]))
+        else:
+            initargs = (self.hasher.num_perm, self.hasher.shingle_size, self.hasher.seed)
+            with multiprocessing.Pool(n_jobs, initializer=_init_hasher_worker, initargs=initargs) as pool:
+                signatures.extend(pool.imap(_signatures_in_worker, _tasks()))
+
+        self.passages = numpy.vstack(passages)
+        self.signatures = numpy.vstack(signatures)
+        self._reset_bands()
+        logger.info('Indexed %s windows of %s documents.', len(self.passages), len(self.fileids))
+
+    def add_corpus(self, corpus_reader, fileids=None, n_jobs: int = 1):
+        """
+        Add the documents of a corpus reader to the index
+        :param corpus_reader: CorpusReader, e.g. from ``get_corpus_reader()``
+        :param fileids: list [str], defaults to all fileids of the reader
+        :param n_jobs: int, number of worker processes; -1 for one per CPU
+        """
+        self.add_documents(corpus_documents(corpus_reader, fileids), n_jobs=n_jobs)
+
+    def passage(self, number: int) -> Tuple[str, int, str]:
+        """
+        Return (fileid, start offset, text) of a window
+        :param number: int, row of the window in ``passages``
+        """
+        document, start = (int(value) for value in self.passages[number])
+        return self.fileids[document], start, self.texts[document][start:start + self.window_length]
+
+    def _hash_bands(self, signatures: numpy.ndarray) -> numpy.ndarray:
+        """Return one 64-bit hash per band of each signature."""
+        rows = signatures[:, :self.bands * self.rows].reshape(len(signatures), self.bands, self.rows)
+        with numpy.errstate(over='ignore'):
+            return (rows * self._band_coefficients).sum(axis=2, dtype=numpy.uint64)
+
+    def _band_order(self, band: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Return windows sorted by the hash of a band, and the sorted hashes."""
+        if self._band_hashes is None:
+            self._band_hashes = self._hash_bands(self.signatures)
+        if band not in self._band_orders:
+            order = numpy.argsort(self._band_hashes[:, band], kind='stable')
+            self._band_orders[band] = order, self._band_hashes[order, band]
+        return self._band_orders[band]
+
+    def _comparison(self, text_a: str, number_a: int, number_b: int, ratio: float = None) -> Comparison:
+        """Return Comparison of a text (or the window number_a) with the window number_b."""
+        fileid_b, start_b, text_b = self.passage(number_b)
+        if number_a is not None:
+            fileid_a, start_a, text_a = self.passage(number_a)
+        if ratio is None:
+            ratio = Levenshtein.ratio(text_a, text_b)
+        comparison = Comparison(text_a, text_b, ratio)
+        if number_a is not None:
+            comparison.set_ref_a({'work': fileid_a, 'text_n': str(start_a)})
+        comparison.set_ref_b({'work': fileid_b, 'text_n': str(start_b)})
+        return comparison
+
+    def query(self, text: str, threshold: float = None) -> List[Comparison]:
+        """
+        Find the windows of the corpus similar to a passage
+        :param text: str, best of about ``window_length`` characters
+        :param threshold: float, minimum estimated Jaccard similarity; defaults
+        to the threshold of the index, and cannot be usefully set below it
+        :return: list [Comparison], by decreasing Levenshtein ratio
+        """
+        if threshold is None:
+            threshold = self.threshold
+        text = _normalize(text)
+        if len(text) < self.hasher.shingle_size or not len(self):
+            return []
+        signature = self.hasher.signature(text)
+        band_hashes = self._hash_bands(signature[None, :])[0]
+        candidates = []
+        for band in range(self.bands):
+            order, sorted_hashes = self._band_order(band)
+            low = numpy.searchsorted(sorted_hashes, band_hashes[band], side='left')
+            high = numpy.searchsorted(sorted_hashes, band_hashes[band], side='right')
+            candidates.append(order[low:high])
+        candidates = numpy.unique(numpy.concatenate(candidates))
+        similarities = (self.signatures[candidates] == signature).mean(axis=1)
+        comparisons = [self._comparison(text, None, int(number))
+                       for number in candidates[similarities >= threshold]]
+        return sorted(comparisons, key=lambda comparison: -comparison.ratio)
+
+    def _band_pairs(self, band: int, threshold: float, same_document: bool) -> Iterator[Tuple[int, int, float]]:
+        """Yield (window, window, Levenshtein ratio) of the similar pairs of
+        windows whose first colliding band is band."""
+        order, sorted_hashes = self._band_order(band)
+        boundaries = numpy.flatnonzero(numpy.diff(sorted_hashes)) + 1
+        starts = numpy.concatenate(([0], boundaries))
+        ends = numpy.concatenate((boundaries, [len(sorted_hashes)]))
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+            for first, second in _bucket_pairs(order[start:end]):
+                keep = numpy.ones(len(first), dtype=bool)
+                if band:
+                    # Pairs colliding in an earlier band are reported there
+                    keep &= ~(self._band_hashes[first, :band] == self._band_hashes[second, :band]).any(axis=1)
+                if not same_document:
+                    keep &= self.passages[first, 0] != self.passages[second, 0]
+                first, second = first[keep], second[keep]
+                similar = (self.signatures[first] == self.signatures[second]).mean(axis=1) >= threshold
+                for number_a, number_b in zip(first[similar], second[similar]):
+                    text_a = self.passage(number_a)[2]
+                    text_b = self.passage(number_b)[2]
+                    yield int(number_a), int(number_b), Levenshtein.ratio(text_a, text_b)
+
+    def all_pairs(self, threshold: float = None, same_document: bool = False,
+                  n_jobs: int = 1) -> Iterator[Comparison]:
+        """
+        Yield comparisons of all pairs of similar windows in the index
+        :param threshold: float, minimum estimated Jaccard similarity; defaults
+        to the threshold of the index
+        :param same_document: bool, whether to compare windows of the same
+        document (which overlap)
+        :param n_jobs: int, number of worker processes, each handling some of
+        the bands; -1 for one per CPU
+        :return: iterator [Comparison]
+        """
+        if threshold is None:
+            threshold = self.threshold
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+        tasks = [(band, threshold, same_document) for band in range(self.bands)]
+        if n_jobs == 1:
+            results = (self._band_pairs(*task) for task in tasks)
+            for pairs in results:
+                for number_a, number_b, ratio in pairs:
+                    yield self._comparison(None, number_a, number_b, ratio)
+            return
+        if self._band_hashes is None:
+            self._band_hashes = self._hash_bands(self.signatures)
+        with multiprocessing.Pool(n_jobs, initializer=_init_index_worker, initargs=(self,)) as pool:
+            for pairs in pool.imap_unordered(_band_pairs_in_worker, tasks):
+                for number_a, number_b, ratio in pairs:
+                    yield self._comparison(None, number_a, number_b, ratio)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        # Sorted bands are rebuilt on demand
+        state['_band_orders'] = {}
+        return state
+
+    def save(self, directory: str):
+        """
+        Write the index to a directory, which is created if needed; each file
+        is replaced whole, so an index may be saved over the one it was
+        loaded from
+        :param directory: str
+        """
+        os.makedirs(directory, exist_ok=True)
+        meta = {'version': REUSE_INDEX_VERSION,
+                'threshold': self.threshold,
+                'num_perm': self.hasher.num_perm,
+                'shingle_size': self.hasher.shingle_size,
+                'seed': self.hasher.seed,
+                'window_length': self.window_length,
+                'curse_forward': self.curse_forward,
+                'fileids': self.fileids}
+        _write_replacing(os.path.join(directory, 'signatures.npy'),
+                         lambda file_open: numpy.save(file_open, self.signatures))
+        _write_replacing(os.path.join(directory, 'passages.npy'),
+                         lambda file_open: numpy.save(file_open, self.passages))
+        _write_replacing(os.path.join(directory, 'texts.json'),
+                         lambda file_open: file_open.write(json.dumps(self.texts, ensure_ascii=False).encode('utf-8')))
+        # Written last, so that an index is only complete with its meta file
+        _write_replacing(os.path.join(directory, 'meta.json'),
+                         lambda file_open: file_open.write(json.dumps(meta).encode('utf-8')))
+
+    @classmethod
+    def load(cls, directory: str) -> 'ReuseIndex':
+        """
+        Read an index written by ``save()``; its arrays are memory-mapped
+        :param directory: str
+        :rtype: ReuseIndex
+        """
+        with open(os.path.join(directory, 'meta.json')) as file_open:
+            meta = json.load(file_open)
+        if meta.get('version') != REUSE_INDEX_VERSION:
+            raise ValueError("Reuse index '{}' has version {}, expected {}.".format(
+                directory, meta.get('version'), REUSE_INDEX_VERSION))
+        index = cls(meta['threshold'], meta['num_perm'], meta['shingle_size'],
+                    meta['window_length'], meta['curse_forward'], meta['seed'])
+        index.fileids = meta['fileids']
+        with open(os.path.join(directory, 'texts.json'), encoding='utf-8') as file_open:
+            index.texts = json.load(file_open)
+        index.signatures = numpy.load(os.path.join(directory, 'signatures.npy'), mmap_mode='r')
+        index.passages = numpy.load(os.path.join(directory, 'passages.npy'), mmap_mode='r')
+        return index
@@ -8,6 +8,7 @@ from cltk.tokenize.sentence import TokenizeSentence
 from cltk.utils.cltk_logger import logger
 from cltk.text_reuse.levenshtein import Levenshtein
 from cltk.text_reuse.comparison import Comparison
+from cltk.text_reuse.lsh import candidate_pairs
 from cltk.stem.latin.stem import Stemmer
 
 
@@ -51,9 +52,41 @@ class TextReuse:
         :return: list [[Comparison]]
         """
 
-        sents_a = []
-        sents_b = []
-        ratios = []
+        sents = self._sentences(str_a, str_b, language)
+        if sents is None:
+            return
+
+        # Build matrix of edit distance ratios
+        comparisons = self._calculate_ratios(*sents)
+
+        return comparisons
+
+    def compare_sentences_iter(self, str_a, str_b, language, threshold=0.5):
+        """Tokenize two input strings on sentence boundary and yield
+        comparisons of only the pairs of sentences likely to have a Jaccard
+        similarity (of their character shingles) of at least threshold, found
+        without comparing all pairs.
+        :param language: str (language name)
+        :param string_a: str
+        :param string_b: str
+        :param threshold: float
+        :return: iterator [Comparison]
+        """
+
+        sents = self._sentences(str_a, str_b, language)
+        if sents is None:
+            return
+
+        yield from self._calculate_candidate_ratios(*sents, threshold=threshold)
+
+    def _sentences(self, str_a, str_b, language):
+        """Tokenize two input strings on sentence boundary and process
+        sentences for comparison; return None if language is unsupported.
+        :param language: str (language name)
+        :param string_a: str
+        :param string_b: str
+        :return: tuple (list [object], list [object])
+        """
 
         # Make the latin tokenizer
         if language == "latin":
@@ -68,7 +101,7 @@ class TextReuse:
         else:
             print("Language for sentence tokenization not recognized. "
                   "Accepted values are 'latin' and 'greek'.")
-            return
+            return None
 
         # If class instance is set to stem words, do so
         if self.stem_words:
@@ -84,10 +117,7 @@ class TextReuse:
         sents_a = self._process_sentences(sents_a)
         sents_b = self._process_sentences(sents_b)
 
-        # Build matrix of edit distance ratios
-        comparisons = self._calculate_ratios(sents_a, sents_b)
-
-        return comparisons
+        return sents_a, sents_b
 
     def compare_sliding_window(self, str_a, str_b, window_length=50, curse_forward=20):
         """
@@ -99,6 +129,40 @@ class TextReuse:
         :return: list [[Comparison]]
         """
 
+        substrs_a, substrs_b = self._windows(str_a, str_b, window_length, curse_forward)
+
+        # Build
+        comparisons = self._calculate_ratios(substrs_a, substrs_b)
+
+        return comparisons
+
+    def compare_sliding_window_iter(self, str_a, str_b, window_length=50, curse_forward=20, threshold=0.5):
+        """
+        Compare two strings with a sliding window method based on window_length and curse_forward values,
+        yielding comparisons of only the pairs of windows likely to have a Jaccard similarity (of their
+        character shingles) of at least threshold, found without comparing all pairs
+        :param string_a: str
+        :param string_b: str
+        :param window_length: int
+        :param curse_forward: int
+        :param threshold: float
+        :return: iterator [Comparison]
+        """
+
+        substrs_a, substrs_b = self._windows(str_a, str_b, window_length, curse_forward)
+
+        yield from self._calculate_candidate_ratios(substrs_a, substrs_b, threshold=threshold)
+
+    def _windows(self, str_a, str_b, window_length, curse_forward):
+        """
+        Divide two input strings into windows for comparison
+        :param string_a: str
+        :param string_b: str
+        :param window_length: int
+        :param curse_forward: int
+        :return: tuple (list [object], list [object])
+        """
+
         if self.stem_words:
             stemmer = Stemmer()
             str_a = stemmer.stem(str_a)
@@ -107,10 +171,7 @@ class TextReuse:
         substrs_a = self._str_to_windows(str_a, window_length, curse_forward)
         substrs_b = self._str_to_windows(str_b, window_length, curse_forward)
 
-        # Build
-        comparisons = self._calculate_ratios(substrs_a, substrs_b)
-
-        return comparisons
+        return substrs_a, substrs_b
 
     def _calculate_ratios(self, list_a, list_b):
         """
@@ -121,7 +182,6 @@ class TextReuse:
         """
 
         comparisons = []
-        l = Levenshtein()
 
         # For all strings in list a
         for i, str_a in enumerate(list_a):
@@ -132,34 +192,62 @@ class TextReuse:
             # Compare str_a to every string in list_b
             for str_b in list_b:
 
-                # If the sanitize, input flag is set, make the ratio with the sanitized values
-                if self.sanitize_input:
-                    new_comparison = Comparison(
-                                            str_a['text'],
-                                            str_b['text'],
-                                            l.ratio(str_a['sanitized'], str_b['sanitized'])
-                                        )
-
-                # Otherwise, make the ratio with the original, unsanitize text strings
-                else:
-                    new_comparison = Comparison(
-                                            str_a['text'],
-                                            str_b['text'],
-                                            l.ratio(str_a['text'], str_b['text'])
-                                        )
-
-                # If text metadata is set on this class for text a or b, save that data with the
-                # comparison
-                if self.text_ref_a:
-                    new_comparison.set_ref_a(self.text_ref_a)
-                if self.text_ref_b:
-                    new_comparison.set_ref_b(self.text_ref_b)
-
                 # Finally, append the new comparison to the list of comparisons
-                comparisons[i].append(new_comparison)
+                comparisons[i].append(self._compare(str_a, str_b))
 
         return comparisons
 
+    def _calculate_candidate_ratios(self, list_a, list_b, threshold=0.5):
+        """
+        Yield string comparisons of the pairs from two input lists proposed by
+        locality-sensitive hashing, i.e. likely to have a Jaccard similarity of
+        at least threshold
+        :param list_a: list [object]
+        :param list_b: list [object]
+        :param threshold: float
+        :return: iterator [Comparison]
+        """
+
+        key = 'sanitized' if self.sanitize_input else 'text'
+        texts_a = [str_a[key] for str_a in list_a]
+        texts_b = [str_b[key] for str_b in list_b]
+
+        for i, j, _ in candidate_pairs(texts_a, texts_b, threshold):
+            yield self._compare(list_a[i], list_b[j])
+
+    def _compare(self, str_a, str_b):
+        """
+        Compare two processed strings
+        :param str_a: object
+        :param str_b: object
+        :return: Comparison
+        """
+
+        # If the sanitize, input flag is set, make the ratio with the sanitized values
+        if self.sanitize_input:
+            new_comparison = Comparison(
+                                    str_a['text'],
+                                    str_b['text'],
+                                    Levenshtein.ratio(str_a['sanitized'], str_b['sanitized'])
+                                )
+
+        # Otherwise, make the ratio with the original, unsanitize text strings
+        else:
+            new_comparison = Comparison(
+                                    str_a['text'],
+                                    str_b['text'],
+                                    Levenshtein.ratio(str_a['text'], str_b['text'])
+                                )
+
+        # If text metadata is set on this class for text a or b, save that data with the
+        # comparison
+        if self.text_ref_a:
+            new_comparison.set_ref_a(self.text_ref_a)
+        if self.text_ref_b:
+            new_comparison.set_ref_b(self.text_ref_b)
+
+        return new_comparison
+
     def _process_sentences(self, sents_list):
         """
         Divide an input string to a list of substrings based on window_length and curse_forward values
@@ -174,7 +262,7 @@ class TextReuse:
                             }
             # If the class is set to santize input before comparison, do so
             if self.sanitize_input:
-                processed_sent['sanitized'] = self._sanitize(sent),
+                processed_sent['sanitized'] = self._sanitize(sent)
 
             processed_sents.append(processed_sent)
 
@@ -0,0 +1,265 @@
+"""Compact, memory-mapped storage for large lookup tables in ``cltk_data``.
+
+Several models in ``cltk_data`` are distributed as Python source files
+holding one giant dict or list literal (e.g., ``latin_lemmata_cltk.py``).
+Executing these is slow and memory-hungry, and has to be repeated in every
+process. ``load_py_data()`` executes such a file only once, converting the
+data into a binary file next to it, named after the variable read and the
+function (if any) transforming its data; afterwards, the binary file is opened
+with ``mmap`` as a read-only ``MmapDict``, whose lookups read just the
+entries they need.
+
+Binary file layout (all integers little-endian):
+
+* header: magic, number of entries, value encoding, mtime and size of the
+  source file
+* key offsets: ``count + 1`` uint32s into the key blob
+* value offsets: ``count + 1`` uint32s into the value blob
+* key blob: UTF-8 keys, sorted bytewise, so that lookup is a binary search
+* value blob: UTF-8 values if all values are str, else pickled values
+"""
+
+from collections.abc import Mapping
+from hashlib import md5
+import importlib.machinery
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Any, Callable, Iterator, Tuple
+
+from cltk.utils.cltk_logger import logger
+
+__license__ = 'MIT License. See LICENSE.'
+
+
+MAGIC = b'CLTKMAP1'
+HEADER = struct.Struct('<8sQcdQ')
+ENCODING_STR = b's'
+ENCODING_PICKLE = b'p'
+SUFFIX = '.cltkmap'
+OFFSET_TYPE = 'I'
+OFFSET_SIZE = 4
+
+
+class MmapDict(Mapping):
+    """Read-only mapping of str keys, backed by a memory-mapped file written
+    by ``write_mmap_dict()``. Iteration is in sorted (bytewise UTF-8) key
+    order.
+    """
+
+    def __init__(self, path: str):
+        """Open binary file.
+        :param path: Path of file written by ``write_mmap_dict()``
+        """
+        self.path = path
+        with open(path, 'rb') as file_open:
+            self._mmap = mmap.mmap(file_open.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, encoding, source_mtime, source_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError("'{}' is not a CLTK binary data file.".format(path))
+        self._count = count
+        self._pickled = encoding == ENCODING_PICKLE
+        self.source_stat = (source_mtime, source_size)
+        offsets_size = (count + 1) * OFFSET_SIZE
+        self._key_offsets = self._offsets(HEADER.size, count + 1)
+        self._value_offsets = self._offsets(HEADER.size + offsets_size, count + 1)
+        self._keys_start = HEADER.size + 2 * offsets_size
+        self._values_start = self._keys_start + self._key_offsets[count]
+
+    def _offsets(self, start: int, length: int):
+        """Return view of uint32 array stored at start."""
+        end = start + length * OFFSET_SIZE
+        if sys.byteorder == 'little':
+            return memoryview(self._mmap)[start:end].cast(OFFSET_TYPE)
+        offsets = array(OFFSET_TYPE, self._mmap[start:end])
+        offsets.byteswap()
+        return offsets
+
+    def _key(self, index: int) -> bytes:
+        return self._mmap[self._keys_start + self._key_offsets[index]:
+                          self._keys_start + self._key_offsets[index + 1]]
+
+    def _value(self, index: int) -> Any:
+        raw = self._mmap[self._values_start + self._value_offsets[index]:
+                         self._values_start + self._value_offsets[index + 1]]
+        if self._pickled:
+            return pickle.loads(raw)
+        return raw.decode('utf-8')
+
+    def _find(self, key: str) -> int:
+        """Binary search for key; return its index or -1."""
+        if not isinstance(key, str):
+            return -1
+        target = key.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            current = self._key(middle)
+            if current < target:
+                low = middle + 1
+            elif current > target:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def __getitem__(self, key: str) -> Any:
+        index = self._find(key)
+        if index < 0:
+            raise KeyError(key)
+        return self._value(index)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        index = self._find(key)
+        if index < 0:
+            return default
+        return self._value(index)
+
+    def __contains__(self, key: object) -> bool:
+        return self._find(key) >= 0
+
+    def keys_with_prefix(self, prefix: str) -> Iterator[str]:
+        """Yield the keys starting with prefix, in sorted order."""
+        target = prefix.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        for index in range(low, self._count):
+            key = self._key(index)
+            if not key.startswith(target):
+                break
+            yield key.decode('utf-8')
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._count):
+            yield self._key(index).decode('utf-8')
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for index in range(self._count):
+            yield self._key(index).decode('utf-8'), self._value(index)
+
+    def close(self):
+        """Release the memory map."""
+        if isinstance(self._key_offsets, memoryview):
+            self._key_offsets.release()
+            self._value_offsets.release()
+        self._mmap.close()
+
+    def __reduce__(self):
+        # Reopen the file, rather than copy the data, in other processes
+        return type(self), (self.path,)
+
+    def __repr__(self):
+        return '<{}: {} entries from {}>'.format(type(self).__name__, self._count, self.path)
+
+
+def write_mmap_dict(path: str, mapping: Mapping, source_stat: Tuple[float, int] = (0.0, 0)):
+    """Write a mapping of str keys to a binary file for ``MmapDict``. The file
+    is written under a temporary name and then moved into place, so that
+    readers never see a partial file.
+    :param path: Path of binary file
+    :param mapping: Dict with str keys; values are stored as UTF-8 if all are
+        str, else pickled
+    :param source_stat: mtime and size of the file the data came from
+    """
+    items = sorted((key.encode('utf-8'), value) for key, value in mapping.items())
+    if all(isinstance(value, str) for _, value in items):
+        encoding = ENCODING_STR
+        values = [value.encode('utf-8') for _, value in items]
+    else:
+        encoding = ENCODING_PICKLE
+        values = [pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) for _, value in items]
+    keys = [key for key, _ in items]
+
+    def _offsets(blobs):
+        offsets = array(OFFSET_TYPE, [0])
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        return offsets.tobytes()
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as file_open:
+        try:
+            file_open.write(HEADER.pack(MAGIC, len(items), encoding, *source_stat))
+            file_open.write(_offsets(keys))
+            file_open.write(_offsets(values))
+            for blob in keys:
+                file_open.write(blob)
+            for blob in values:
+                file_open.write(blob)
+        except BaseException:
+            os.remove(file_open.name)
+            raise
+    os.chmod(file_open.name, 0o644)
+    os.replace(file_open.name, path)
+
+
+def _source_stat(path: str) -> Tuple[float, int]:
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+
+def _binary_path(path: str, variable: str, to_mapping: Callable[[Any], Mapping] = None) -> str:
+    """Return the path of the binary file for the data of a variable in a
+    Python source file, e.g. ``entries.1a2b3c4d.cltkmap``. Its name holds a
+    digest of the variable name and of the qualified name of to_mapping, so
+    that data read or transformed differently is kept apart.
+    """
+    key = variable
+    if to_mapping is not None:
+        key += '\n{}.{}'.format(getattr(to_mapping, '__module__', ''),
+                                getattr(to_mapping, '__qualname__', type(to_mapping).__qualname__))
+    digest = md5(key.encode('utf-8')).hexdigest()[:8]
+    return '{}.{}{}'.format(os.path.splitext(path)[0], digest, SUFFIX)
+
+
+def load_py_data(path: str, variable: str, to_mapping: Callable[[Any], Mapping] = None) -> Mapping:
+    """Return the data held in a variable of a Python source data file, as a
+    ``MmapDict``. On first use (or once the source file has changed), the
+    source file is executed and its data converted to a binary file next to
+    it, with suffix ``.cltkmap`` (see ``_binary_path()``). If that file cannot
+    be written, the data is returned as a regular dict.
+    :param path: Path of Python source file
+    :param variable: Name of variable holding the data
+    :param to_mapping: Callable converting the data to a dict with str keys,
+        for data which is not already such a dict; it is identified by its
+        qualified name, so rename it when changing what it returns
+    :rtype: Mapping
+    """
+    binary_path = _binary_path(path, variable, to_mapping)
+    source_stat = _source_stat(path)
+    if os.path.isfile(binary_path):
+        try:
+            mmap_dict = MmapDict(binary_path)
+        except (ValueError, struct.error) as err:
+            logger.warning("Could not open '%s', recreating it: %s", binary_path, err)
+        else:
+            if mmap_dict.source_stat == source_stat:
+                return mmap_dict
+            mmap_dict.close()
+
+    logger.info("Converting '%s' to '%s'.", path, binary_path)
+    module_name = os.path.splitext(os.path.basename(path))[0]
+    loader = importlib.machinery.SourceFileLoader(module_name, path)
+    data = getattr(loader.load_module(), variable)
+    mapping = to_mapping(data) if to_mapping else data
+    try:
+        write_mmap_dict(binary_path, mapping, source_stat)
+    except OSError as os_error:
+        logger.warning("Could not write '%s', keeping data in memory: %s", binary_path, os_error)
+        return dict(mapping)
+    return MmapDict(binary_path)
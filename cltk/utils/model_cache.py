@@ -0,0 +1,169 @@
+"""Process-wide cache for models loaded from ``cltk_data``.
+
+Taggers and lemmatizers read large pickles (and, for some languages, large
+Python data files) from disk. Loading these on every call is expensive, so
+this module keeps loaded models in memory, shared by every object in the
+process. Entries are keyed by language, model name, and the file's resolved
+path, so that models of the same name loaded from different files (e.g., a
+``.py`` and a ``.pickle`` version) are kept apart; the file's mtime is
+stored alongside the object, so a model that is updated on disk (e.g.,
+after a ``git pull`` of a models repo) is transparently reloaded.
+
+The cache is thread-safe and bounded: once more than ``maxsize`` models are
+held, the least recently used one is evicted.
+
+    >>> from cltk.utils.model_cache import preload, evict
+    >>> preload('latin', 'tnt', tnt_pickle_path)  # doctest: +SKIP
+    >>> evict('latin')  # doctest: +SKIP
+"""
+
+from collections import OrderedDict
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from cltk.utils.cltk_logger import logger
+from cltk.utils.file_operations import open_pickle
+
+__license__ = 'MIT License. See LICENSE.'
+
+
+DEFAULT_MAXSIZE = 16
+
+
+class ModelCache:
+    """Thread-safe, LRU-bounded registry of loaded models."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        """Setup variables.
+        :param maxsize: Max number of models to keep in memory; ``None``
+        means unbounded.
+        """
+        self.maxsize = maxsize
+        self._models = OrderedDict()  # type: OrderedDict
+        self._lock = threading.RLock()
+        self._key_locks = {}  # type: Dict[Tuple[str, Hashable, str], threading.Lock]
+
+    def _key_lock(self, key: Tuple[str, Hashable, str]) -> threading.Lock:
+        """Return the lock guarding the loading of a single key, so that two
+        threads asking for the same model only load it once, while different
+        models may be loaded concurrently.
+        """
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _lookup(self, key: Tuple[str, Hashable, str], mtime: float):
+        """Return cached model for key if present and not stale, else None."""
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is None:
+                return None
+            if entry[0] != mtime:
+                return None
+            self._models.move_to_end(key)
+            return entry
+
+    def _store(self, key: Tuple[str, Hashable, str], mtime: float, model: Any):
+        """Insert model and evict least recently used entries over maxsize."""
+        with self._lock:
+            self._models[key] = (mtime, model)
+            self._models.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._models) > self.maxsize:
+                    old_key, _ = self._models.popitem(last=False)
+                    self._key_locks.pop(old_key, None)
+                    logger.info("Evicted model '%s' from cache.", old_key)
+
+    def get(self, language: str, name: Hashable, path: str,
+            loader: Callable[[str], Any] = open_pickle) -> Any:
+        """Return model for (language, name) from path, loading it with
+        loader if it is not cached, or the file has changed on disk.
+        :param language: Language the model belongs to
+        :param name: Name of the model (e.g., tagger name)
+        :param path: Path of model file
+        :param loader: Callable taking path and returning the model; defaults
+        to ``open_pickle()``
+        :rtype: object
+        """
+        path = os.path.realpath(path)
+        key = (language, name, path)
+        mtime = os.path.getmtime(path)
+        entry = self._lookup(key, mtime)
+        if entry is not None:
+            return entry[1]
+        with self._key_lock(key):
+            # Another thread may have loaded it while we waited.
+            entry = self._lookup(key, mtime)
+            if entry is not None:
+                return entry[1]
+            model = loader(path)
+            self._store(key, mtime, model)
+            logger.info("Loaded model '%s' from '%s'.", key, path)
+            return model
+
+    def preload(self, language: str, name: Hashable, path: str,
+                loader: Callable[[str], Any] = open_pickle):
+        """Load a model into the cache ahead of its first use."""
+        self.get(language, name, path, loader)
+
+    def evict(self, language: str = None, name: Hashable = None) -> int:
+        """Remove models from the cache. With no arguments, empties the whole
+        cache; with only language, removes all of that language's models;
+        with a name, removes the models of that name loaded from any path.
+        :return: Number of models removed
+        :rtype: int
+        """
+        with self._lock:
+            keys = [key for key in self._models
+                    if (language is None or key[0] == language)
+                    and (name is None or key[1] == name)]
+            for key in keys:
+                del self._models[key]
+                self._key_locks.pop(key, None)
+            return len(keys)
+
+    def keys(self) -> List[Tuple[str, Hashable, str]]:
+        """Return (language, name, path) keys of cached models, least
+        recently used first."""
+        with self._lock:
+            return list(self._models)
+
+    def __contains__(self, key: Tuple[str, Hashable]) -> bool:
+        """Return whether a model of this (language, name), from any path,
+        or of this (language, name, path), is cached."""
+        with self._lock:
+            if len(key) == 3:
+                return key in self._models
+            return any(model_key[:2] == key for model_key in self._models)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._models)
+
+    def __repr__(self):
+        return '<{}: {} models, maxsize={}>'.format(type(self).__name__, len(self), self.maxsize)
+
+
+MODEL_CACHE = ModelCache()
+
+
+def load_model(language: str, name: Hashable, path: str,
+               loader: Callable[[str], Any] = open_pickle) -> Any:
+    """Return a model from the shared process-wide cache. See
+    ``ModelCache.get()``.
+    """
+    return MODEL_CACHE.get(language, name, path, loader)
+
+
+def preload(language: str, name: Hashable, path: str,
+            loader: Callable[[str], Any] = open_pickle):
+    """Load a model into the shared process-wide cache."""
+    MODEL_CACHE.preload(language, name, path, loader)
+
+
+def evict(language: str = None, name: Hashable = None) -> int:
+    """Remove models from the shared process-wide cache."""
+    return MODEL_CACHE.evict(language, name)
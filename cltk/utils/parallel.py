@@ -0,0 +1,80 @@
+"""Bounded submission of tasks to a ``multiprocessing`` pool.
+
+``Pool.imap()`` consumes its whole iterable of tasks up front, and queues
+every result until it is consumed, so a slow consumer of a large corpus
+holds all of it in memory. ``imap_bounded()`` keeps at most ``max_pending``
+tasks submitted and not yet yielded. A task whose worker process dies (e.g.,
+killed by the OOM killer) never completes in a ``Pool``, so the workers are
+also checked while waiting, and their death is raised rather than waited
+for forever.
+
+    >>> with multiprocessing.Pool(4) as pool:  # doctest: +SKIP
+    ...     for result in imap_bounded(pool, abs, range(-100, 0), 8):
+    ...         print(result)
+"""
+
+import queue
+from typing import Any, Callable, Dict, Iterable, Iterator, Set
+
+__license__ = 'MIT License. See LICENSE.'
+
+
+# Seconds between checks that the pool's workers are alive
+POLL_INTERVAL = 1.0
+
+
+def _worker_pids(pool) -> Set[int]:
+    """Return the pids of the worker processes of a pool, which change when
+    the pool replaces a worker that has exited."""
+    return {process.pid for process in pool._pool}  # pylint: disable=protected-access
+
+
+def imap_bounded(pool, func: Callable[[Any], Any], tasks: Iterable[Any], max_pending: int,
+                 ordered: bool = False) -> Iterator[Any]:
+    """Yield func(task) for each task, computed in a pool, with at most
+    max_pending tasks submitted and not yet yielded.
+    :param pool: multiprocessing.Pool
+    :param func: Picklable function of one task
+    :param tasks: Iterable of picklable tasks, consumed as results are yielded
+    :param max_pending: Max number of tasks submitted and not yet yielded
+    :param ordered: Yield results in the order of tasks, instead of as they arrive
+    :raises: The exception of a failed task; RuntimeError if a worker process
+    exits while tasks are pending
+    """
+    done = queue.Queue()  # type: queue.Queue
+    results = {}  # type: Dict[int, Any]
+    tasks = enumerate(tasks)
+    pids = _worker_pids(pool)
+    pending = 0
+    next_number = 0
+    exhausted = False
+    while True:
+        while not exhausted and pending < max_pending:
+            try:
+                number, task = next(tasks)
+            except StopIteration:
+                exhausted = True
+                break
+            pool.apply_async(func, (task,),
+                             callback=lambda result, number=number: done.put((number, result, None)),
+                             error_callback=lambda error, number=number: done.put((number, None, error)))
+            pending += 1
+        if not pending:
+            return
+        try:
+            number, result, error = done.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if _worker_pids(pool) != pids:
+                raise RuntimeError('A worker process exited before its task was done.')
+            continue
+        if error is not None:
+            raise error
+        if not ordered:
+            pending -= 1
+            yield result
+            continue
+        results[number] = result
+        while next_number in results:
+            pending -= 1
+            yield results.pop(next_number)
+            next_number += 1